@@ -0,0 +1,138 @@
+"""
+Seeded generator of synthetic contracts with shapes of lines which are recognized by parser:
+Exhibit and title lines, ARTICLE and 'Section N.' headers, numbered, lettered and bulleted lists,
+long paragraphs wrapped to lines which continue previous sentence.
+
+Example:
+
+    python3 -m benchmarks.contracts --size 10MB --seed 13 > contract.txt
+"""
+import re
+import sys
+import random
+import argparse
+
+WORDS = ['agreement', 'party', 'parties', 'shall', 'company', 'notice', 'term', 'payment', 'hereto',
+         'employee', 'executive', 'obligations', 'pursuant', 'provided', 'including', 'without',
+         'limitation', 'respect', 'applicable', 'law', 'services', 'confidential', 'information',
+         'termination', 'effective', 'date', 'written', 'consent', 'such', 'other', 'any', 'all']
+HEADINGS = ['Definitions', 'Term of employment', 'Compensation', 'Benefits', 'Termination',
+            'Confidential information', 'Notices', 'Governing law', 'Miscellaneous', 'Assignment']
+ROMAN = ['I', 'II', 'III', 'IV', 'V', 'VI', 'VII', 'VIII', 'IX', 'X']
+# count of distinct sentences, texts are built from them (generation of big texts is fast)
+SENTENCES = 512
+LINE_WIDTH = 80
+
+SIZE_UNITS = {'B': 1, 'KB': 1 << 10, 'MB': 1 << 20, 'GB': 1 << 30}
+
+
+def parse_size(size: str) -> int:
+    """
+    Size in bytes from string such as '1KB', '10MB' or '512'.
+    """
+    match = re.fullmatch(r'\s*(\d+)\s*([KMG]?B)?\s*', size.upper())
+    if match is None:
+        raise ValueError('wrong size {}'.format(size))
+    return int(match.group(1)) * SIZE_UNITS[match.group(2) or 'B']
+
+
+def format_size(size: int) -> str:
+    for unit in ('GB', 'MB', 'KB'):
+        if size >= SIZE_UNITS[unit] and size % SIZE_UNITS[unit] == 0:
+            return '{}{}'.format(size // SIZE_UNITS[unit], unit)
+    return '{}B'.format(size)
+
+
+class ContractGenerator:
+    """
+    Generator of contracts, the same seed gives the same texts.
+    """
+
+    def __init__(self, seed: int = 13):
+        self.random = random.Random(seed)
+        self.sentences = [self.__sentence() for _ in range(SENTENCES)]
+
+    def __sentence(self) -> str:
+        words = [self.random.choice(WORDS) for _ in range(self.random.randrange(8, 24))]
+        return ' '.join(words).capitalize() + '.'
+
+    def paragraph(self) -> list:
+        """
+        Lines of long paragraph, each next line starts with lowercase word (continuation of sentence).
+        """
+        text = ' '.join(self.random.choice(self.sentences) for _ in range(self.random.randrange(2, 8)))
+        lines, start = [], 0
+        while start < len(text):
+            end = text.find(' ', start + LINE_WIDTH)
+            end = len(text) if end < 0 else end
+            # next line must start with lowercase letter
+            while end < len(text) and not text[end + 1].islower():
+                end = text.find(' ', end + 1)
+                end = len(text) if end < 0 else end
+            lines.append(text[start:end])
+            start = end + 1
+        return lines
+
+    def list_items(self) -> list:
+        kind = self.random.randrange(4)
+        lines = []
+        for i in range(self.random.randrange(2, 6)):
+            item = self.random.choice(self.sentences)
+            if kind == 0:
+                lines.append('({}) {}'.format('abcdefgh'[i], item))
+            elif kind == 1:
+                lines.append('{}. {}'.format(i + 1, item))
+            elif kind == 2:
+                # lowercase marker would continue previous line
+                lines.append('{}) {}'.format('ABCDEFGH'[i], item))
+            else:
+                lines.append('• ' + item)
+        return lines
+
+    def article(self, number: int) -> list:
+        lines = ['', 'ARTICLE ' + ROMAN[number % len(ROMAN)], self.random.choice(HEADINGS).upper(), '']
+        for section in range(self.random.randrange(1, 5)):
+            lines.append('Section {}.{}. {}'.format(number + 1, section + 1, self.random.choice(HEADINGS)))
+            for _ in range(self.random.randrange(1, 4)):
+                lines.extend(self.list_items() if self.random.random() < 0.3 else self.paragraph())
+                lines.append('')
+        return lines
+
+    def contract(self, size: int) -> str:
+        """
+        Contract with size at least 'size' chars (all chars except '•' are ascii).
+        """
+        lines = ['Exhibit 10.{}'.format(self.random.randrange(1, 10)), '',
+                 'EMPLOYMENT AGREEMENT', '']
+        lines.extend(self.paragraph())
+        text_size = sum(len(line) + 1 for line in lines)
+        number = 0
+        while text_size < size:
+            article = self.article(number)
+            lines.extend(article)
+            text_size += sum(len(line) + 1 for line in article)
+            number += 1
+        return '\n'.join(lines)
+
+
+def generate_contract(size: int, seed: int = 13) -> str:
+    """
+    Synthetic contract (see ContractGenerator).
+
+    :param size: int, minimal size of text in chars
+    :param seed: int, seed of random generator
+    :return: str
+    """
+    return ContractGenerator(seed).contract(size)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Generator of synthetic contracts.')
+    arg_parser.add_argument('--size', help='size of contract, for example 1KB or 100MB', type=str, default='1MB')
+    arg_parser.add_argument('--seed', help='seed of random generator', type=int, default=13)
+    args = arg_parser.parse_args()
+    sys.stdout.write(generate_contract(parse_size(args.size), args.seed))
+
+
+if __name__ == '__main__':
+    main()
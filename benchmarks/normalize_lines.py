@@ -0,0 +1,62 @@
+"""
+Benchmark of parser.core._normalize_lines on synthetic texts where most of lines
+continue previous sentence (as in texts after OCR).
+
+Example:
+
+    python3 -m benchmarks.normalize_lines --max-lines 1000000
+"""
+import time
+import random
+import argparse
+
+from parser.core import _normalize_lines
+
+arg_parser = argparse.ArgumentParser(description='Benchmark of lines normalization.')
+arg_parser.add_argument('--max-lines',
+                        help='count of lines in the biggest text',
+                        type=int,
+                        default=1000000)
+arg_parser.add_argument('--continuation',
+                        help='part of lines which continue previous sentence',
+                        type=float,
+                        default=0.9)
+arg_parser.add_argument('--seed',
+                        help='seed of random generator',
+                        type=int,
+                        default=13)
+
+WORDS = ['agreement', 'party', 'shall', 'company', 'notice', 'term', 'payment', 'hereto']
+
+
+def synthetic_lines(count: int, continuation: float, seed: int) -> list:
+    """
+    Generate lines where each line continues previous sentence with given probability.
+    """
+    generator = random.Random(seed)
+    lines = ['Exhibit 10.1']
+    for _ in range(count - 1):
+        words = ' '.join(generator.choice(WORDS) for _ in range(6))
+        if generator.random() < continuation:
+            lines.append(words)
+        else:
+            lines.append(words.capitalize() + '.')
+    return lines
+
+
+def main():
+    args = arg_parser.parse_args()
+
+    count = 1000
+    print('{:>10} {:>10} {:>14}'.format('lines', 'seconds', 'usec per line'))
+    while count <= args.max_lines:
+        lines = synthetic_lines(count, args.continuation, args.seed)
+        start = time.perf_counter()
+        _normalize_lines(lines)
+        elapsed = time.perf_counter() - start
+        print('{:>10} {:>10.4f} {:>14.3f}'.format(count, elapsed, elapsed / count * 1e6))
+        count *= 10
+
+
+if __name__ == '__main__':
+    main()
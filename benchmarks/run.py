@@ -0,0 +1,206 @@
+"""
+Benchmarks of parser on synthetic contracts (see benchmarks.contracts): throughput, peak memory
+and scaling by size of text, results may be saved and compared with baseline.
+
+Example:
+
+    python3 -m benchmarks.run --sizes 1KB,10KB,100KB,1MB,10MB,100MB --save baseline.json
+    python3 -m benchmarks.run --baseline baseline.json
+"""
+import os
+import sys
+import json
+import math
+import time
+import tempfile
+import argparse
+import platform
+import tracemalloc
+
+from parser import parse_raw_text, generate_tree, build_tree, tag_positions
+from benchmarks.contracts import generate_contract, parse_size, format_size
+
+arg_parser = argparse.ArgumentParser(description='Benchmarks of parser.')
+arg_parser.add_argument('--sizes',
+                        help='comma separated sizes of contracts',
+                        type=str,
+                        default='1KB,10KB,100KB,1MB,10MB')
+arg_parser.add_argument('--benchmarks',
+                        help='comma separated names of benchmarks (by default all)',
+                        type=str,
+                        default='')
+arg_parser.add_argument('--seed',
+                        help='seed of generator of contracts',
+                        type=int,
+                        default=13)
+arg_parser.add_argument('--min-time',
+                        help='min time (in seconds) of repeats of each benchmark, best time is reported',
+                        type=float,
+                        default=0.5)
+arg_parser.add_argument('--no-memory',
+                        help='do not measure peak memory (it requires one more run with tracemalloc)',
+                        action='store_true')
+arg_parser.add_argument('--save',
+                        help='save results to json file',
+                        type=str,
+                        default='')
+arg_parser.add_argument('--baseline',
+                        help='json file with results of previous run which will be compared with current',
+                        type=str,
+                        default='')
+arg_parser.add_argument('--tolerance',
+                        help='allowed slowdown in comparison with baseline (0.1 - 10%%)',
+                        type=float,
+                        default=0.1)
+
+
+def _read_text(path: str) -> str:
+    # file_parser is script with command line arguments, so it is imported only when needed
+    from file_parser import read_text
+    return read_text(path)
+
+
+def _prepare_file(text: str, folder: str) -> str:
+    path = os.path.join(folder, 'contract.txt')
+    with open(path, 'w', encoding='utf-8') as out_file:
+        out_file.write(text)
+    return path
+
+
+# name of benchmark: (function which is measured, function which prepares its argument from text)
+BENCHMARKS = {
+    'parse_raw_text': (parse_raw_text, lambda text, folder: text),
+    'generate_tree': (generate_tree, lambda text, folder: text),
+    'build_tree': (build_tree, lambda text, folder: tag_positions(text)[0]),
+    'read_text': (_read_text, _prepare_file),
+}
+
+
+def measure(function, argument, min_time: float) -> float:
+    """
+    Best time of function calls, function is called while total time is less than min_time.
+    """
+    best, total = math.inf, 0.0
+    while total < min_time or best is math.inf:
+        start = time.perf_counter()
+        function(argument)
+        elapsed = time.perf_counter() - start
+        best, total = min(best, elapsed), total + elapsed
+    return best
+
+
+def peak_memory(function, argument) -> int:
+    """
+    Peak size of memory (in bytes) allocated by function.
+    """
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        start_size, _ = tracemalloc.get_traced_memory()
+        function(argument)
+        _, peak_size = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak_size - start_size
+
+
+def run(benchmarks: list, sizes: list, *, seed: int = 13, min_time: float = 0.5, memory: bool = True):
+    """
+    Run benchmarks on contracts of each size.
+
+    :return: generator of dicts with results
+    """
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            text = generate_contract(size, seed)
+            text_size = len(text.encode('utf-8'))
+            for name in benchmarks:
+                function, prepare = BENCHMARKS[name]
+                argument = prepare(text, folder)
+                seconds = measure(function, argument, min_time)
+                yield {'benchmark': name,
+                       'size': format_size(size),
+                       'bytes': text_size,
+                       'seconds': seconds,
+                       'mb_per_sec': text_size / 2 ** 20 / seconds,
+                       'peak_mb': peak_memory(function, argument) / 2 ** 20 if memory else None}
+                del argument
+
+
+def scaling(results: list) -> dict:
+    """
+    Exponent of growth of time by size for each benchmark (1 - linear, 2 - quadratic),
+    slope of least squares line in log-log scale.
+    """
+    exponents = {}
+    for name in {result['benchmark'] for result in results}:
+        points = [(math.log(result['bytes']), math.log(result['seconds']))
+                  for result in results if result['benchmark'] == name]
+        if len(points) < 2:
+            continue
+        mean_x = sum(x for x, _ in points) / len(points)
+        mean_y = sum(y for _, y in points) / len(points)
+        variance = sum((x - mean_x) ** 2 for x, _ in points)
+        exponents[name] = sum((x - mean_x) * (y - mean_y) for x, y in points) / variance if variance else None
+    return exponents
+
+
+def compare(results: list, baseline: list, tolerance: float) -> list:
+    """
+    Compare results with baseline.
+
+    :return: list of tuples (<result>, <ratio of time to baseline time>, <is regression>)
+    """
+    baseline_results = {(result['benchmark'], result['size']): result for result in baseline}
+    comparison = []
+    for result in results:
+        base = baseline_results.get((result['benchmark'], result['size']))
+        if base is None:
+            continue
+        ratio = result['seconds'] / base['seconds']
+        comparison.append((result, ratio, ratio > 1 + tolerance))
+    return comparison
+
+
+def main():
+    args = arg_parser.parse_args()
+    sizes = [parse_size(size) for size in args.sizes.split(',')]
+    benchmarks = args.benchmarks.split(',') if args.benchmarks else list(BENCHMARKS)
+    for name in benchmarks:
+        if name not in BENCHMARKS:
+            arg_parser.error('unknown benchmark {}, expected one of {}'.format(name, ', '.join(BENCHMARKS)))
+
+    print('{:<16} {:>8} {:>12} {:>10} {:>10}'.format('benchmark', 'size', 'seconds', 'MB/sec', 'peak MB'))
+    results = []
+    for result in run(benchmarks, sizes, seed=args.seed, min_time=args.min_time, memory=not args.no_memory):
+        results.append(result)
+        print('{:<16} {:>8} {:>12.6f} {:>10.2f} {:>10}'.format(
+            result['benchmark'], result['size'], result['seconds'], result['mb_per_sec'],
+            '-' if result['peak_mb'] is None else '{:.2f}'.format(result['peak_mb'])))
+
+    exponents = scaling(results)
+    if exponents:
+        print('Scaling of time by size (1 - linear):')
+        for name in benchmarks:
+            if exponents.get(name) is not None:
+                print('  {:<16} {:.2f}'.format(name, exponents[name]))
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as out_file:
+            json.dump({'python': platform.python_version(), 'seed': args.seed,
+                       'results': results, 'scaling': exponents}, out_file, indent=1, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as input_file:
+            baseline = json.load(input_file)['results']
+        comparison = compare(results, baseline, args.tolerance)
+        print('Comparison with {}:'.format(args.baseline))
+        for result, ratio, is_regression in comparison:
+            print('  {:<16} {:>8} {:>8.2f}x {}'.format(result['benchmark'], result['size'], ratio,
+                                                       'REGRESSION' if is_regression else ''))
+        if any(is_regression for _, _, is_regression in comparison):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
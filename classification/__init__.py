@@ -0,0 +1,19 @@
+__all__ = ['LABELS', 'SectionDataset', 'build_dataset', 'iter_marks', 'prepare_text',
+           'FeatureCache', 'corpus_hash', 'stem_token', 'tokenize_text', 'tokenize_texts',
+           'tfidf_vectorizer', 'tfidf_features',
+           'CLUSTER_RANGES', 'ClusterScore', 'reduce_features', 'sweep_clusters',
+           'cross_validate', 'write_report',
+           'Embeddings', 'convert_glove',
+           'SectionClassifier', 'MicroBatcher', 'LatencyStats', 'save_model', 'document_sections',
+           'MinHasher', 'LSHIndex', 'dedupe', 'duplicate_groups', 'iter_sections',
+           'Match', 'SectionIndex', 'build_index', 'embed_text', 'hash_terms']
+
+from .dataset import LABELS, SectionDataset, build_dataset, iter_marks, prepare_text
+from .features import (FeatureCache, corpus_hash, stem_token, tokenize_text, tokenize_texts,
+                       tfidf_vectorizer, tfidf_features)
+from .clustering import CLUSTER_RANGES, ClusterScore, reduce_features, sweep_clusters
+from .evaluation import cross_validate, write_report
+from .embeddings import Embeddings, convert_glove
+from .inference import SectionClassifier, MicroBatcher, LatencyStats, save_model, document_sections
+from .dedup import MinHasher, LSHIndex, dedupe, duplicate_groups, iter_sections
+from .retrieval import Match, SectionIndex, build_index, embed_text, hash_terms
@@ -0,0 +1,132 @@
+import time
+import collections
+import concurrent.futures
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+from sklearn.metrics import silhouette_score
+from sklearn.metrics.pairwise import euclidean_distances
+from sklearn.preprocessing import Normalizer
+
+# range of count of clusters which is used by notebooks
+CLUSTER_RANGES = (25, 45)
+# silhouette is quadratic by count of rows, so it is computed on sample
+SILHOUETTE_SAMPLE = 2000
+
+ClusterScore = collections.namedtuple('ClusterScore', 'k inertia silhouette seconds silhouette_seconds labels')
+
+# features of worker process (sent once per worker)
+_features = None
+
+
+def reduce_features(matrix, components: int, *, random_state=None):
+    """
+    Reduce tf-idf matrix by truncated SVD, rows of result are normalized (LSA).
+
+    :param matrix: sparse matrix
+    :param components: int, count of components
+    :return: dense array with shape (<rows>, <components>)
+    """
+    svd = TruncatedSVD(n_components=components, random_state=random_state)
+    return Normalizer(copy=False).fit_transform(svd.fit_transform(matrix))
+
+
+def _score(features, model, k: int, fit_seconds: float, silhouette_sample: int, random_state) -> ClusterScore:
+    labels = model.labels_
+    silhouette = None
+    start_time = time.perf_counter()
+    if silhouette_sample and 1 < k < features.shape[0] and len(np.unique(labels)) > 1:
+        silhouette = float(silhouette_score(features, labels,
+                                            sample_size=min(silhouette_sample, features.shape[0]),
+                                            random_state=random_state))
+    return ClusterScore(k, float(model.inertia_), silhouette, fit_seconds,
+                        time.perf_counter() - start_time, labels)
+
+
+def _fit(features, k: int, init, batch_size: int, silhouette_sample: int, random_state) -> tuple:
+    start_time = time.perf_counter()
+    model = MiniBatchKMeans(n_clusters=k, init=init, n_init=1 if not isinstance(init, str) else 3,
+                            batch_size=batch_size, random_state=random_state)
+    model.fit(features)
+    score = _score(features, model, k, time.perf_counter() - start_time, silhouette_sample, random_state)
+    return score, model.cluster_centers_
+
+
+def _init_worker(features):
+    global _features
+    _features = features
+
+
+def _fit_in_worker(k: int, batch_size: int, silhouette_sample: int, random_state) -> ClusterScore:
+    score, _ = _fit(_features, k, 'k-means++', batch_size, silhouette_sample, random_state)
+    return score
+
+
+def _extend_centers(features, centers, count: int, rng):
+    """
+    Add centers to already found ones by k-means++ rule (far points are chosen more often).
+    """
+    new_centers = [np.asarray(centers)]
+    row_norms = np.asarray(features.multiply(features).sum(axis=1)).ravel() \
+        if hasattr(features, 'multiply') else np.einsum('ij,ij->i', features, features)
+    # squared distances to nearest center, updated only by added center
+    distances = np.maximum(euclidean_distances(features, new_centers[0], squared=True,
+                                               X_norm_squared=row_norms.reshape(-1, 1)).min(axis=1), 0)
+    for _ in range(count):
+        total = distances.sum()
+        pos = rng.choice(features.shape[0], p=distances / total) if total > 0 else rng.integers(features.shape[0])
+        row = features[pos]
+        row = row.toarray() if hasattr(row, 'toarray') else np.asarray(row).reshape(1, -1)
+        new_centers.append(row)
+        distances = np.minimum(distances, np.maximum(euclidean_distances(
+            features, row, squared=True, X_norm_squared=row_norms.reshape(-1, 1)).ravel(), 0))
+    return np.vstack(new_centers)
+
+
+def sweep_clusters(matrix, k_values=None, *, svd_components: int = 0, workers: int = 1,
+                   warm_start: bool = False, batch_size: int = 1024,
+                   silhouette_sample: int = SILHOUETTE_SAMPLE, random_state=None) -> list:
+    """
+    Cluster the same features with each count of clusters by mini-batch k-means.
+
+    :param matrix: features of texts (for example from tfidf_features), built once for all counts
+    :param k_values: iterable of counts of clusters, by default CLUSTER_RANGES
+    :param svd_components: int, reduce features by truncated SVD before clustering, in case 0 features are used as is
+    :param workers: int, count of processes, each count of clusters is fitted independently
+    :param warm_start: bool, fit counts one by one in current process, centers of previous count
+                       are used as initial centers of next count (workers are not used)
+    :param batch_size: int, size of mini batch
+    :param silhouette_sample: int, count of rows for silhouette score, in case 0 silhouette is not computed
+    :param random_state: int or None
+    :return: list of ClusterScore in order of counts of clusters
+    """
+    if k_values is None:
+        k_values = range(CLUSTER_RANGES[0], CLUSTER_RANGES[1] + 1)
+    k_values = sorted(k_values)
+    features = reduce_features(matrix, svd_components, random_state=random_state) if svd_components else matrix
+
+    if warm_start:
+        scores, centers = [], None
+        rng = np.random.default_rng(random_state)
+        for k in k_values:
+            if centers is None:
+                init = 'k-means++'
+            elif k > len(centers):
+                init = _extend_centers(features, centers, k - len(centers), rng)
+            else:
+                init = np.asarray(centers)[:k]
+            score, centers = _fit(features, k, init, batch_size, silhouette_sample, random_state)
+            scores.append(score)
+        return scores
+
+    if workers <= 1:
+        return [_fit(features, k, 'k-means++', batch_size, silhouette_sample, random_state)[0]
+                for k in k_values]
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                initializer=_init_worker,
+                                                initargs=(features,)) as pool:
+        futures = [pool.submit(_fit_in_worker, k, batch_size, silhouette_sample, random_state)
+                   for k in k_values]
+        return [future.result() for future in futures]
@@ -0,0 +1,241 @@
+import os
+import json
+
+import numpy as np
+
+# labels of marks in order which is used by notebooks (title - 0, header - 1, ...)
+LABELS = ['title', 'he', 'sub-he', 'plain']
+TEXTS_NAME = 'texts.bin'
+OFFSETS_NAME = 'offsets.i8'
+LABELS_NAME = 'labels.i4'
+FILES_NAME = 'files.i4'
+META_NAME = 'meta.json'
+READ_SIZE = 1 << 20
+# count of sections which are kept in memory while dataset is built
+WRITE_CHUNK = 1 << 14
+
+_decoder = json.JSONDecoder()
+
+
+class _JsonStream:
+    """
+    Incremental reader of json values from file (only one value is kept in memory).
+    """
+
+    def __init__(self, input_file, read_size: int = READ_SIZE):
+        self.__file = input_file
+        self.__read_size = read_size
+        self.__buffer = ''
+        self.__pos = 0
+        self.__eof = False
+
+    def __read(self) -> bool:
+        if self.__eof:
+            return False
+        chunk = self.__file.read(self.__read_size)
+        if not chunk:
+            self.__eof = True
+            return False
+        self.__buffer = self.__buffer[self.__pos:] + chunk
+        self.__pos = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Next non-space char, empty string at the end of file.
+        """
+        while True:
+            while self.__pos < len(self.__buffer) and self.__buffer[self.__pos].isspace():
+                self.__pos += 1
+            if self.__pos < len(self.__buffer) or not self.__read():
+                return self.__buffer[self.__pos:self.__pos + 1]
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError('expected one of {!r}, got {!r}'.format(chars, char))
+        self.__pos += 1
+        return char
+
+    def value(self):
+        """
+        Decode next json value.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.__buffer, self.__pos)
+            except json.JSONDecodeError:
+                if self.__read():
+                    continue
+                raise
+            # number may be cut by end of buffer
+            if end == len(self.__buffer) and self.__read():
+                continue
+            self.__pos = end
+            return value
+
+    def items(self):
+        """
+        Pairs (key, value) of json object, values are decoded by caller.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.expect('}')
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.expect(',}') == '}':
+                return
+
+
+def iter_marks(filename: str):
+    """
+    Read sections from file with schema {"files": {<name>: {"title": str, "marks": [[<flag>, <text>], ...]}}},
+    file is read incrementally.
+
+    :param filename: str, path to json file
+    :return: generator of tuples (<file name>, <flag>, <text>), title of file has flag 'title'
+    """
+    with open(filename, 'r', encoding='utf-8') as input_file:
+        stream = _JsonStream(input_file)
+        for key in stream.items():
+            if key != 'files':
+                stream.value()
+                continue
+            for name in stream.items():
+                file_data = stream.value()
+                if 'title' in file_data:
+                    yield name, 'title', file_data['title']
+                for flag, text in file_data.get('marks', []):
+                    yield name, flag, text
+
+
+def prepare_text(text: str) -> str:
+    """
+    Text of section in form which is used for training (lower case, without line breaks).
+    """
+    return text.lower().replace('\n', ' ')
+
+
+def build_dataset(filename: str, folder: str, *, labels: list = None):
+    """
+    Convert sections from json file to columnar dataset.
+
+    Texts are stored in one utf-8 file, offsets of texts, labels and files of sections
+    are stored in separate arrays, names of labels and files are stored in meta.json.
+
+    :param filename: str, path to json file (see iter_marks)
+    :param folder: str, output folder
+    :param labels: list of names of labels, unknown labels are added in order of appearance
+    :return: SectionDataset
+    """
+    os.makedirs(folder, exist_ok=True)
+    label_names = list(labels if labels is not None else LABELS)
+    label_codes = {name: code for code, name in enumerate(label_names)}
+    file_names, file_codes = [], {}
+
+    offsets, section_labels, section_files = [0], [], []
+    text_size = 0
+
+    def write_chunk():
+        offsets_file.write(np.asarray(offsets[1:], dtype='<i8').tobytes())
+        labels_file.write(np.asarray(section_labels, dtype='<i4').tobytes())
+        files_file.write(np.asarray(section_files, dtype='<i4').tobytes())
+        del offsets[1:], section_labels[:], section_files[:]
+
+    with open(os.path.join(folder, TEXTS_NAME), 'wb') as texts_file, \
+            open(os.path.join(folder, OFFSETS_NAME), 'wb') as offsets_file, \
+            open(os.path.join(folder, LABELS_NAME), 'wb') as labels_file, \
+            open(os.path.join(folder, FILES_NAME), 'wb') as files_file:
+        offsets_file.write(np.zeros(1, dtype='<i8').tobytes())
+        count = 0
+        for name, flag, text in iter_marks(filename):
+            if flag not in label_codes:
+                label_codes[flag] = len(label_names)
+                label_names.append(flag)
+            if name not in file_codes:
+                file_codes[name] = len(file_names)
+                file_names.append(name)
+
+            data = text.encode('utf-8', 'surrogatepass')
+            texts_file.write(data)
+            text_size += len(data)
+            offsets.append(text_size)
+            section_labels.append(label_codes[flag])
+            section_files.append(file_codes[name])
+            count += 1
+            if len(section_labels) >= WRITE_CHUNK:
+                write_chunk()
+        write_chunk()
+
+    with open(os.path.join(folder, META_NAME), 'w', encoding='utf-8') as out_file:
+        json.dump({'count': count, 'labels': label_names, 'files': file_names}, out_file)
+    return SectionDataset(folder)
+
+
+class SectionDataset:
+    """
+    Columnar dataset of sections, arrays and texts are memory-mapped.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        with open(os.path.join(folder, META_NAME), 'r', encoding='utf-8') as input_file:
+            meta = json.load(input_file)
+        self.label_names = meta['labels']
+        self.file_names = meta['files']
+        self.__count = meta['count']
+
+        def load(name: str, dtype: str, count: int):
+            path = os.path.join(folder, name)
+            # empty file can't be memory-mapped
+            if not count or not os.path.getsize(path):
+                return np.zeros(0, dtype=dtype)
+            return np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+
+        self.offsets = load(OFFSETS_NAME, '<i8', self.__count + 1)
+        self.labels = load(LABELS_NAME, '<i4', self.__count)
+        self.files = load(FILES_NAME, '<i4', self.__count)
+        self.__texts = load(TEXTS_NAME, 'u1', int(self.offsets[-1]) if self.__count else 0)
+
+    def __len__(self):
+        return self.__count
+
+    def text(self, pos: int) -> str:
+        return self.__texts[self.offsets[pos]:self.offsets[pos + 1]].tobytes().decode('utf-8', 'surrogatepass')
+
+    def texts(self, positions) -> list:
+        """
+        Texts of sections.
+
+        :param positions: iterable of positions of sections
+        :return: list of str
+        """
+        return [self.text(pos) for pos in positions]
+
+    def label_codes(self) -> dict:
+        return {name: code for code, name in enumerate(self.label_names)}
+
+    def iter_chunks(self, chunk_size: int = 1024, *, shuffle: bool = False, seed=None,
+                    transform=prepare_text):
+        """
+        Iterate over dataset by chunks, only one chunk of texts is kept in memory.
+
+        :param chunk_size: int, count of sections in chunk
+        :param shuffle: bool, iterate in random order
+        :param seed: seed of random order
+        :param transform: callable which is applied to each text, in case of None texts are not changed
+        :return: generator of tuples (<list of texts>, <array of labels>)
+        """
+        positions = np.arange(self.__count)
+        if shuffle:
+            np.random.default_rng(seed).shuffle(positions)
+        for start in range(0, self.__count, chunk_size):
+            chunk = positions[start:start + chunk_size]
+            texts = self.texts(chunk)
+            if transform is not None:
+                texts = [transform(text) for text in texts]
+            yield texts, np.asarray(self.labels[chunk])
@@ -0,0 +1,365 @@
+import os
+import re
+import json
+import zlib
+import functools
+
+import numpy as np
+
+from parser.batch import map_texts
+from classification.inference import document_sections
+
+# hashes of shingles are permuted modulo prime, so values of signatures fit to uint32
+HASH_PRIME = 4294967291  # biggest prime below 2 ** 32
+NUM_PERM = 128
+SHINGLE_SIZE = 5
+THRESHOLD = 0.8
+# count of items which are added to index before sorted bands are rebuilt
+MERGE_SIZE = 1 << 16
+SIGNATURES_NAME = 'signatures.npy'
+IDS_NAME = 'ids.json'
+META_NAME = 'meta.json'
+
+WORD = re.compile(r'\w+')
+_MULTIPLIER = np.uint64(1099511628211)
+
+
+@functools.lru_cache(maxsize=None)
+def lsh_params(threshold: float, num_perm: int) -> tuple:
+    """
+    Count of bands and rows in band which give the least sum of probabilities of false positive
+    (similarity below threshold) and false negative (similarity above threshold) candidates.
+
+    :return: tuple (<bands>, <rows>), bands * rows is not bigger than num_perm
+    """
+    below, above = np.linspace(0, threshold, 200), np.linspace(threshold, 1, 200)
+    best, best_error = (1, num_perm), np.inf
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            false_positive = np.mean(1 - (1 - below ** rows) ** bands) * threshold
+            false_negative = np.mean((1 - above ** rows) ** bands) * (1 - threshold)
+            if false_positive + false_negative < best_error:
+                best, best_error = (bands, rows), false_positive + false_negative
+    return best
+
+
+class MinHasher:
+    """
+    MinHash signatures of texts, shingles are sequences of shingle_size lowercase words.
+    Signatures of the same text are the same for the same num_perm and seed.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, shingle_size: int = SHINGLE_SIZE, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        generator = np.random.RandomState(seed)
+        self.a = generator.randint(1, HASH_PRIME, size=num_perm, dtype=np.uint64).reshape(-1, 1)
+        self.b = generator.randint(0, HASH_PRIME, size=num_perm, dtype=np.uint64).reshape(-1, 1)
+
+    def shingles(self, text: str) -> np.ndarray:
+        """
+        Hashes (uint32) of distinct shingles of text.
+        """
+        words = WORD.findall(text.lower())
+        if not words:
+            return np.zeros(0, dtype=np.uint64)
+        hashes = np.array([zlib.crc32(word.encode('utf-8', 'surrogatepass')) for word in words], dtype=np.uint64)
+        size = min(self.shingle_size, len(hashes))
+        # polynomial hash of each window of words (overflow is expected)
+        shingles = np.zeros(len(hashes) - size + 1, dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            for i in range(size):
+                shingles = shingles * _MULTIPLIER + hashes[i:len(hashes) - size + 1 + i]
+        shingles = (shingles ^ (shingles >> np.uint64(32))) & np.uint64(0xffffffff)
+        return np.unique(shingles)
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        MinHash signature of text (array of num_perm uint32), in case of text without words
+        all values are HASH_PRIME.
+        """
+        shingles = self.shingles(text)
+        if not len(shingles):
+            return np.full(self.num_perm, HASH_PRIME, dtype=np.uint32)
+        signature = np.full(self.num_perm, HASH_PRIME, dtype=np.uint64)
+        # shingles are hashed by chunks to limit memory
+        for start in range(0, len(shingles), 4096):
+            chunk = shingles[start:start + 4096].reshape(1, -1)
+            signature = np.minimum(signature, ((self.a * chunk + self.b) % np.uint64(HASH_PRIME)).min(axis=1))
+        return signature.astype(np.uint32)
+
+    def signatures(self, texts, *, workers: int = 1, chunksize: int = 256) -> np.ndarray:
+        """
+        Signatures of texts computed in pool of processes.
+
+        :return: array with shape (<count of texts>, num_perm)
+        """
+        signatures = list(map_texts(self.signature, texts, workers=workers, chunksize=chunksize))
+        if not signatures:
+            return np.zeros((0, self.num_perm), dtype=np.uint32)
+        return np.vstack(signatures)
+
+
+def similarity(first: np.ndarray, second: np.ndarray) -> float:
+    """
+    Estimation of Jaccard similarity of shingles of two texts by their signatures.
+    """
+    return float(np.mean(first == second))
+
+
+def _band_keys(signatures: np.ndarray, bands: int, rows: int) -> np.ndarray:
+    """
+    Hash of each band of signatures, array with shape (<count of signatures>, bands).
+    """
+    signatures = signatures[:, :bands * rows].astype(np.uint64).reshape(len(signatures), bands, rows)
+    keys = np.zeros((len(signatures), bands), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for row in range(rows):
+            keys = keys * _MULTIPLIER + signatures[:, :, row]
+    return keys
+
+
+def _is_empty(signature: np.ndarray) -> bool:
+    return bool(signature[0] == HASH_PRIME) and bool((signature == HASH_PRIME).all())
+
+
+class LSHIndex:
+    """
+    Index of MinHash signatures for search of near duplicates.
+
+    Each band of signatures is kept as sorted array of hashes of bands, so search is binary search,
+    new items are kept in buckets in memory and merged to sorted arrays by MERGE_SIZE items.
+    Index is saved to folder (signatures are memory-mapped on load).
+    """
+
+    def __init__(self, *, num_perm: int = NUM_PERM, threshold: float = THRESHOLD,
+                 shingle_size: int = SHINGLE_SIZE, seed: int = 1):
+        self.hasher = MinHasher(num_perm, shingle_size, seed)
+        self.threshold = threshold
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self.ids = []
+        self.__positions = {}
+        # rows after len(ids) are reserved for new items, capacity is doubled when array is full
+        self.__signatures = np.zeros((0, num_perm), dtype=np.uint32)
+        # sorted hashes of bands with positions of items
+        self.__sorted_keys = np.zeros((self.bands, 0), dtype=np.uint64)
+        self.__sorted_positions = np.zeros((self.bands, 0), dtype=np.int64)
+        # buckets of items which are not merged yet: band -> hash -> positions
+        self.__buckets = [{} for _ in range(self.bands)]
+        self.__unmerged = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, item_id):
+        return self.__key(item_id) in self.__positions
+
+    @staticmethod
+    def __key(item_id):
+        # ids are stored in json, so lists and tuples are the same ids
+        return tuple(item_id) if isinstance(item_id, (list, tuple)) else item_id
+
+    def signatures(self) -> np.ndarray:
+        return self.__signatures[:len(self.ids)]
+
+    def signature(self, item_id) -> np.ndarray:
+        return self.signatures()[self.__positions[self.__key(item_id)]]
+
+    def __candidates(self, keys: np.ndarray) -> set:
+        positions = set()
+        for band, key in enumerate(keys):
+            band_keys = self.__sorted_keys[band]
+            start = np.searchsorted(band_keys, key, side='left')
+            end = np.searchsorted(band_keys, key, side='right')
+            positions.update(self.__sorted_positions[band, start:end].tolist())
+            positions.update(self.__buckets[band].get(int(key), ()))
+        return positions
+
+    def query_signature(self, signature: np.ndarray) -> list:
+        """
+        Items which are similar to signature (estimated similarity is not less than threshold).
+
+        :return: list of tuples (<id of item>, <similarity>) sorted by similarity
+        """
+        if _is_empty(signature):
+            return []
+        keys = _band_keys(signature.reshape(1, -1), self.bands, self.rows)[0]
+        positions = sorted(self.__candidates(keys))
+        if not positions:
+            return []
+        similarities = np.mean(self.signatures()[positions] == signature, axis=1)
+        result = [(self.ids[pos], float(value)) for pos, value in zip(positions, similarities)
+                  if value >= self.threshold]
+        return sorted(result, key=lambda item: item[1], reverse=True)
+
+    def query(self, text: str) -> list:
+        """
+        Items which are near duplicates of text (see query_signature).
+        """
+        return self.query_signature(self.hasher.signature(text))
+
+    def add_signature(self, item_id, signature: np.ndarray):
+        """
+        Add item with already computed signature, ids of items must be unique.
+        """
+        key = self.__key(item_id)
+        if key in self.__positions:
+            raise ValueError('item {} is already in index'.format(item_id))
+        pos = len(self.ids)
+        if pos == len(self.__signatures):
+            # memory-mapped signatures of loaded index are copied on first add
+            signatures = np.zeros((max(2 * pos, 1024), self.hasher.num_perm), dtype=np.uint32)
+            signatures[:pos] = self.__signatures[:pos]
+            self.__signatures = signatures
+        self.__signatures[pos] = signature.reshape(-1)
+        self.ids.append(key)
+        self.__positions[key] = pos
+        if _is_empty(signature):
+            return
+        for band, band_key in enumerate(_band_keys(signature.reshape(1, -1), self.bands, self.rows)[0]):
+            self.__buckets[band].setdefault(int(band_key), []).append(pos)
+        self.__unmerged += 1
+        if self.__unmerged >= MERGE_SIZE:
+            self.merge()
+
+    def add(self, item_id, text: str) -> list:
+        """
+        Add text to index.
+
+        :param item_id: str or tuple (for example (<document id>, <opening line>, <closing line>))
+        :param text: str
+        :return: list of near duplicates which were in index before (see query)
+        """
+        signature = self.hasher.signature(text)
+        duplicates = self.query_signature(signature)
+        self.add_signature(item_id, signature)
+        return duplicates
+
+    def merge(self):
+        """
+        Move new items from buckets to sorted arrays.
+        """
+        self.__rebuild()
+
+    def __rebuild(self):
+        signatures = self.signatures()
+        positions = np.flatnonzero(~(signatures == HASH_PRIME).all(axis=1))
+        keys = _band_keys(signatures[positions], self.bands, self.rows).T
+        order = np.argsort(keys, axis=1, kind='stable')
+        self.__sorted_keys = np.take_along_axis(keys, order, axis=1)
+        self.__sorted_positions = positions[order]
+        self.__buckets = [{} for _ in range(self.bands)]
+        self.__unmerged = 0
+
+    def save(self, folder: str):
+        """
+        Save index to folder.
+        """
+        os.makedirs(folder, exist_ok=True)
+        np.save(os.path.join(folder, SIGNATURES_NAME), self.signatures())
+        with open(os.path.join(folder, IDS_NAME), 'w', encoding='utf-8') as out_file:
+            json.dump(self.ids, out_file)
+        with open(os.path.join(folder, META_NAME), 'w', encoding='utf-8') as out_file:
+            json.dump({'num_perm': self.hasher.num_perm, 'shingle_size': self.hasher.shingle_size,
+                       'seed': self.hasher.seed, 'threshold': self.threshold}, out_file)
+
+    @classmethod
+    def load(cls, folder: str):
+        """
+        Load index from folder, signatures are memory-mapped.
+        """
+        with open(os.path.join(folder, META_NAME), 'r', encoding='utf-8') as input_file:
+            index = cls(**json.load(input_file))
+        with open(os.path.join(folder, IDS_NAME), 'r', encoding='utf-8') as input_file:
+            index.ids = [cls.__key(item_id) for item_id in json.load(input_file)]
+        index.__positions = {item_id: pos for pos, item_id in enumerate(index.ids)}
+        index.__signatures = np.load(os.path.join(folder, SIGNATURES_NAME), mmap_mode='r')
+        index.__rebuild()
+        return index
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parents = np.arange(size)
+
+    def find(self, item: int) -> int:
+        parents = self.parents
+        root = item
+        while parents[root] != root:
+            root = parents[root]
+        while parents[item] != root:
+            parents[item], item = root, parents[item]
+        return root
+
+    def union(self, first: int, second: int):
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            # the earliest item is root of group
+            self.parents[max(first, second)] = min(first, second)
+
+
+def duplicate_groups(signatures: np.ndarray, *, threshold: float = THRESHOLD) -> np.ndarray:
+    """
+    Group near duplicates by signatures (bulk pass, items are grouped by sorting of bands).
+
+    Items which have the same band are joined with first item of bucket when
+    their estimated similarity is not less than threshold, so each bucket is checked in linear time.
+
+    :param signatures: array with shape (<count of items>, <num_perm>)
+    :param threshold: float, min similarity of near duplicates
+    :return: array with position of first item of group of each item
+    """
+    count, num_perm = signatures.shape
+    bands, rows = lsh_params(threshold, num_perm)
+    groups = _UnionFind(count)
+    positions = np.flatnonzero(~(signatures == HASH_PRIME).all(axis=1))
+    keys = _band_keys(signatures[positions], bands, rows)
+    for band in range(bands):
+        order = np.argsort(keys[:, band], kind='stable')
+        band_keys = keys[order, band]
+        # starts of runs of equal hashes
+        starts = np.flatnonzero(np.r_[True, band_keys[1:] != band_keys[:-1]])
+        ends = np.r_[starts[1:], len(band_keys)]
+        for start, end in zip(starts[ends - starts > 1], ends[ends - starts > 1]):
+            bucket = positions[order[start:end]]
+            similarities = np.mean(signatures[bucket[1:]] == signatures[bucket[0]], axis=1)
+            for pos in bucket[1:][similarities >= threshold]:
+                groups.union(int(bucket[0]), int(pos))
+    return np.array([groups.find(i) for i in range(count)], dtype=np.int64)
+
+
+def iter_sections(documents):
+    """
+    Sections of documents, documents are tagged by parser (see document_sections).
+
+    :param documents: iterable of tuples (<document id>, <text>)
+    :return: generator of tuples ((<document id>, <opening line>, <closing line>), <text of section>)
+    """
+    for doc_id, text in documents:
+        for op_pos, cl_pos, section_text in document_sections(text):
+            yield (doc_id, op_pos, cl_pos), section_text
+
+
+def dedupe(items, *, num_perm: int = NUM_PERM, threshold: float = THRESHOLD,
+           shingle_size: int = SHINGLE_SIZE, seed: int = 1, workers: int = 1) -> tuple:
+    """
+    Find near duplicates in corpus, the first item of each group of duplicates is kept.
+
+    :param items: iterable of tuples (<id of item>, <text>), for example iter_sections(documents)
+    :param workers: int, count of processes which compute signatures
+    :return: tuple (<list of ids of kept items>, <dict {<id of duplicate>: <id of kept item>}>)
+    """
+    ids = []
+
+    def texts():
+        # texts are not kept in memory, only their signatures
+        for item_id, text in items:
+            ids.append(item_id)
+            yield text
+
+    signatures = MinHasher(num_perm, shingle_size, seed).signatures(texts(), workers=workers)
+    groups = duplicate_groups(signatures, threshold=threshold)
+    kept = [item_id for pos, item_id in enumerate(ids) if groups[pos] == pos]
+    duplicates = {item_id: ids[groups[pos]] for pos, item_id in enumerate(ids) if groups[pos] != pos}
+    return kept, duplicates
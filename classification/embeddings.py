@@ -0,0 +1,116 @@
+import os
+
+import numpy as np
+
+VECTORS_SUFFIX = '.npy'
+VOCABULARY_SUFFIX = '.vocab'
+# count of lines which are converted at once
+CONVERT_CHUNK = 1 << 14
+
+
+def _glove_shape(filename: str) -> tuple:
+    count, dim = 0, 0
+    with open(filename, 'r', encoding='utf-8') as input_file:
+        for line in input_file:
+            if not dim:
+                dim = len(line.split()) - 1
+            count += 1
+    return count, dim
+
+
+def convert_glove(filename: str, prefix: str = '') -> str:
+    """
+    Convert GloVe text file to matrix of vectors (.npy) and vocabulary (word per line).
+
+    :param filename: str, path to GloVe file (for example glove.6B.100d.txt)
+    :param prefix: str, path to output files without suffix, by default path of GloVe file without extension
+    :return: str, prefix of output files (see Embeddings)
+    """
+    prefix = prefix or os.path.splitext(filename)[0]
+    count, dim = _glove_shape(filename)
+    vectors = np.lib.format.open_memmap(prefix + VECTORS_SUFFIX + '.tmp', mode='w+',
+                                        dtype='float32', shape=(count, dim))
+
+    with open(filename, 'r', encoding='utf-8') as input_file, \
+            open(prefix + VOCABULARY_SUFFIX + '.tmp', 'w', encoding='utf-8') as vocabulary_file:
+        row = 0
+        words, values = [], []
+
+        def write_chunk():
+            chunk = np.fromstring(' '.join(values), dtype='float32', sep=' ').reshape(len(words), dim)
+            vectors[row:row + len(words)] = chunk
+            vocabulary_file.write('\n'.join(words))
+            vocabulary_file.write('\n')
+
+        for line in input_file:
+            # word may contain spaces, so values are split from the end
+            word, *_ = line.rstrip('\n').rsplit(' ', dim)
+            words.append(word)
+            values.append(line[len(word) + 1:])
+            if len(words) == CONVERT_CHUNK:
+                write_chunk()
+                row += len(words)
+                words, values = [], []
+        if words:
+            write_chunk()
+
+    vectors.flush()
+    del vectors
+    os.replace(prefix + VECTORS_SUFFIX + '.tmp', prefix + VECTORS_SUFFIX)
+    os.replace(prefix + VOCABULARY_SUFFIX + '.tmp', prefix + VOCABULARY_SUFFIX)
+    return prefix
+
+
+class Embeddings:
+    """
+    Word vectors converted by convert_glove, matrix of vectors is memory-mapped.
+    """
+
+    def __init__(self, prefix: str):
+        self.vectors = np.load(prefix + VECTORS_SUFFIX, mmap_mode='r')
+        with open(prefix + VOCABULARY_SUFFIX, 'r', encoding='utf-8') as input_file:
+            words = input_file.read().split('\n')[:len(self.vectors)]
+        self.index = dict(zip(words, range(len(words))))
+
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1]
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, word: str):
+        return word in self.index
+
+    def __getitem__(self, word: str):
+        return self.vectors[self.index[word]]
+
+    def get(self, word: str, default=None):
+        pos = self.index.get(word)
+        return self.vectors[pos] if pos is not None else default
+
+    def embedding_matrix(self, word_index: dict, *, fill: str = 'random', random_state=None):
+        """
+        Matrix of embedding layer, row of word is its index from tokenizer.
+
+        :param word_index: dict {<word>: <index>} (for example Tokenizer.word_index)
+        :param fill: str, rows of words without vectors, 'random' - uniform in [0, 1) as in notebooks,
+                     'zeros' - zero vectors
+        :param random_state: int or None, seed of random rows
+        :return: array with shape (max(index) + 1, dim)
+        """
+        rows = max(word_index.values(), default=0) + 1
+        if fill == 'random':
+            matrix = np.random.default_rng(random_state).random((rows, self.dim))
+        elif fill == 'zeros':
+            matrix = np.zeros((rows, self.dim))
+        else:
+            raise ValueError('unknown fill {}, expected \'random\' or \'zeros\''.format(fill))
+
+        found = [(pos, self.index[word]) for word, pos in word_index.items() if word in self.index]
+        if found:
+            positions, vector_positions = np.array(found).T
+            # sorted reads are sequential for memory-mapped file
+            order = np.argsort(vector_positions)
+            matrix[positions[order]] = self.vectors[vector_positions[order]]
+        return matrix
@@ -0,0 +1,155 @@
+import json
+import time
+import numbers
+import concurrent.futures
+
+import numpy as np
+from sklearn.base import clone
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import KFold, StratifiedKFold
+
+# features of worker process (sent once per worker)
+_features = None
+
+
+def _is_fold_invariant(vectorizer) -> bool:
+    """
+    Counts of terms don't depend on fold when vocabulary is not limited by frequency of terms,
+    in this case vocabulary of fold is columns of terms which occur in train texts.
+    Float min_df and max_df are proportions of texts (1.0 min_df depends on fold),
+    weights of TfidfVectorizer depend on frequencies of terms in train texts.
+    """
+    if not isinstance(vectorizer, CountVectorizer) or isinstance(vectorizer, TfidfVectorizer):
+        return False
+    params = vectorizer.get_params()
+    min_df, max_df = params['min_df'], params['max_df']
+    return (params['vocabulary'] is None and params['max_features'] is None
+            and isinstance(min_df, numbers.Integral) and min_df <= 1
+            and not isinstance(max_df, numbers.Integral) and max_df >= 1.0)
+
+
+def _fold_features(features, vectorizer, train_index, test_index) -> tuple:
+    if vectorizer is None:
+        # cached counts, terms which don't occur in train texts are dropped
+        x_train = features[train_index]
+        terms = np.flatnonzero(x_train.getnnz(axis=0))
+        return x_train[:, terms], features[test_index][:, terms]
+    texts = features
+    vectorizer = clone(vectorizer)
+    return (vectorizer.fit_transform([texts[i] for i in train_index]),
+            vectorizer.transform([texts[i] for i in test_index]))
+
+
+def _run_fold(features, labels, estimator, vectorizer, fold: int, train_index, test_index) -> dict:
+    start_time = time.perf_counter()
+    x_train, x_test = _fold_features(features, vectorizer, train_index, test_index)
+    features_seconds = time.perf_counter() - start_time
+
+    model = clone(estimator)
+    start_time = time.perf_counter()
+    model.fit(x_train, labels[train_index])
+    fit_seconds = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    predicted = model.predict(x_test)
+    predict_seconds = time.perf_counter() - start_time
+
+    expected = labels[test_index]
+    return {'fold': fold,
+            'train_size': len(train_index),
+            'test_size': len(test_index),
+            'f1': float(f1_score(expected, predicted, average='macro')),
+            'accuracy': float(accuracy_score(expected, predicted)),
+            'features_seconds': features_seconds,
+            'fit_seconds': fit_seconds,
+            'predict_seconds': predict_seconds,
+            'predict_ms_per_text': predict_seconds * 1000 / max(len(test_index), 1)}
+
+
+def _init_worker(features, labels):
+    global _features
+    _features = features, labels
+
+
+def _run_fold_in_worker(estimator, vectorizer, fold: int, train_index, test_index) -> dict:
+    return _run_fold(_features[0], _features[1], estimator, vectorizer, fold, train_index, test_index)
+
+
+def _summary(folds: list) -> dict:
+    keys = ('f1', 'accuracy', 'features_seconds', 'fit_seconds', 'predict_seconds', 'predict_ms_per_text')
+    return {key: {'mean': float(np.mean([fold[key] for fold in folds])),
+                  'std': float(np.std([fold[key] for fold in folds]))}
+            for key in keys}
+
+
+def cross_validate(models: dict, texts, labels, *, vectorizer=None, n_splits: int = 10,
+                   shuffle: bool = True, stratified: bool = True, random_state=None,
+                   workers: int = 1, report_path: str = '') -> dict:
+    """
+    Evaluate models by k-fold cross-validation on the same folds.
+
+    Texts are converted to counts of terms by vectorizer, when counts don't depend on fold
+    (see _is_fold_invariant) texts are vectorized once for all folds and models,
+    otherwise vectorizer is fitted on train texts of each fold.
+
+    :param models: dict {<name>: <estimator>}, estimator takes counts of terms,
+                   for example Pipeline([('tfidf', TfidfTransformer()), ('mnb-clf', MultinomialNB())])
+    :param texts: list of str
+    :param labels: array of labels of texts
+    :param vectorizer: CountVectorizer, by default CountVectorizer()
+    :param n_splits: int, count of folds
+    :param shuffle: bool, shuffle texts before splitting
+    :param stratified: bool, keep proportions of labels in each fold
+    :param random_state: int or None, seed of shuffling
+    :param workers: int, count of processes, folds are evaluated in parallel
+    :param report_path: str, path to json report, in case of empty string report is not saved
+    :return: dict {<name>: {'folds': [<metrics of fold>, ...], 'summary': {<metric>: {'mean', 'std'}}}},
+             metrics are macro F1, accuracy and time of vectorization, fit and predict
+    """
+    texts, labels = list(texts), np.asarray(labels)
+    vectorizer = vectorizer if vectorizer is not None else CountVectorizer()
+    splitter_class = StratifiedKFold if stratified else KFold
+    splitter = splitter_class(n_splits=n_splits, shuffle=shuffle,
+                              random_state=random_state if shuffle else None)
+    splits = list(splitter.split(texts, labels))
+
+    if _is_fold_invariant(vectorizer):
+        features, fold_vectorizer = clone(vectorizer).fit_transform(texts).tocsr(), None
+    else:
+        features, fold_vectorizer = texts, vectorizer
+
+    jobs = [(name, fold, train_index, test_index)
+            for name in models
+            for fold, (train_index, test_index) in enumerate(splits)]
+    if workers <= 1:
+        results = [_run_fold(features, labels, models[name], fold_vectorizer, fold, train_index, test_index)
+                   for name, fold, train_index, test_index in jobs]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                    initializer=_init_worker,
+                                                    initargs=(features, labels)) as pool:
+            futures = [pool.submit(_run_fold_in_worker, models[name], fold_vectorizer,
+                                   fold, train_index, test_index)
+                       for name, fold, train_index, test_index in jobs]
+            results = [future.result() for future in futures]
+
+    report = {}
+    for (name, *_), result in zip(jobs, results):
+        report.setdefault(name, {'folds': []})['folds'].append(result)
+    for name in report:
+        report[name]['summary'] = _summary(report[name]['folds'])
+
+    if report_path:
+        write_report(report_path, report, n_splits=n_splits, shuffle=shuffle,
+                     stratified=stratified, random_state=random_state, texts=len(texts),
+                     cached_features=fold_vectorizer is None)
+    return report
+
+
+def write_report(path: str, report: dict, **params):
+    """
+    Save report of cross-validation with its parameters to json file.
+    """
+    with open(path, 'w', encoding='utf-8') as out_file:
+        json.dump({'params': params, 'models': report}, out_file, indent=1, sort_keys=True)
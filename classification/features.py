@@ -0,0 +1,171 @@
+import os
+import json
+import pickle
+import string
+import hashlib
+import functools
+
+import scipy.sparse
+from nltk import word_tokenize
+from nltk.stem import PorterStemmer
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from parser.batch import map_texts
+
+PUNCTUATION = str.maketrans('', '', string.punctuation)
+# count of distinct tokens which stems are kept in memory
+STEM_CACHE_SIZE = 1 << 18
+# limits of document frequency of terms which are used by notebooks
+MAX_DF = 0.5
+MIN_DF = 0.1
+
+_stemmer = PorterStemmer()
+
+
+@functools.lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem_token(token: str) -> str:
+    """
+    Porter stem of token, stems are memoized (vocabulary is much smaller than corpus).
+    """
+    return _stemmer.stem(token)
+
+
+def tokenize_text(text: str, *, stem: bool = True, lowercase: bool = True) -> list:
+    """
+    Split text to tokens without punctuation.
+
+    :param text: str
+    :param stem: bool, replace tokens by their stems
+    :param lowercase: bool, convert text to lower case before tokenization
+    :return: list of str
+    """
+    if lowercase:
+        text = text.lower()
+    tokens = word_tokenize(text.translate(PUNCTUATION))
+    if stem:
+        tokens = [stem_token(token) for token in tokens]
+    return tokens
+
+
+def tokenize_texts(texts, *, stem: bool = True, lowercase: bool = True,
+                   workers: int = 1, chunksize: int = 256) -> list:
+    """
+    Tokenize texts in pool of processes (see parser.map_texts).
+
+    :return: list of lists of tokens in order of texts
+    """
+    tokenize = functools.partial(tokenize_text, stem=stem, lowercase=lowercase)
+    return list(map_texts(tokenize, texts, workers=workers, chunksize=chunksize))
+
+
+def corpus_hash(texts, **params) -> str:
+    """
+    Hash of texts and parameters of their processing.
+
+    :param texts: iterable of str
+    :param params: json serializable parameters
+    :return: str, hex digest
+    """
+    content_hash = hashlib.sha1(json.dumps(params, sort_keys=True).encode('utf-8'))
+    for text in texts:
+        data = text.encode('utf-8', 'surrogatepass')
+        content_hash.update(len(data).to_bytes(8, 'little'))
+        content_hash.update(data)
+    return content_hash.hexdigest()
+
+
+def _analyze(stop_words: frozenset, tokens: list) -> list:
+    # stop words are removed after stemming as in TfidfVectorizer with custom tokenizer
+    return [token for token in tokens if token not in stop_words]
+
+
+def _dump(path: str, save):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as out_file:
+        save(out_file)
+    os.replace(tmp_path, path)
+
+
+class FeatureCache:
+    """
+    Tokenized texts and tf-idf matrices stored in folder, files are named by hash of texts
+    and parameters, so cache never returns features of another corpus.
+    """
+
+    def __init__(self, folder: str, *, workers: int = 1):
+        self.folder = folder
+        self.workers = workers
+        os.makedirs(folder, exist_ok=True)
+
+    def __path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.folder, key + suffix)
+
+    def tokens(self, texts: list, *, stem: bool = True, lowercase: bool = True) -> list:
+        """
+        Tokens of texts (see tokenize_text), texts are tokenized only once.
+
+        :param texts: list of str
+        :return: list of lists of tokens
+        """
+        key = corpus_hash(texts, stem=stem, lowercase=lowercase)
+        path = self.__path(key, '.tokens.pkl')
+        if os.path.isfile(path):
+            with open(path, 'rb') as input_file:
+                return pickle.load(input_file)
+        tokens = tokenize_texts(texts, stem=stem, lowercase=lowercase, workers=self.workers)
+        _dump(path, lambda out_file: pickle.dump(tokens, out_file, pickle.HIGHEST_PROTOCOL))
+        return tokens
+
+    def tfidf(self, texts: list, *, stem: bool = True, lowercase: bool = True,
+              stop_words=None, max_df=MAX_DF, min_df=MIN_DF) -> tuple:
+        """
+        Tf-idf matrix of texts, same as TfidfVectorizer with tokenizer tokenize_text.
+
+        :param texts: list of str
+        :param stop_words: iterable of words which are not used as terms
+        :param max_df: float or int, see TfidfVectorizer
+        :param min_df: float or int, see TfidfVectorizer
+        :return: tuple (<sparse matrix>, <fitted vectorizer which takes lists of tokens>)
+        """
+        stop_words = sorted(set(stop_words or ()))
+        key = corpus_hash(texts, stem=stem, lowercase=lowercase,
+                          stop_words=stop_words, max_df=max_df, min_df=min_df)
+        matrix_path, vectorizer_path = self.__path(key, '.tfidf.npz'), self.__path(key, '.vectorizer.pkl')
+        if os.path.isfile(matrix_path) and os.path.isfile(vectorizer_path):
+            with open(vectorizer_path, 'rb') as input_file:
+                vectorizer = pickle.load(input_file)
+            return scipy.sparse.load_npz(matrix_path), vectorizer
+
+        tokens = self.tokens(texts, stem=stem, lowercase=lowercase)
+        vectorizer = tfidf_vectorizer(stop_words=stop_words, max_df=max_df, min_df=min_df)
+        matrix = vectorizer.fit_transform(tokens)
+        _dump(matrix_path, lambda out_file: scipy.sparse.save_npz(out_file, matrix))
+        _dump(vectorizer_path, lambda out_file: pickle.dump(vectorizer, out_file, pickle.HIGHEST_PROTOCOL))
+        return matrix, vectorizer
+
+
+def tfidf_vectorizer(*, stop_words=None, max_df=MAX_DF, min_df=MIN_DF) -> TfidfVectorizer:
+    """
+    Vectorizer for already tokenized texts (see tokenize_texts).
+    """
+    analyzer = functools.partial(_analyze, frozenset(stop_words or ()))
+    return TfidfVectorizer(analyzer=analyzer, max_df=max_df, min_df=min_df)
+
+
+def tfidf_features(texts, *, cache_folder: str = '', workers: int = 1, **params) -> tuple:
+    """
+    Tf-idf matrix of texts, in case of cache folder tokens and matrix are reused by next calls.
+
+    :param texts: iterable of str
+    :param cache_folder: str, folder for cache, in case of empty string nothing is cached
+    :param workers: int, count of processes for tokenization
+    :param params: parameters of FeatureCache.tfidf
+    :return: tuple (<sparse matrix>, <fitted vectorizer which takes lists of tokens>)
+    """
+    texts = list(texts)
+    if cache_folder:
+        return FeatureCache(cache_folder, workers=workers).tfidf(texts, **params)
+    stem, lowercase = params.pop('stem', True), params.pop('lowercase', True)
+    vectorizer = tfidf_vectorizer(**params)
+    tokens = tokenize_texts(texts, stem=stem, lowercase=lowercase, workers=workers)
+    return vectorizer.fit_transform(tokens), vectorizer
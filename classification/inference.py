@@ -0,0 +1,178 @@
+import time
+import queue
+import pickle
+import threading
+import collections
+import concurrent.futures
+
+import numpy as np
+
+from parser import FileTags, tag_positions, build_tree
+
+# count of last requests which are used for percentiles of latency
+LATENCY_WINDOW = 10000
+
+
+def save_model(model, path: str, *, label_names: list = None):
+    """
+    Save model (for example Pipeline of vectorizer and classifier) which takes list of texts.
+
+    :param model: fitted estimator with method predict
+    :param path: str, path to file
+    :param label_names: list of names of labels (index is predicted label), for example SectionDataset.label_names
+    """
+    with open(path, 'wb') as out_file:
+        pickle.dump({'model': model, 'labels': label_names}, out_file, pickle.HIGHEST_PROTOCOL)
+
+
+def document_sections(text: str) -> list:
+    """
+    Sections of document, document is tagged in the same way as by generate_tree.
+
+    :param text: str, whole document
+    :return: list of tuples (<opening line>, <closing line>, <text of section>),
+             in case of document without sections whole document is one section,
+             empty document (without lines) has no sections
+    """
+    if not text or text.isspace():
+        return []
+    flags, lines = tag_positions(text)
+    tree = build_tree(flags)
+    positions = sorted(tree.tag_lines(FileTags.SECTION))
+    if not positions:
+        positions = [(0, len(lines) - 1)]
+    return [(op_pos, cl_pos, '\n'.join(lines[op_pos:cl_pos + 1])) for op_pos, cl_pos in positions]
+
+
+class SectionClassifier:
+    """
+    Model loaded from file which was saved by save_model.
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as input_file:
+            content = pickle.load(input_file)
+        if isinstance(content, dict) and 'model' in content:
+            self.model, self.label_names = content['model'], content.get('labels')
+        else:
+            self.model, self.label_names = content, None
+
+    def predict(self, texts: list) -> list:
+        """
+        Labels of texts (names of labels in case they were saved with model).
+        """
+        if not texts:
+            return []
+        labels = self.model.predict(texts)
+        if self.label_names:
+            return [self.label_names[int(label)] for label in labels]
+        return [label.item() if hasattr(label, 'item') else label for label in labels]
+
+
+class LatencyStats:
+    """
+    Counters of requests with percentiles of latency for last requests.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.__lock = threading.Lock()
+        self.__latencies = collections.deque(maxlen=window)
+        self.start_time = time.perf_counter()
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+
+    def add_batch(self, latencies: list, texts: int):
+        with self.__lock:
+            self.__latencies.extend(latencies)
+            self.requests += len(latencies)
+            self.texts += texts
+            self.batches += 1
+
+    def snapshot(self) -> dict:
+        with self.__lock:
+            latencies = np.array(self.__latencies)
+            requests, texts, batches = self.requests, self.texts, self.batches
+        elapsed = max(time.perf_counter() - self.start_time, 1e-9)
+        p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (0.0, 0.0)
+        return {'requests': requests,
+                'texts': texts,
+                'batches': batches,
+                'texts_per_batch': texts / batches if batches else 0.0,
+                'requests_per_sec': requests / elapsed,
+                'texts_per_sec': texts / elapsed,
+                'p50_ms': float(p50) * 1000,
+                'p99_ms': float(p99) * 1000}
+
+
+class MicroBatcher:
+    """
+    Group texts of concurrent requests to batches, each batch is predicted by one call.
+
+    Batch is predicted when it has max_batch texts or when max_wait seconds passed
+    from first request of batch.
+    """
+
+    def __init__(self, predict, *, max_batch: int = 64, max_wait: float = 0.005, stats: LatencyStats = None):
+        self.predict = predict
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.stats = stats if stats is not None else LatencyStats()
+        self.__requests = queue.Queue()
+        self.__thread = threading.Thread(target=self.__run, name='micro-batcher', daemon=True)
+        self.__thread.start()
+
+    def submit(self, texts: list) -> concurrent.futures.Future:
+        """
+        Add texts to next batch.
+
+        :param texts: list of str
+        :return: Future with list of labels
+        """
+        future = concurrent.futures.Future()
+        self.__requests.put((time.perf_counter(), list(texts), future))
+        return future
+
+    def classify(self, texts: list) -> list:
+        return self.submit(texts).result()
+
+    def close(self):
+        self.__requests.put(None)
+        self.__thread.join()
+
+    def __next_batch(self) -> tuple:
+        request = self.__requests.get()
+        if request is None:
+            return None, True
+        batch, size = [request], len(request[1])
+        deadline = request[0] + self.max_wait
+        while size < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            try:
+                request = self.__requests.get(timeout=timeout) if timeout > 0 else self.__requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                return batch, True
+            batch.append(request)
+            size += len(request[1])
+        return batch, False
+
+    def __run(self):
+        is_closed = False
+        while not is_closed:
+            batch, is_closed = self.__next_batch()
+            if not batch:
+                continue
+            texts = [text for _, request_texts, _ in batch for text in request_texts]
+            try:
+                labels = self.predict(texts)
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            pos, done_time = 0, time.perf_counter()
+            for _, request_texts, future in batch:
+                future.set_result(labels[pos:pos + len(request_texts)])
+                pos += len(request_texts)
+            self.stats.add_batch([done_time - start_time for start_time, _, _ in batch], len(texts))
@@ -0,0 +1,257 @@
+import os
+import re
+import json
+import zlib
+import functools
+import collections
+
+import numpy as np
+
+from parser.batch import map_texts
+from classification.dedup import iter_sections
+from classification.features import stem_token
+from classification.embeddings import Embeddings
+
+# count of columns of hashed term vectors
+N_FEATURES = 1 << 20
+# terms which are in bigger part of sections are not indexed (their lists of postings are the longest)
+MAX_DF = 0.5
+# count of candidates of sparse search which are reranked by dense vectors
+CANDIDATES = 100
+META_NAME = 'meta.json'
+DOCUMENTS_NAME = 'documents.json'
+SECTIONS_NAME = 'sections.npy'
+IDF_NAME = 'idf.npy'
+INDPTR_NAME = 'indptr.npy'
+POSTINGS_NAME = 'postings.npy'
+WEIGHTS_NAME = 'weights.npy'
+VECTORS_NAME = 'vectors.npy'
+
+WORD = re.compile(r'\w+')
+
+Match = collections.namedtuple('Match', 'document start end score')
+
+
+def hash_terms(text: str, *, n_features: int = N_FEATURES, stem: bool = True) -> tuple:
+    """
+    Hashed terms of text (lowercase words, stemmed by default).
+
+    :return: tuple (<sorted array of distinct columns of terms>, <array of their counts in text>)
+    """
+    words = WORD.findall(text.lower())
+    if stem:
+        words = [stem_token(word) for word in words]
+    columns = np.array([zlib.crc32(word.encode('utf-8', 'surrogatepass')) for word in words],
+                       dtype=np.int64) % n_features
+    columns, counts = np.unique(columns, return_counts=True)
+    return columns.astype(np.int32), counts.astype(np.int32)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_embeddings(prefix: str) -> Embeddings:
+    return Embeddings(prefix)
+
+
+def embed_text(embeddings: Embeddings, text: str) -> np.ndarray:
+    """
+    Mean of word vectors of text with unit norm, zero vector when there are no known words.
+    """
+    positions = [embeddings.index[word] for word in WORD.findall(text.lower()) if word in embeddings.index]
+    if not positions:
+        return np.zeros(embeddings.dim, dtype=np.float32)
+    # sorted reads are sequential for memory-mapped file
+    vector = np.asarray(embeddings.vectors[np.sort(positions)], dtype=np.float32).mean(axis=0)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _section_features(n_features: int, stem: bool, embeddings: str, text: str) -> tuple:
+    columns, counts = hash_terms(text, n_features=n_features, stem=stem)
+    vector = embed_text(_load_embeddings(embeddings), text) if embeddings else None
+    return columns, counts, vector
+
+
+def _tf(counts: np.ndarray) -> np.ndarray:
+    return 1 + np.log(counts, dtype=np.float32)
+
+
+def build_index(documents, folder: str, *, n_features: int = N_FEATURES, max_df: float = MAX_DF,
+                stem: bool = True, embeddings: str = '', workers: int = 1, chunksize: int = 256) -> int:
+    """
+    Build index of sections of documents for search of similar sections (see SectionIndex).
+
+    Sections are split by parser (see iter_sections), terms of sections are hashed to n_features
+    columns and weighted by tf-idf (sublinear tf, vectors have unit norm). Index is inverted:
+    list of postings (sections with weights) of each column in CSR layout, so search reads
+    only lists of terms of query.
+
+    :param documents: iterable of tuples (<document id>, <text>), documents are read once
+    :param folder: str, output folder
+    :param n_features: int, count of columns of hashed terms
+    :param max_df: float, terms which are in bigger part of sections are not indexed
+    :param stem: bool, replace words by their stems
+    :param embeddings: str, prefix of GloVe files converted by convert_glove, mean word vectors
+                       of sections are saved for reranking of candidates
+    :param workers: int, count of processes which split and hash sections
+    :return: int, count of indexed sections
+    """
+    doc_ids, doc_positions, spans = [], {}, []
+
+    def texts():
+        for (doc_id, op_pos, cl_pos), text in iter_sections(documents):
+            if doc_id not in doc_positions:
+                doc_positions[doc_id] = len(doc_ids)
+                doc_ids.append(doc_id)
+            spans.append((doc_positions[doc_id], op_pos, cl_pos))
+            yield text
+
+    features = functools.partial(_section_features, n_features, stem, embeddings)
+    columns, counts, sizes, vectors = [], [], [], []
+    for section_columns, section_counts, vector in map_texts(features, texts(), workers=workers,
+                                                             chunksize=chunksize):
+        columns.append(section_columns)
+        counts.append(section_counts)
+        sizes.append(len(section_columns))
+        if vector is not None:
+            vectors.append(vector)
+
+    count = len(sizes)
+    columns = np.concatenate(columns) if columns else np.zeros(0, dtype=np.int32)
+    counts = np.concatenate(counts) if counts else np.zeros(0, dtype=np.int32)
+    sections = np.repeat(np.arange(count, dtype=np.int32), sizes)
+
+    df = np.bincount(columns, minlength=n_features)
+    idf = (np.log((1 + count) / (1 + df)) + 1).astype(np.float32)
+    idf[df > max(max_df * count, 1)] = 0
+    weights = _tf(counts) * idf[columns]
+    indexed = weights > 0
+    columns, sections, weights = columns[indexed], sections[indexed], weights[indexed]
+    norms = np.sqrt(np.bincount(sections, weights=weights.astype(np.float64) ** 2, minlength=count))
+    weights /= norms[sections].astype(np.float32)
+
+    # postings of each column are sorted by decreasing weight, so search may read only head of list
+    order = np.lexsort((-weights, columns))
+    indptr = np.zeros(n_features + 1, dtype=np.int64)
+    np.cumsum(np.bincount(columns, minlength=n_features), out=indptr[1:])
+
+    os.makedirs(folder, exist_ok=True)
+    np.save(os.path.join(folder, IDF_NAME), idf)
+    np.save(os.path.join(folder, INDPTR_NAME), indptr)
+    np.save(os.path.join(folder, POSTINGS_NAME), sections[order])
+    np.save(os.path.join(folder, WEIGHTS_NAME), weights[order])
+    np.save(os.path.join(folder, SECTIONS_NAME), np.array(spans, dtype=np.int64).reshape(-1, 3))
+    if embeddings:
+        dim = _load_embeddings(embeddings).dim
+        np.save(os.path.join(folder, VECTORS_NAME),
+                np.vstack(vectors) if vectors else np.zeros((0, dim), dtype=np.float32))
+    with open(os.path.join(folder, DOCUMENTS_NAME), 'w', encoding='utf-8') as out_file:
+        json.dump(doc_ids, out_file)
+    with open(os.path.join(folder, META_NAME), 'w', encoding='utf-8') as out_file:
+        json.dump({'n_features': n_features, 'max_df': max_df, 'stem': stem, 'sections': count,
+                   'embeddings': embeddings}, out_file)
+    return count
+
+
+class SectionIndex:
+    """
+    Search of similar sections in index built by build_index, arrays of index are memory-mapped,
+    so only heads of lists of postings of terms of query are read from disk.
+    """
+
+    def __init__(self, folder: str, *, embeddings: str = None):
+        """
+        :param folder: str, folder of index
+        :param embeddings: str, prefix of GloVe files, by default prefix which was used by build_index
+        """
+        with open(os.path.join(folder, META_NAME), 'r', encoding='utf-8') as input_file:
+            self.meta = json.load(input_file)
+        with open(os.path.join(folder, DOCUMENTS_NAME), 'r', encoding='utf-8') as input_file:
+            self.documents = json.load(input_file)
+        self.idf = np.load(os.path.join(folder, IDF_NAME), mmap_mode='r')
+        self.indptr = np.load(os.path.join(folder, INDPTR_NAME), mmap_mode='r')
+        self.postings = np.load(os.path.join(folder, POSTINGS_NAME), mmap_mode='r')
+        self.weights = np.load(os.path.join(folder, WEIGHTS_NAME), mmap_mode='r')
+        self.sections = np.load(os.path.join(folder, SECTIONS_NAME), mmap_mode='r')
+        self.vectors = None
+        self.embeddings = None
+        vectors_path = os.path.join(folder, VECTORS_NAME)
+        embeddings = self.meta['embeddings'] if embeddings is None else embeddings
+        if embeddings and os.path.exists(vectors_path):
+            self.vectors = np.load(vectors_path, mmap_mode='r')
+            self.embeddings = _load_embeddings(embeddings)
+
+    def __len__(self):
+        return len(self.sections)
+
+    def section(self, pos: int) -> tuple:
+        """
+        :return: tuple (<document id>, <opening line>, <closing line>) of section
+        """
+        doc_pos, op_pos, cl_pos = self.sections[pos].tolist()
+        return self.documents[doc_pos], op_pos, cl_pos
+
+    def scores(self, text: str, *, max_postings: int = None) -> tuple:
+        """
+        Cosine similarities of tf-idf vectors of text and sections which have common terms with text.
+
+        :param text: str
+        :param max_postings: int, count of postings with the biggest weights which are read for each term
+                             (the rest of postings of common terms add little to similarities),
+                             by default scores are exact
+        :return: tuple (<array of positions of sections>, <array of similarities>)
+        """
+        columns, counts = hash_terms(text, n_features=self.meta['n_features'], stem=self.meta['stem'])
+        weights = _tf(counts) * self.idf[columns]
+        columns, weights = columns[weights > 0], weights[weights > 0]
+        if not len(columns):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        weights /= np.linalg.norm(weights)
+
+        scores = np.zeros(len(self), dtype=np.float32)
+        for weight, start, end in zip(weights, self.indptr[columns], self.indptr[columns + 1]):
+            if max_postings is not None:
+                end = min(end, start + max_postings)
+            # section is once in list of term, so scores are updated without np.add.at
+            scores[self.postings[start:end]] += weight * self.weights[start:end]
+        candidates = np.flatnonzero(scores)
+        return candidates, scores[candidates]
+
+    def search(self, text: str, k: int = 10, *, dense_weight: float = 0.0,
+               candidates: int = CANDIDATES, max_postings: int = None) -> list:
+        """
+        Sections which are the most similar to text.
+
+        :param text: str, text of clause
+        :param k: int, count of sections in result
+        :param dense_weight: float in [0, 1], weight of cosine similarity of mean word vectors,
+                             top candidates of tf-idf search are reranked by
+                             (1 - dense_weight) * <tf-idf similarity> + dense_weight * <dense similarity>
+                             (index must be built with embeddings)
+        :param candidates: int, count of candidates which are reranked (not less than k)
+        :param max_postings: int, count of postings which are read for each term (see scores)
+        :return: list of Match (document, start, end, score) sorted by score
+        """
+        positions, scores = self.scores(text, max_postings=max_postings)
+        if dense_weight:
+            if self.vectors is None:
+                raise ValueError('index has no vectors, build it with embeddings')
+            top = _top(scores, max(k, candidates))
+            positions, scores = positions[top], scores[top]
+            # sorted reads are sequential for memory-mapped file
+            order = np.argsort(positions)
+            positions, scores = positions[order], scores[order]
+            dense = self.vectors[positions] @ embed_text(self.embeddings, text)
+            scores = (1 - dense_weight) * scores + dense_weight * dense
+        top = _top(scores, k)
+        return [Match(*self.section(pos), float(score)) for pos, score in zip(positions[top], scores[top])]
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of k biggest scores in decreasing order of scores.
+    """
+    if len(scores) > k:
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind='stable')]
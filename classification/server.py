@@ -0,0 +1,156 @@
+import sys
+import json
+import argparse
+import collections
+import http.server
+
+from classification.inference import SectionClassifier, MicroBatcher, document_sections
+
+arg_parser = argparse.ArgumentParser(description='Classification of sections of contracts.')
+arg_parser.add_argument('--model',
+                        help='file with model saved by classification.inference.save_model',
+                        type=str,
+                        required=True)
+arg_parser.add_argument('--host',
+                        help='host of http server',
+                        type=str,
+                        default='127.0.0.1')
+arg_parser.add_argument('--port',
+                        help='port of http server',
+                        type=int,
+                        default=8000)
+arg_parser.add_argument('--stdin',
+                        help='classify paragraphs from stdin (one paragraph per line) instead of http server',
+                        action='store_true')
+arg_parser.add_argument('--max-batch',
+                        help='max count of texts in one batch',
+                        type=int,
+                        default=64)
+arg_parser.add_argument('--max-wait-ms',
+                        help='max time (in milliseconds) which request waits for other requests of batch',
+                        type=float,
+                        default=5.0)
+
+
+def classify_document(batcher: MicroBatcher, text: str) -> list:
+    """
+    Labels of sections of document.
+
+    :return: list of dicts {'lines': [<opening line>, <closing line>], 'label': <label>}
+    """
+    sections = document_sections(text)
+    labels = batcher.classify([section_text for _, _, section_text in sections])
+    return [{'lines': [op_pos, cl_pos], 'label': label}
+            for (op_pos, cl_pos, _), label in zip(sections, labels)]
+
+
+def request_texts(request) -> list:
+    """
+    Texts of request {"texts": [...]} or {"text": ...}.
+
+    :raises ValueError: in case of invalid request
+    """
+    if isinstance(request, dict) and 'texts' in request:
+        texts = request['texts']
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            raise ValueError('texts must be list of strings')
+        return texts
+    return [request_text(request)]
+
+
+def request_text(request) -> str:
+    """
+    Text of request {"text": ...}.
+
+    :raises ValueError: in case of invalid request
+    """
+    if not isinstance(request, dict) or 'text' not in request:
+        raise ValueError('request must be json object with text')
+    if not isinstance(request['text'], str):
+        raise ValueError('text must be string')
+    return request['text']
+
+
+def make_handler(batcher: MicroBatcher):
+    """
+    Handler of http requests:
+    POST /classify {"texts": [...]} or {"text": ...} - labels of paragraphs,
+    POST /classify-document {"text": ...} - labels of sections of whole document,
+    GET /stats - counters of requests and latency.
+    """
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def send_json(self, code: int, content):
+            data = json.dumps(content).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == '/stats':
+                self.send_json(200, batcher.stats.snapshot())
+            else:
+                self.send_json(404, {'error': 'unknown path'})
+
+        def do_POST(self):
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length).decode('utf-8'))
+                if self.path == '/classify':
+                    self.send_json(200, {'labels': batcher.classify(request_texts(request))})
+                elif self.path == '/classify-document':
+                    self.send_json(200, {'sections': classify_document(batcher, request_text(request))})
+                else:
+                    self.send_json(404, {'error': 'unknown path'})
+            except ValueError as e:
+                # invalid json, utf-8 or content of request
+                self.send_json(400, {'error': str(e)})
+            except Exception as e:
+                self.send_json(500, {'error': '{}: {}'.format(type(e).__name__, e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve_stdin(batcher: MicroBatcher, input_file=sys.stdin, out_file=sys.stdout):
+    """
+    Classify paragraphs from input file (one per line), labels are printed in order of lines.
+    """
+    in_flight = collections.deque()
+    for line in input_file:
+        in_flight.append(batcher.submit([line.rstrip('\n')]))
+        while in_flight and in_flight[0].done():
+            print(in_flight.popleft().result()[0], file=out_file)
+    while in_flight:
+        print(in_flight.popleft().result()[0], file=out_file)
+
+
+def main():
+    args = arg_parser.parse_args()
+    classifier = SectionClassifier(args.model)
+    batcher = MicroBatcher(classifier.predict, max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000)
+    try:
+        if args.stdin:
+            serve_stdin(batcher)
+            print(json.dumps(batcher.stats.snapshot()), file=sys.stderr)
+            return
+        server = http.server.ThreadingHTTPServer((args.host, args.port), make_handler(batcher))
+        print('Serving on http://{}:{}'.format(args.host, args.port))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    finally:
+        batcher.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,21 @@
 import os
-import queue
+import sys
+import json
+import time
+import heapq
+import signal
+import asyncio
+import functools
+import contextlib
+import itertools
+import threading
+import collections
 import argparse
-import docx2txt
-from bs4 import BeautifulSoup
+import concurrent.futures
 
-from parser import FileTags, parse_raw_text
+from parser import FileTags, Profile, iter_tagged_lines, tag_positions, parse_raw_text, parser_version
+from ingest import (Manifest, ShardWriter, file_record, is_same_file,
+                    extractor_extensions, extract_lines, extractor_timings)
 
 # All data loaded from lawinsider.com
 # contracts link: https://www.lawinsider.com/educations
@@ -29,12 +40,54 @@ arg_parser.add_argument('--color',
                         help='enable color output (works only in terminal)',
                         type=bool,
                         default=False)
+arg_parser.add_argument('--force',
+                        help='parse all files from folder even if they were not changed from last run',
+                        action='store_true')
+arg_parser.add_argument('--no-clean-output',
+                        help='do not save clean texts (without tags) to output folder',
+                        action='store_true')
+arg_parser.add_argument('--no-follow-symlinks',
+                        help='do not parse files from folders behind symlinks',
+                        action='store_true')
+arg_parser.add_argument('--workers',
+                        help='count of processes which will parse files from folder',
+                        type=int,
+                        default=1)
+arg_parser.add_argument('--format',
+                        help='format of tagged texts: text files with tags or binary shards with tags of lines',
+                        choices=['text', 'shards'],
+                        default='text')
+arg_parser.add_argument('--io-workers',
+                        help='parse folder by asyncio pipeline with this count of concurrent reads and writes '
+                             '(--workers is count of processes which tag texts)',
+                        type=int,
+                        default=0)
+arg_parser.add_argument('--watch',
+                        help='keep running and parse new or changed files from folder',
+                        action='store_true')
+arg_parser.add_argument('--interval',
+                        help='interval (in seconds) between scans of folder in watch mode',
+                        type=float,
+                        default=2.0)
+arg_parser.add_argument('--profile',
+                        help='measure time of each stage of parsing and print slowest files',
+                        action='store_true')
+arg_parser.add_argument('--profile-top',
+                        help='count of slowest files in profile report',
+                        type=int,
+                        default=10)
+arg_parser.add_argument('--profile-output',
+                        help='save profile report to json file',
+                        type=str,
+                        default='')
 
 # default params for execute
 DATA_FOLDER, PARSED_DATA_FOLDER = '', ''
 DATA_SIZE = 10
-FILE_TYPES = ['.docx', '.txt']
+FILE_TYPES = extractor_extensions()
 TAGS = FileTags(enable_colors=False)
+# size of buffer for output files
+WRITE_BUFFER_SIZE = 1 << 20
 
 
 def read_text(filename: str) -> str:
@@ -44,134 +97,873 @@ def read_text(filename: str) -> str:
     :param filename: string
     :return: string with readable text.
     """
+    return ''.join(extract_lines(filename))
 
-    # getting cute text from .html
-    if filename.endswith('.html'):
-        # getting file content
-        with open(filename, 'r', encoding='utf-8') as input_file:
-            content = input_file.read()
-        soup = BeautifulSoup(content, 'html.parser')
-        text = soup.get_text()
 
-    elif filename.endswith('.docx'):
-        text = docx2txt.process(filename)
+def _scan_folder(data_folder: str, suffixes: frozenset, count_of_files: int, follow_symlinks: bool):
+    folders = collections.deque([data_folder])
+    visited = set()
+    if follow_symlinks:
+        stat = os.stat(data_folder)
+        visited.add((stat.st_dev, stat.st_ino))
 
-    else:
-        # getting file content
-        with open(filename, 'r', encoding='utf-8') as input_file:
-            content = input_file.read()
-        text = content
-    return text
+    files_count = 0
+    while folders:
+        curr_folder = folders.popleft()
+        try:
+            entries = os.scandir(curr_folder)
+        except OSError:
+            # skip folders which can't be read
+            continue
+        with entries:
+            for entry in entries:
+                # case entry is folder
+                if entry.is_dir(follow_symlinks=follow_symlinks):
+                    if follow_symlinks:
+                        # checks for cycles of symlinks
+                        stat = entry.stat()
+                        if (stat.st_dev, stat.st_ino) in visited:
+                            continue
+                        visited.add((stat.st_dev, stat.st_ino))
+                    folders.append(entry.path)
+                    continue
+                # case entry is some file
+                name = entry.name
+                if name[name.rfind('.'):] in suffixes and entry.is_file():
+                    yield entry.path
+                    files_count += 1
+                    # checks if enough files
+                    if files_count == count_of_files:
+                        return
 
 
 def get_files_in_folder(data_folder: str,
                         file_extensions: list,
-                        count_of_files: int = -1) -> list:
+                        count_of_files: int = -1,
+                        *,
+                        follow_symlinks: bool = True):
     """
     Get all files with extensions from folder(and all subfolders).
+    Folders are scanned lazily (breadth-first), so files can be processed while scan is in progress.
 
     :param data_folder: str, path to folder
-    :param file_extensions: list of strings
-    :param count_of_files: int, max size of output list of files, in case -1 return all files
-    :return: list of files which have specific extensions
+    :param file_extensions: list of strings (suffixes which start with dot, for example '.txt')
+    :param count_of_files: int, max count of files, in case -1 return all files
+    :param follow_symlinks: bool, scan folders behind symlinks (each folder is scanned once, so cycles are skipped)
+    :return: generator of files which have specific extensions
     """
     # check for existing folder
     if not os.path.isdir(data_folder):
         raise FileNotFoundError
 
-    def is_valid_file(extensions, filename):
-        """
-        Checks does filename matches extensions.
-        """
-        for f_ext in extensions:
-            if filename.endswith(f_ext):
-                return True
-        return False
-
-    sub_folders = queue.Queue()
-    sub_folders.put(data_folder)
-    files = []
-    while not sub_folders.empty():
-        curr_folder = sub_folders.get()
-        for f in os.listdir(curr_folder):
-            full_f = os.path.join(curr_folder, f)
-            # case f is folder
-            if os.path.isdir(full_f):
-                sub_folders.put(full_f)
-            # case f is some file
-            if is_valid_file(file_extensions, f):
-                files.append(full_f)
-            # checks if files list is overfilled
-            if count_of_files:
-                if len(files) == count_of_files:
-                    return files
-    return files
+    return _scan_folder(data_folder, frozenset(file_extensions), count_of_files, follow_symlinks)
 
 
-def main():
-    global DATA_FOLDER, PARSED_DATA_FOLDER, DATA_SIZE
-    global TAGS, arg_parser
+def read_lines(filename: str):
+    """
+    Read lines from files with extensions which marked in FILE_TYPES,
+    text files (and word documents) are read line by line.
 
-    args = arg_parser.parse_args()
-    DATA_FOLDER, PARSED_DATA_FOLDER = args.folder, args.output
-    DATA_SIZE = args.size
-    TAGS = FileTags(enable_colors=args.color)
+    :param filename: string
+    :return: iterable of lines (with line breaks)
+    """
+    return extract_lines(filename)
 
-    def parse_one_file(filename, *, to_file=''):
-        global TAGS
-        # parsing file
-        text = read_text(filename)
-        parsed_text = parse_raw_text(text)
-        if to_file:
-            # saving to file
 
-            with open(to_file, 'w', encoding='utf-8') as out_file:
-                out_file.write(parsed_text)
-        else:
-            print(parsed_text)
+def write_lines(out_file, first_line: str, lines):
+    """
+    Write lines separated by line breaks (without line break after last line).
+    """
+    out_file.write(first_line)
+    for line in lines:
+        out_file.write('\n')
+        out_file.write(line)
+
+
+def _timed_write(profile: Profile, out_file, first_line: str, lines):
+    if profile is None:
+        write_lines(out_file, first_line, lines)
+        return
+    with profile.stage('write'):
+        write_lines(out_file, first_line, lines)
+
+
+@contextlib.contextmanager
+def replaced_file(path: str):
+    """
+    Open text file for writing, file is written to temporary path and renamed when it is closed,
+    so file is not created (or old file is kept) in case of error.
+
+    :param path: str, path to output file
+    """
+    tmp_path = path + '.tmp'
+    out_file = open(tmp_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE)
+    try:
+        with out_file:
+            yield out_file
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+
+def copy_lines(lines, out_file):
+    """
+    Write lines to file while they are passed through.
+    """
+    for line in lines:
+        out_file.write(line)
+        yield line
+
+
+def parse_lines(lines, *, to_file='', profile: Profile = None):
+    """
+    Tag lines, result will be printed to stdout or saved to file.
+    File is written to temporary path and renamed when all lines are tagged,
+    so file is not created in case of error.
+
+    :param lines: iterable of lines
+    :param to_file: str, path to output file, in case of empty string result will be printed
+    :param profile: Profile, time of stages is added to it
+    """
+    # lines are tagged only after all lines were read
+    tagged_lines = iter_tagged_lines(lines, profile=profile)
+    first_line = next(tagged_lines)
+    if to_file:
+        # saving to file
+        with replaced_file(to_file) as out_file:
+            _timed_write(profile, out_file, first_line, tagged_lines)
+    else:
+        _timed_write(profile, sys.stdout, first_line, tagged_lines)
+        sys.stdout.write('\n')
+
+
+def parse_one_file(filename, *, to_file=''):
+    """
+    Read and tag file, result will be printed to stdout or saved to file.
+
+    :param filename: str, path to file
+    :param to_file: str, path to output file, in case of empty string result will be printed
+    """
+    parse_lines(read_lines(filename), to_file=to_file)
+
+
+def output_filename(path_to_file: str) -> str:
+    """
+    Name of clean and tagged files for file with data.
+
+    :param path_to_file: str, path to file with data
+    :return: str, name of output file
+    """
+    # remove path from file
+    _, filename = path_to_file.rsplit('/', 1)
+    # remove extension (for example '.html' or '.docx')
+    filename, _ = filename.split('.', 1)
+    return filename + '.txt'
+
 
-    def parse_folder(directory, file_types, size, output_folder):
-        paths_to_data_files = get_files_in_folder(directory, file_types, size)
+def process_file(path_to_file: str, output_clean: str, output_parsed: str, *, profile: Profile = None) -> int:
+    """
+    Save clean and tagged text of file to output folders.
+    File is read once, clean text is saved while lines are passed to tagger.
+
+    :param path_to_file: str, path to file with data
+    :param output_clean: str, folder for clean texts, in case of empty string clean text is not saved
+    :param output_parsed: str, folder for tagged texts
+    :param profile: Profile, time of stages and size of input and output are added to it
+    :return: int, size of processed file in bytes
+    """
+    filename = output_filename(path_to_file)
+    path_to_parsed = os.path.join(output_parsed, filename)
+
+    if profile is not None:
+        profile.add('bytes in', os.path.getsize(path_to_file))
+    lines = read_lines(path_to_file)
+    if profile is not None:
+        lines = profile.iter('read', lines)
+
+    if not output_clean:
+        parse_lines(lines, to_file=path_to_parsed, profile=profile)
+    else:
+        path_to_clean = os.path.join(output_clean, filename)
+        is_read = []
+
+        def read_all():
+            yield from lines
+            is_read.append(True)
+
+        source = read_all()
+        # clean text is written to temporary path, it is kept only when whole file was read
+        tmp_path = path_to_clean + '.tmp'
+        clean_file = open(tmp_path, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE)
+        try:
+            with clean_file:
+                copied_lines = copy_lines(source, clean_file)
+                if profile is not None:
+                    copied_lines = profile.iter('write', copied_lines)
+                try:
+                    parse_lines(copied_lines, to_file=path_to_parsed, profile=profile)
+                finally:
+                    # clean text is saved even if text can't be tagged
+                    for line in source:
+                        clean_file.write(line)
+        finally:
+            if is_read:
+                os.replace(tmp_path, path_to_clean)
+            else:
+                os.remove(tmp_path)
+        if profile is not None:
+            profile.add('bytes out', os.path.getsize(path_to_clean))
+    if profile is not None:
+        profile.add('bytes out', os.path.getsize(path_to_parsed))
+    return os.path.getsize(path_to_file)
+
+
+def tag_file(path_to_file: str, output_clean: str, *, profile: Profile = None) -> tuple:
+    """
+    Tag file for shards, clean text is saved to output folder.
+
+    :param path_to_file: str, path to file with data
+    :param output_clean: str, folder for clean texts, in case of empty string clean text is not saved
+    :param profile: Profile, time of stages and size of input are added to it
+    :return: tuple (size of file in bytes, lines, TagFlags)
+    """
+    file_size = os.path.getsize(path_to_file)
+    if profile is not None:
+        profile.add('bytes in', file_size)
+        with profile.stage('read'):
+            text = read_text(path_to_file)
+    else:
+        text = read_text(path_to_file)
+    if output_clean:
+        path_to_clean = os.path.join(output_clean, output_filename(path_to_file))
+        with replaced_file(path_to_clean) as clean_file:
+            if profile is not None:
+                with profile.stage('write'):
+                    clean_file.write(text)
+            else:
+                clean_file.write(text)
+    flags, lines = tag_positions(text, profile=profile)
+    return file_size, lines, flags
+
+
+def _process_file_job(path_to_file: str, output_clean: str, output_parsed: str, profile: bool = False) -> tuple:
+    """
+    Process file and collect time spent by extractors of text.
+
+    Record of file for manifest is taken before file is read, in case file was changed
+    while it was parsed record is not returned (file will be parsed again).
 
-        # check for existing parsed data folder
-        if not os.path.exists(output_folder) or not os.path.isdir(output_folder):
-            os.makedirs(output_folder)
+    :param output_parsed: str, folder for tagged texts, in case of empty string
+                          lines and tags are returned for shards
+    :param profile: bool, measure time of stages of parsing
+    :return: tuple (size of file in bytes, timings of extractors, None or tuple (lines, TagFlags), None or Profile,
+                    None or record of file (see file_record))
+    """
+    record = file_record(path_to_file)
+    file_profile = Profile() if profile else None
+    document = None
+    if not output_parsed:
+        file_size, lines, flags = tag_file(path_to_file, output_clean, profile=file_profile)
+        document = (lines, flags)
+    else:
+        file_size = process_file(path_to_file, output_clean, output_parsed, profile=file_profile)
+    if not is_same_file(record, path_to_file):
+        record = None
+    return file_size, extractor_timings(reset=True), document, file_profile, record
+
+
+def _init_worker(enable_colors: bool):
+    """
+    Set up tags in worker process in the same way as in main process.
+    """
+    global TAGS
+    TAGS = FileTags(enable_colors=enable_colors)
 
-        # create folder for clean texts
-        output_clean = os.path.join(output_folder, 'clean')
-        if not os.path.exists(output_clean):
-            os.makedirs(output_clean)
 
-        # create folder for parsed texts
+def _init_watch_worker(enable_colors: bool):
+    """
+    Set up worker of watch mode, workers are stopped by main process (not by Ctrl+C).
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _init_worker(enable_colors)
+
+
+def _process_in_pool(paths_to_files, output_clean, output_parsed, workers, on_done, enable_colors=False,
+                     profile=False):
+    """
+    Process files in pool of processes with bounded count of files in flight.
+
+    :param paths_to_files: iterable of paths to files
+    :param output_clean: str, folder for clean texts
+    :param output_parsed: str, folder for tagged texts, in case of empty string tags are returned for shards
+    :param workers: int, count of processes
+    :param on_done: callable with arguments (path to file, result of _process_file_job, exception or None)
+    :param enable_colors: bool, enable colors of tags in worker processes
+    :param profile: bool, measure time of stages of parsing
+    """
+    max_in_flight = workers * 2
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                initializer=_init_worker,
+                                                initargs=(enable_colors,)) as pool:
+        in_flight = {}
+
+        def collect(done):
+            for future in done:
+                path_to_file = in_flight.pop(future)
+                # only errors of file are passed to on_done, errors of on_done stop parsing (as in one process)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    on_done(path_to_file, None, e)
+                    continue
+                on_done(path_to_file, result, None)
+
+        for path_to_file in paths_to_files:
+            # wait for some file in case of full pool
+            if len(in_flight) >= max_in_flight:
+                done, _ = concurrent.futures.wait(in_flight,
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                collect(done)
+            future = pool.submit(_process_file_job, path_to_file, output_clean, output_parsed, profile)
+            in_flight[future] = path_to_file
+        collect(concurrent.futures.as_completed(list(in_flight)))
+
+
+def _prepare_output(output_folder: str, clean_output: bool, output_format: str) -> tuple:
+    """
+    Create output folders.
+
+    :return: tuple (<folder for clean texts or empty string>, <folder for tagged texts or empty string>,
+                    <ShardWriter or None>)
+    """
+    # check for existing parsed data folder
+    if not os.path.exists(output_folder) or not os.path.isdir(output_folder):
+        os.makedirs(output_folder)
+
+    # create folder for clean texts
+    output_clean = os.path.join(output_folder, 'clean') if clean_output else ''
+    if output_clean and not os.path.exists(output_clean):
+        os.makedirs(output_clean)
+
+    # create folder for parsed texts
+    output_parsed, shards = '', None
+    if output_format == 'shards':
+        shards = ShardWriter(os.path.join(output_folder, 'shards'))
+    else:
         output_parsed = os.path.join(output_folder, 'parsed')
         if not os.path.exists(output_parsed):
             os.makedirs(output_parsed)
+    return output_clean, output_parsed, shards
+
+
+def _load_manifest(output_folder: str, force: bool, enable_colors: bool, output_format: str) -> Manifest:
+    """
+    Records about files from previous runs with the same options of output.
+
+    :param force: bool, all files are parsed again, so records are not loaded
+    """
+    manifest = Manifest(output_folder, parser_version(),
+                        options={'colors': bool(enable_colors), 'format': output_format})
+    return manifest if force else manifest.load()
+
 
-        # parsing files
-        print('Parsing {} files from \'{}\' to \'{}\':'.format(
-            size if size > 0 else 'all', directory, output_folder))
+def _needs_parsing(manifest: Manifest, key: str, path_to_file: str, output_clean: str, output_parsed: str,
+                   shards=None) -> bool:
+    """
+    Check that file was changed from last run or some of its outputs is missing (output may be removed by user).
+
+    :param output_clean: str, folder for clean texts, in case of empty string clean text is not checked
+    :param output_parsed: str, folder for tagged texts, it is not checked when shards are written
+    :param shards: ShardWriter or None, documents which are not flushed yet are not missing
+    """
+    if manifest.is_changed(key, path_to_file):
+        return True
+    filename = output_filename(path_to_file)
+    if output_clean and not os.path.isfile(os.path.join(output_clean, filename)):
+        return True
+    if shards is not None:
+        return key not in shards
+    return not os.path.isfile(os.path.join(output_parsed, filename))
+
+
+def parse_folder(directory: str, file_types: list, size: int, output_folder: str, *,
+                 workers: int = 1, enable_colors: bool = False, force: bool = False,
+                 clean_output: bool = True, follow_symlinks: bool = True, output_format: str = 'text',
+                 profile: bool = False, profile_top: int = 10, profile_output: str = ''):
+    """
+    Clean and tag files from folder.
+
+    :param directory: str, folder with data
+    :param file_types: list of extensions of files which will be parsed
+    :param size: int, count of files which will be parsed, in case -1 parse all files
+    :param output_folder: str, folder for parsed data
+    :param workers: int, count of processes, in case 1 files parsed in current process
+    :param enable_colors: bool, enable colors of tags in worker processes
+    :param force: bool, parse files which were not changed from last run (see manifest in output folder)
+    :param clean_output: bool, save clean texts (without tags) to output folder
+    :param follow_symlinks: bool, parse files from folders behind symlinks
+    :param output_format: str, 'text' - tagged texts are saved to files,
+                          'shards' - lines and tags of all files are packed to shards (see ShardWriter)
+    :param profile: bool, measure time of each stage of parsing and print report (see print_profile)
+    :param profile_top: int, count of slowest files in profile report
+    :param profile_output: str, path to json file for profile report, in case of empty string report is only printed
+    :return: list of tuples (path to file, exception) for files which failed
+    """
+    paths_to_data_files = get_files_in_folder(directory, file_types, size,
+                                              follow_symlinks=follow_symlinks)
+
+    output_clean, output_parsed, shards = _prepare_output(output_folder, clean_output, output_format)
+
+    # records about files from previous runs
+    manifest = _load_manifest(output_folder, force, enable_colors, output_format)
+    all_keys = {}
+
+    def is_changed(path_to_file):
+        key = os.path.relpath(path_to_file, directory)
+        all_keys[path_to_file] = key
+        return _needs_parsing(manifest, key, path_to_file, output_clean, output_parsed, shards)
+
+    # files are parsed while folder is scanned
+    paths_to_data_files = (path for path in paths_to_data_files if is_changed(path))
+
+    # parsing files
+    print('Parsing {} files from \'{}\' to \'{}\':'.format(
+        size if size > 0 else 'all', directory, output_folder))
+
+    errors = []
+    total = {'files': 0, 'bytes': 0}
+    timings = {}
+    total_profile = Profile() if profile else None
+    # heap of tuples (<time>, <path to file>, <profile of file>)
+    slowest_files = []
+
+    def on_done(path_to_file, result, error):
+        print('  [*]', path_to_file.rsplit('/', 1)[1])
+        if error is not None:
+            print('[!]', error)
+            errors.append((path_to_file, error))
+            manifest.discard(all_keys[path_to_file])
+            return
+        file_size, file_timings, document, file_profile, record = result
+        if document is not None:
+            if file_profile is not None:
+                with file_profile.stage('write'):
+                    shards.add(all_keys[path_to_file], *document)
+            else:
+                shards.add(all_keys[path_to_file], *document)
+        if file_profile is not None:
+            total_profile.merge(file_profile)
+            item = (file_profile.total(), path_to_file, file_profile)
+            if len(slowest_files) < profile_top:
+                heapq.heappush(slowest_files, item)
+            elif profile_top > 0:
+                heapq.heappushpop(slowest_files, item)
+        total['files'] += 1
+        total['bytes'] += file_size
+        for extension, (files, seconds) in file_timings.items():
+            timing = timings.setdefault(extension, [0, 0.0])
+            timing[0] += files
+            timing[1] += seconds
+        if record is not None:
+            manifest.update(all_keys[path_to_file], record)
+        else:
+            # file was changed while it was parsed
+            manifest.discard(all_keys[path_to_file])
+
+    start_time = time.perf_counter()
+    if workers > 1:
+        _process_in_pool(paths_to_data_files, output_clean, output_parsed,
+                         workers, on_done, enable_colors, profile)
+    else:
         for path_to_file in paths_to_data_files:
+            try:
+                result = _process_file_job(path_to_file, output_clean, output_parsed, profile)
+            except Exception as e:
+                on_done(path_to_file, None, e)
+                continue
+            on_done(path_to_file, result, None)
+    if shards is not None:
+        shards.close()
+    elapsed = max(time.perf_counter() - start_time, 1e-9)
+    if len(all_keys) > total['files'] + len(errors):
+        print('Skipped {} unchanged files'.format(len(all_keys) - total['files'] - len(errors)))
+
+    # forget removed files only when whole folder was scanned
+    if size <= 0:
+        manifest.retain(all_keys.values())
+    manifest.save()
+
+    print('Parsed {} files ({:.2f} MB) in {:.2f} sec: {:.2f} files/sec, {:.2f} MB/sec'.format(
+        total['files'], total['bytes'] / 2 ** 20, elapsed,
+        total['files'] / elapsed, total['bytes'] / 2 ** 20 / elapsed))
+    for extension, (files, seconds) in sorted(timings.items()):
+        print('  {} extraction: {} files in {:.2f} sec'.format(extension or 'text', files, seconds))
+    if errors:
+        print('Failed {} files:'.format(len(errors)))
+        for path_to_file, error in errors:
+            print('  [!]', path_to_file, '-', error)
+    if profile:
+        slowest_files = sorted(slowest_files, key=lambda item: item[0], reverse=True)
+        print_profile(total_profile, slowest_files)
+        if profile_output:
+            save_profile(profile_output, total_profile, slowest_files)
+    return errors
+
+
+def print_profile(total_profile: Profile, slowest_files: list):
+    """
+    Print time of each stage of parsing for all files and slowest files.
+
+    :param total_profile: Profile of all files
+    :param slowest_files: list of tuples (<time>, <path to file>, <profile of file>)
+    """
+    total_time = max(total_profile.total(), 1e-9)
+    print('Profile ({:.2f} sec in stages):'.format(total_time))
+    for name, seconds in sorted(total_profile.timings.items(), key=lambda item: item[1], reverse=True):
+        print('  {:<10} {:>8.2f} sec {:>6.1%}'.format(name, seconds, seconds / total_time))
+    for name, count in sorted(total_profile.counters.items()):
+        print('  {:<10} {:>12}'.format(name, count))
+    if slowest_files:
+        print('Slowest {} files:'.format(len(slowest_files)))
+    for seconds, path_to_file, file_profile in slowest_files:
+        stage, stage_seconds = max(file_profile.timings.items(), key=lambda item: item[1])
+        print('  {:.3f} sec, {} lines, mostly {} ({:.3f} sec) - {}'.format(
+            seconds, file_profile.counters['lines'], stage, stage_seconds, path_to_file))
+
+
+def save_profile(path: str, total_profile: Profile, slowest_files: list):
+    """
+    Save profile report (see print_profile) to json file.
+    """
+    with open(path, 'w', encoding='utf-8') as out_file:
+        json.dump({'total': total_profile.as_dict(),
+                   'slowest_files': [dict(file_profile.as_dict(), path=path_to_file, seconds=seconds)
+                                     for seconds, path_to_file, file_profile in slowest_files]},
+                  out_file, indent=1, sort_keys=True)
+
+
+def _read_file(path_to_file: str) -> tuple:
+    """
+    Read text of file and record of file for manifest (see _process_file_job).
+
+    :return: tuple (text, None or record of file)
+    """
+    record = file_record(path_to_file)
+    text = read_text(path_to_file)
+    if not is_same_file(record, path_to_file):
+        record = None
+    return text, record
+
+
+def _write_outputs(path_to_file: str, output_clean: str, output_parsed: str, text: str, tagged_text):
+    """
+    Write clean and tagged texts of file, clean text is saved even if text can't be tagged.
+    Files are renamed when they are written (see replaced_file).
+    """
+    filename = output_filename(path_to_file)
+    if output_clean:
+        with replaced_file(os.path.join(output_clean, filename)) as clean_file:
+            clean_file.write(text)
+    if isinstance(tagged_text, Exception):
+        raise tagged_text
+    with replaced_file(os.path.join(output_parsed, filename)) as out_file:
+        out_file.write(tagged_text)
+
+
+async def parse_folder_async(directory: str, file_types: list, size: int, output_folder: str, *,
+                             io_workers: int = 8, cpu_workers: int = 1, cpu_executor=None,
+                             queue_size: int = 0, enable_colors: bool = False, force: bool = False,
+                             clean_output: bool = True, follow_symlinks: bool = True,
+                             verbose: bool = True) -> list:
+    """
+    Clean and tag files from folder, reads, tagging and writes of different files go at the same time.
+
+    Files are read and written by io_workers threads, texts are tagged by parse_raw_text
+    in pool of cpu_workers processes, stages are connected by bounded queues,
+    so at most queue_size texts wait for tagging or writing.
+    Output is the same as output of parse_folder (tagged texts are saved as text files).
+
+    :param directory: str, folder with data
+    :param file_types: list of extensions of files which will be parsed
+    :param size: int, count of files which will be parsed, in case -1 parse all files
+    :param output_folder: str, folder for parsed data
+    :param io_workers: int, count of concurrent reads and writes
+    :param cpu_workers: int, count of processes which tag texts
+    :param cpu_executor: Executor for tagging (it is not shut down), in case of None pool of cpu_workers processes is used
+    :param queue_size: int, size of queues between stages, by default 2 * (io_workers + cpu_workers)
+    :param enable_colors: bool, enable colors of tags in processes of pool (not in cpu_executor)
+    :param force: bool, parse files which were not changed from last run (see manifest in output folder)
+    :param clean_output: bool, save clean texts (without tags) to output folder
+    :param follow_symlinks: bool, parse files from folders behind symlinks
+    :param verbose: bool, print name of each processed file (errors are always printed)
+    :return: list of tuples (path to file, exception) for files which failed
+    """
+    loop = asyncio.get_running_loop()
+    queue_size = queue_size or 2 * (io_workers + cpu_workers)
+    io_pool = concurrent.futures.ThreadPoolExecutor(max_workers=io_workers)
+    cpu_pool = cpu_executor or concurrent.futures.ProcessPoolExecutor(max_workers=cpu_workers,
+                                                                      initializer=_init_worker,
+                                                                      initargs=(enable_colors,))
+
+    output_clean, output_parsed, _ = await loop.run_in_executor(io_pool, _prepare_output,
+                                                                output_folder, clean_output, 'text')
+    manifest = await loop.run_in_executor(io_pool, _load_manifest, output_folder, force, enable_colors, 'text')
+    all_keys = {}
+    errors = []
+    # manifest is checked by scan and updated by writers in threads of io_pool
+    manifest_lock = threading.Lock()
+
+    def changed_files(paths_to_files, count: int):
+        # blocking part of scan, it runs in thread, None is returned when all files are scanned
+        batch = list(itertools.islice(paths_to_files, count))
+        if not batch:
+            return None
+        result = []
+        for path_to_file in batch:
+            key = os.path.relpath(path_to_file, directory)
+            all_keys[path_to_file] = key
+            with manifest_lock:
+                if _needs_parsing(manifest, key, path_to_file, output_clean, output_parsed):
+                    result.append(path_to_file)
+        return result
+
+    def record_file(path_to_file, record):
+        # manifest may be saved by update, so it runs in thread
+        with manifest_lock:
+            if record is not None:
+                manifest.update(all_keys[path_to_file], record)
+            else:
+                # file failed or was changed while it was parsed
+                manifest.discard(all_keys[path_to_file])
+
+    def save_manifest():
+        # forget removed files only when whole folder was scanned
+        if size <= 0:
+            manifest.retain(all_keys.values())
+        manifest.save()
+
+    def report(path_to_file, error=None):
+        # the same output as output of parse_folder
+        if verbose:
             print('  [*]', path_to_file.rsplit('/', 1)[1])
+        if error is not None:
+            print('[!]', error)
+            errors.append((path_to_file, error))
+
+    paths_queue = asyncio.Queue(queue_size)
+    texts_queue = asyncio.Queue(queue_size)
+    tagged_queue = asyncio.Queue(queue_size)
+
+    async def scan():
+        paths_to_files = await loop.run_in_executor(io_pool, functools.partial(
+            get_files_in_folder, directory, file_types, size, follow_symlinks=follow_symlinks))
+        while True:
+            # files are checked by small batches, so reading starts before whole folder is scanned
+            batch = await loop.run_in_executor(io_pool, changed_files, paths_to_files, 64)
+            if batch is None:
+                break
+            for path_to_file in batch:
+                await paths_queue.put(path_to_file)
+
+    async def read():
+        while True:
+            path_to_file = await paths_queue.get()
+            if path_to_file is None:
+                return
+            try:
+                text, record = await loop.run_in_executor(io_pool, _read_file, path_to_file)
+            except Exception as e:
+                report(path_to_file, e)
+                await loop.run_in_executor(io_pool, record_file, path_to_file, None)
+                continue
+            await texts_queue.put((path_to_file, text, record))
+
+    async def tag():
+        while True:
+            item = await texts_queue.get()
+            if item is None:
+                return
+            path_to_file, text, record = item
+            try:
+                tagged_text = await loop.run_in_executor(cpu_pool, parse_raw_text, text)
+            except Exception as e:
+                tagged_text = e
+            await tagged_queue.put((path_to_file, text, record, tagged_text))
+
+    async def write():
+        while True:
+            item = await tagged_queue.get()
+            if item is None:
+                return
+            path_to_file, text, record, tagged_text = item
+            error = None
+            try:
+                await loop.run_in_executor(io_pool, _write_outputs, path_to_file,
+                                           output_clean, output_parsed, text, tagged_text)
+            except Exception as e:
+                error, record = e, None
+            await loop.run_in_executor(io_pool, record_file, path_to_file, record)
+            report(path_to_file, error)
+
+    async def stage(workers: list, output_queue: asyncio.Queue, consumers: int):
+        # next stage is stopped when all workers of this stage are done
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for _ in range(consumers):
+                await output_queue.put(None)
+
+    try:
+        readers = [read() for _ in range(io_workers)]
+        taggers = [tag() for _ in range(cpu_workers)]
+        writers = [write() for _ in range(io_workers)]
+        await asyncio.gather(stage([scan()], paths_queue, io_workers),
+                             stage(readers, texts_queue, cpu_workers),
+                             stage(taggers, tagged_queue, io_workers),
+                             asyncio.gather(*writers))
+        await loop.run_in_executor(io_pool, save_manifest)
+    finally:
+        io_pool.shutdown()
+        if cpu_executor is None:
+            cpu_pool.shutdown()
+    return errors
+
+
+def watch_folder(directory: str, file_types: list, output_folder: str, *,
+                 workers: int = 1, interval: float = 2.0, settle: float = 1.0,
+                 enable_colors: bool = False, force: bool = False, clean_output: bool = True,
+                 follow_symlinks: bool = True, output_format: str = 'text'):
+    """
+    Parse new and changed files from folder until Ctrl+C.
+
+    Folder is scanned each interval seconds, files are parsed by the same (warm) pool of processes,
+    at most 2 * workers files are queued, next files of scan are queued as soon as files are done
+    (new scan starts when all files of previous scan are queued).
+    Files which were modified less than settle seconds ago are skipped until they are written.
+    Files which failed are parsed again only when they are changed.
+    Shard is written when it is full and on stop, so new documents are read from shards after stop.
+    Arguments are the same as in parse_folder.
+    """
+    output_clean, output_parsed, shards = _prepare_output(output_folder, clean_output, output_format)
+    manifest = _load_manifest(output_folder, force, enable_colors, output_format)
+
+    max_in_flight = max(workers, 1) * 2
+    # future -> (path to file, key)
+    in_flight = {}
+    # path to file -> (size, modification time) of file which failed
+    failed = {}
+    is_unsaved = False
 
-            # remove path from file
-            _, filename = path_to_file.rsplit('/', 1)
-            # remove extension (for example '.html' or '.docx')
-            filename, _ = filename.split('.', 1)
-            filename += '.txt'
+    def collect(done):
+        nonlocal is_unsaved
+        for future in done:
+            path_to_file, key = in_flight.pop(future)
+            print('  [*]', path_to_file)
+            is_unsaved = True
             try:
-                # working with clean file
-                path_to_clean = os.path.join(output_clean, filename)
-                clean_text = read_text(path_to_file)
-                # saving clean file
-                with open(path_to_clean, 'w', encoding='utf-8') as out_file:
-                    out_file.write(clean_text)
-
-                # working with parsed file
-                path_to_parsed = os.path.join(output_parsed, filename)
-                parse_one_file(path_to_clean, to_file=path_to_parsed)
+                _, _, document, _, record = future.result()
             except Exception as e:
                 print('[!]', e)
+                try:
+                    stat = os.stat(path_to_file)
+                    failed[path_to_file] = (stat.st_size, stat.st_mtime_ns)
+                except OSError:
+                    # file was removed
+                    pass
+                manifest.discard(key)
+                continue
+            failed.pop(path_to_file, None)
+            if document is not None:
+                shards.add(key, *document)
+            if record is not None:
+                manifest.update(key, record)
+            else:
+                # file was changed while it was parsed, it is parsed again on next scan
+                manifest.discard(key)
+
+    def changed_files():
+        queued = {path_to_file for path_to_file, _ in in_flight.values()}
+        for path_to_file in get_files_in_folder(directory, file_types, follow_symlinks=follow_symlinks):
+            if path_to_file in queued:
+                continue
+            try:
+                stat = os.stat(path_to_file)
+            except OSError:
+                # file was removed after scan
                 continue
+            # files of scan are checked while they are queued, so time is taken for each file
+            if time.time() - stat.st_mtime < settle or failed.get(path_to_file) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            key = os.path.relpath(path_to_file, directory)
+            try:
+                is_changed = _needs_parsing(manifest, key, path_to_file, output_clean, output_parsed, shards)
+            except OSError:
+                # file was removed or can't be read, it is checked again on next scan
+                continue
+            if is_changed:
+                yield path_to_file, key
+
+    def submit(pending) -> bool:
+        # queue files until pool is full, returns False when all files of scan are queued
+        while len(in_flight) < max_in_flight:
+            item = next(pending, None)
+            if item is None:
+                return False
+            future = pool.submit(_process_file_job, item[0], output_clean, output_parsed)
+            in_flight[future] = item
+        return True
+
+    print('Watching \'{}\' (output to \'{}\'), press Ctrl+C to stop:'.format(directory, output_folder))
+    pool = concurrent.futures.ProcessPoolExecutor(max_workers=max(workers, 1),
+                                                  initializer=_init_watch_worker,
+                                                  initargs=(enable_colors,))
+    # files of current scan which are not queued yet
+    pending, is_pending = None, False
+    try:
+        while True:
+            next_scan = time.monotonic() + interval
+            if not is_pending:
+                pending = changed_files()
+            is_pending = submit(pending)
+
+            # wait for next scan, files are collected and pool is refilled while files are done
+            timeout = next_scan - time.monotonic()
+            while timeout > 0:
+                if not in_flight:
+                    time.sleep(timeout)
+                    break
+                done, _ = concurrent.futures.wait(in_flight, timeout=timeout,
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                collect(done)
+                if is_pending:
+                    is_pending = submit(pending)
+                timeout = next_scan - time.monotonic()
+            # documents of shard which is not written yet are not in index of shards,
+            # so after crash they are parsed again
+            if is_unsaved:
+                manifest.save()
+                is_unsaved = False
+    except KeyboardInterrupt:
+        print('Stopping...')
+    finally:
+        for future in in_flight:
+            future.cancel()
+        collect(concurrent.futures.as_completed([future for future in in_flight if not future.cancelled()]))
+        pool.shutdown()
+        if shards is not None:
+            shards.close()
+        manifest.save()
+
+
+def main():
+    global DATA_FOLDER, PARSED_DATA_FOLDER, DATA_SIZE
+    global TAGS, arg_parser
+
+    args = arg_parser.parse_args()
+    DATA_FOLDER, PARSED_DATA_FOLDER = args.folder, args.output
+    DATA_SIZE = args.size
+    TAGS = FileTags(enable_colors=args.color)
 
     if args.file:
         extension = '.' + args.file.rsplit('.', 1)[-1]
@@ -179,10 +971,35 @@ def main():
             parse_one_file(args.file)
         else:
             print('Wrong file extension!')
-    if args.folder:
+    if args.io_workers > 0 and (args.format != 'text' or args.profile or args.watch):
+        arg_parser.error('--io-workers works only with text format and without --profile and --watch')
+    if args.folder and args.watch:
+        watch_folder(DATA_FOLDER, FILE_TYPES, PARSED_DATA_FOLDER,
+                     workers=args.workers, interval=args.interval, enable_colors=args.color,
+                     force=args.force, clean_output=not args.no_clean_output,
+                     follow_symlinks=not args.no_follow_symlinks, output_format=args.format)
+    elif args.folder and args.io_workers > 0:
+        if os.path.isdir(DATA_FOLDER):
+            start_time = time.perf_counter()
+            errors = asyncio.run(parse_folder_async(DATA_FOLDER, FILE_TYPES, DATA_SIZE, PARSED_DATA_FOLDER,
+                                                    io_workers=args.io_workers, cpu_workers=args.workers,
+                                                    enable_colors=args.color, force=args.force,
+                                                    clean_output=not args.no_clean_output,
+                                                    follow_symlinks=not args.no_follow_symlinks))
+            print('Done in {:.2f} sec'.format(time.perf_counter() - start_time))
+            if errors:
+                print('Failed {} files:'.format(len(errors)))
+                for path_to_file, error in errors:
+                    print('  [!]', path_to_file, '-', error)
+    elif args.folder:
         if os.path.isdir(DATA_FOLDER):
             parse_folder(DATA_FOLDER, FILE_TYPES,
-                         DATA_SIZE, PARSED_DATA_FOLDER)
+                         DATA_SIZE, PARSED_DATA_FOLDER,
+                         workers=args.workers, enable_colors=args.color,
+                         force=args.force, clean_output=not args.no_clean_output,
+                         follow_symlinks=not args.no_follow_symlinks, output_format=args.format,
+                         profile=args.profile, profile_top=args.profile_top,
+                         profile_output=args.profile_output)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,7 @@
+__all__ = ['Manifest', 'file_hash', 'file_record', 'is_same_file',
+           'register_extractor', 'extractor_extensions', 'extract_lines', 'extractor_timings',
+           'ShardWriter', 'ShardReader', 'Shard', 'Document', 'compact_shards']
+
+from .manifest import Manifest, file_hash, file_record, is_same_file
+from .extractors import register_extractor, extractor_extensions, extract_lines, extractor_timings
+from .shards import ShardWriter, ShardReader, Shard, Document, compact_shards
@@ -0,0 +1,191 @@
+import os
+import time
+import zipfile
+import functools
+import xml.etree.ElementTree as ET
+
+# extension -> function which returns iterable of lines (with line breaks) of file
+EXTRACTORS = {}
+# extension -> [count of files, seconds spent in extractor]
+TIMINGS = {}
+
+WORD_NAMESPACE = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+WORD_DOCUMENT = 'word/document.xml'
+
+
+def register_extractor(*extensions):
+    """
+    Decorator which registers extractor of text for files with extensions.
+
+    Extractor takes path to file and returns iterable of lines (with line breaks),
+    concatenation of lines is clean text of file.
+
+    :param extensions: strings, for example '.txt'
+    """
+    def decorator(extractor):
+        for extension in extensions:
+            EXTRACTORS[extension] = extractor
+        return extractor
+    return decorator
+
+
+def extractor_extensions() -> list:
+    """
+    List of extensions of files which have registered extractors.
+    """
+    return sorted(EXTRACTORS)
+
+
+def extract_lines(filename: str):
+    """
+    Lines of clean text of file, extractor is selected by extension of file
+    (files with unknown extensions are read as text).
+    Time spent in extractor is added to TIMINGS.
+
+    :param filename: str, path to file
+    :return: generator of lines (with line breaks)
+    """
+    _, extension = os.path.splitext(filename)
+    extractor = EXTRACTORS.get(extension, extract_txt)
+    timing = TIMINGS.setdefault(extension, [0, 0.0])
+    timing[0] += 1
+
+    start = time.perf_counter()
+    try:
+        for line in extractor(filename):
+            timing[1] += time.perf_counter() - start
+            start = None
+            yield line
+            start = time.perf_counter()
+    finally:
+        # time of last read (or failed read)
+        if start is not None:
+            timing[1] += time.perf_counter() - start
+
+
+def extractor_timings(*, reset: bool = False) -> dict:
+    """
+    Count of files and time spent by extractors for each extension.
+
+    :param reset: bool, clear timings after reading
+    :return: dict where key is extension and value is tuple (count of files, seconds)
+    """
+    timings = {extension: tuple(timing) for extension, timing in TIMINGS.items()}
+    if reset:
+        TIMINGS.clear()
+    return timings
+
+
+def _split_pieces(pieces):
+    """
+    Join pieces of text and split them into lines (with line breaks).
+    """
+    buffer = []
+    for piece in pieces:
+        if '\n' not in piece:
+            buffer.append(piece)
+            continue
+        parts = piece.split('\n')
+        buffer.append(parts[0])
+        yield ''.join(buffer) + '\n'
+        for part in parts[1:-1]:
+            yield part + '\n'
+        buffer = [parts[-1]]
+    rest = ''.join(buffer)
+    if rest:
+        yield rest
+
+
+def _strip_pieces(pieces):
+    """
+    Same as str.strip of joined pieces, but without joining them.
+    """
+    is_started, whitespaces = False, []
+    for piece in pieces:
+        if not is_started:
+            piece = piece.lstrip()
+            if not piece:
+                continue
+            is_started = True
+        stripped = piece.rstrip()
+        # whitespaces are yielded only if some text goes after them
+        if not stripped:
+            whitespaces.append(piece)
+            continue
+        if whitespaces:
+            yield ''.join(whitespaces)
+            whitespaces = []
+        yield stripped
+        if len(stripped) < len(piece):
+            whitespaces.append(piece[len(stripped):])
+
+
+def _docx_pieces(xml_file):
+    """
+    Pieces of text of word document in the same way as docx2txt:
+    paragraphs starts with empty line, tabs and breaks are replaced with '\\t' and '\\n'.
+    """
+    paragraph, text = WORD_NAMESPACE + 'p', WORD_NAMESPACE + 't'
+    tab, breaks = WORD_NAMESPACE + 'tab', (WORD_NAMESPACE + 'br', WORD_NAMESPACE + 'cr')
+    for event, element in ET.iterparse(xml_file, events=('start', 'end')):
+        tag = element.tag
+        if event == 'start':
+            if tag == paragraph:
+                yield '\n\n'
+            continue
+        if tag == text:
+            if element.text:
+                yield element.text
+        elif tag == tab:
+            yield '\t'
+        elif tag in breaks:
+            yield '\n'
+        elif tag == paragraph:
+            # parsed paragraphs are not needed anymore
+            element.clear()
+
+
+@register_extractor('.docx')
+def extract_docx(filename: str):
+    """
+    Text of main part of word document, document is parsed incrementally
+    without unpacking whole archive (images, headers and footers are skipped).
+    """
+    with zipfile.ZipFile(filename) as archive:
+        with archive.open(WORD_DOCUMENT) as xml_file:
+            yield from _split_pieces(_strip_pieces(_docx_pieces(xml_file)))
+
+
+@functools.lru_cache(maxsize=None)
+def _html_parser() -> tuple:
+    """
+    BeautifulSoup and name of html parser, they are imported only when first html file is read.
+    """
+    from bs4 import BeautifulSoup
+    try:
+        import lxml  # noqa: F401
+        return BeautifulSoup, 'lxml'
+    except ImportError:
+        return BeautifulSoup, 'html.parser'
+
+
+@register_extractor('.html', '.htm')
+def extract_html(filename: str):
+    """
+    Text of html page, lxml is used as parser when it is installed.
+    """
+    # getting file content
+    with open(filename, 'r', encoding='utf-8') as input_file:
+        content = input_file.read()
+    beautiful_soup, html_parser = _html_parser()
+    soup = beautiful_soup(content, html_parser)
+    return soup.get_text().splitlines(keepends=True)
+
+
+@register_extractor('.txt')
+def extract_txt(filename: str):
+    """
+    Text file, file is read line by line.
+    """
+    with open(filename, 'r', encoding='utf-8') as input_file:
+        yield from input_file
@@ -0,0 +1,152 @@
+import os
+import json
+import hashlib
+
+MANIFEST_NAME = 'manifest.json'
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_hash(filename: str) -> str:
+    """
+    Hash of file content.
+
+    :param filename: str, path to file
+    :return: str, hex digest
+    """
+    content_hash = hashlib.sha1()
+    with open(filename, 'rb') as input_file:
+        chunk = input_file.read(HASH_CHUNK_SIZE)
+        while chunk:
+            content_hash.update(chunk)
+            chunk = input_file.read(HASH_CHUNK_SIZE)
+    return content_hash.hexdigest()
+
+
+def file_record(filename: str) -> dict:
+    """
+    Record of file for manifest (size, modification time and content hash).
+    Record is taken by process which parses file, right before file is read.
+
+    :param filename: str, path to file
+    :return: dict
+    """
+    stat = os.stat(filename)
+    return {'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'hash': file_hash(filename)}
+
+
+def is_same_file(record: dict, filename: str) -> bool:
+    """
+    Checks that file was not changed after record was taken (size and modification time are the same).
+
+    :param record: dict, record of file (see file_record)
+    :param filename: str, path to file
+    :return: True if file was not changed and False otherwise
+    """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return False
+    return record['size'] == stat.st_size and record['mtime'] == stat.st_mtime_ns
+
+
+class Manifest:
+    """
+    Records of already processed files which stored in output folder.
+
+    Each record has size, modification time and content hash of source file,
+    whole manifest is invalidated when version of parser or options of output are changed.
+    """
+
+    def __init__(self, output_folder: str, parser_version: str, *, options: dict = None, save_every: int = 1000):
+        """
+        :param output_folder: str, folder where manifest is stored
+        :param parser_version: str, version of rules of parser (see parser_version)
+        :param options: dict, options which change content of output (for example colors of tags)
+        :param save_every: int, manifest is saved after this count of updates, in case 0 only by save
+        """
+        self.path = os.path.join(output_folder, MANIFEST_NAME)
+        self.parser_version = parser_version
+        self.options = options or {}
+        self.save_every = save_every
+        self.files = {}
+        self.__unsaved = 0
+
+    def load(self):
+        """
+        Load records from output folder, records of another parser version or options are dropped.
+        """
+        if not os.path.isfile(self.path):
+            return self
+        with open(self.path, 'r', encoding='utf-8') as input_file:
+            content = json.load(input_file)
+        if content.get('parser_version') == self.parser_version and content.get('options', {}) == self.options:
+            self.files = content.get('files', {})
+        return self
+
+    def save(self):
+        """
+        Atomically store records to output folder.
+        """
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as out_file:
+            json.dump({'parser_version': self.parser_version, 'options': self.options, 'files': self.files},
+                      out_file, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self.__unsaved = 0
+
+    def is_changed(self, key: str, filename: str) -> bool:
+        """
+        Checks that file is new or changed from last run.
+        Content hash computed only when size or modification time is changed.
+
+        :param key: str, name of record (path relative to data folder)
+        :param filename: str, path to file
+        :return: True if file need to be processed and False otherwise
+        """
+        record = self.files.get(key)
+        if record is None:
+            return True
+        stat = os.stat(filename)
+        if record['size'] == stat.st_size and record['mtime'] == stat.st_mtime_ns:
+            return False
+        if record['size'] != stat.st_size or record['hash'] != file_hash(filename):
+            return True
+        # same content, only modification time was changed
+        record['mtime'] = stat.st_mtime_ns
+        self.__unsaved += 1
+        return False
+
+    def update(self, key: str, record: dict):
+        """
+        Add or replace record about processed file.
+
+        :param key: str, name of record (path relative to data folder)
+        :param record: dict, record which was taken before file was read (see file_record),
+                       so record describes the same content as output of file
+        """
+        self.files[key] = {'size': record['size'],
+                           'mtime': record['mtime'],
+                           'hash': record['hash']}
+        self.__unsaved += 1
+        if self.save_every and self.__unsaved >= self.save_every:
+            self.save()
+
+    def discard(self, key: str):
+        """
+        Remove record, file will be processed on next run.
+        """
+        if self.files.pop(key, None) is not None:
+            self.__unsaved += 1
+
+    def retain(self, keys):
+        """
+        Keep only records with given names (removed source files are forgotten).
+
+        :param keys: iterable of record names
+        """
+        keys = set(keys)
+        for key in [key for key in self.files if key not in keys]:
+            del self.files[key]
+            self.__unsaved += 1
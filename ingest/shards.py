@@ -0,0 +1,342 @@
+import os
+import json
+import mmap
+import shutil
+import struct
+from array import array
+
+from parser import TagFlags, build_tree
+
+SHARD_MAGIC = b'JDSHARD2'
+# magic, count of documents, count of lines, count of spans, size of text
+SHARD_HEADER = struct.Struct('<8sQQQQ')
+INDEX_NAME = 'index.json'
+SHARD_NAME = 'shard-{:05d}.bin'
+# size of text after which new shard is started
+SHARD_SIZE = 1 << 30
+# size of buffer of shard which is written
+WRITE_BUFFER_SIZE = 1 << 20
+COMPACT_FOLDER = 'compact.tmp'
+
+
+def _spans(flags) -> list:
+    """
+    Spans of all tags of document in order of opening.
+
+    :param flags: TagFlags or list of tuples (<bit flags>, <tag>)
+    :return: list of tuples (<tag id>, <opening line>, <closing line>)
+    """
+    tree = build_tree(flags)
+    spans, nodes = [], list(reversed(tree.subtrees))
+    while nodes:
+        node = nodes.pop()
+        spans.append((TagFlags.tag_id(node.tag), node.op_pos, node.cl_pos))
+        nodes.extend(reversed(node.subtrees))
+    return spans
+
+
+def _padding(size: int) -> bytes:
+    return bytes(-size % 8)
+
+
+class ShardWriter:
+    """
+    Pack tagged documents into few shard files.
+
+    Each shard has header, utf-8 text where each line ends with line break, table of documents
+    (first line, end line, first span, end span), offsets of lines in text and spans of tags
+    (tag id, opening line, closing line relative to first line of document).
+    Text is written to temporary file of shard while documents are added, tables are kept
+    in memory and written with header when shard is flushed.
+    Ids of documents are stored in index.json, document which was added again replaces old one
+    (old copy stays in its shard until compact_shards is called).
+    """
+
+    def __init__(self, folder: str, *, shard_size: int = SHARD_SIZE):
+        self.folder = folder
+        self.shard_size = shard_size
+        os.makedirs(folder, exist_ok=True)
+        self.index = ShardReader.read_index(folder)
+        self.__file = None
+        self.__reset()
+
+    def __reset(self):
+        self.__ids = []
+        self.__ids_set = set()
+        self.__docs = array('Q')
+        self.__line_offsets = array('Q', [0])
+        self.__spans = array('I')
+        self.__text_size = 0
+
+    def __shard_name(self) -> str:
+        # numbers of shards are not reused, so new shards never replace shards of index
+        return SHARD_NAME.format(self.index.get('next_shard', len(self.index['shards'])))
+
+    def __open(self):
+        self.__file = open(os.path.join(self.folder, self.__shard_name() + '.tmp'), 'wb',
+                           buffering=WRITE_BUFFER_SIZE)
+        # header is written when shard is flushed
+        self.__file.write(bytes(SHARD_HEADER.size))
+
+    def __contains__(self, doc_id: str):
+        """
+        Checks that document is in index or in current shard (which is not flushed yet).
+        """
+        return doc_id in self.index['documents'] or doc_id in self.__ids_set
+
+    def add(self, doc_id: str, lines: list, flags):
+        """
+        Add document to current shard.
+
+        :param doc_id: str, id of document
+        :param lines: list of lines (see tag_positions)
+        :param flags: TagFlags or list of tuples (<bit flags>, <tag>)
+        """
+        self.add_spans(doc_id, lines, _spans(flags))
+
+    def add_spans(self, doc_id: str, lines: list, spans: list):
+        """
+        Add document with already known spans of tags (for example document from another shard).
+
+        :param doc_id: str, id of document
+        :param lines: list of lines
+        :param spans: list of tuples (<tag id>, <opening line>, <closing line>)
+        """
+        if self.__file is None:
+            self.__open()
+        first_line, first_span = len(self.__line_offsets) - 1, len(self.__spans) // 3
+        chunks = []
+        for line in lines:
+            data = line.encode('utf-8', 'surrogatepass') + b'\n'
+            chunks.append(data)
+            self.__text_size += len(data)
+            self.__line_offsets.append(self.__text_size)
+        self.__file.write(b''.join(chunks))
+        for span in spans:
+            self.__spans.extend(span)
+        self.__docs.extend((first_line, len(self.__line_offsets) - 1,
+                            first_span, len(self.__spans) // 3))
+        self.__ids.append(doc_id)
+        self.__ids_set.add(doc_id)
+
+        if self.__text_size >= self.shard_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write tables of current shard to disk and update index.
+        """
+        if self.__file is None:
+            return
+        shard_name = self.__shard_name()
+        tmp_path = self.__file.name
+        with self.__file as out_file:
+            out_file.write(_padding(self.__text_size))
+            for part in (self.__docs, self.__line_offsets, self.__spans):
+                data = part.tobytes()
+                out_file.write(data)
+                out_file.write(_padding(len(data)))
+            out_file.seek(0)
+            out_file.write(SHARD_HEADER.pack(SHARD_MAGIC, len(self.__ids), len(self.__line_offsets) - 1,
+                                             len(self.__spans) // 3, self.__text_size))
+        self.__file = None
+        os.replace(tmp_path, os.path.join(self.folder, shard_name))
+
+        shard_pos = len(self.index['shards'])
+        self.index['shards'].append(shard_name)
+        self.index['next_shard'] = self.index.get('next_shard', shard_pos) + 1
+        for doc_pos, doc_id in enumerate(self.__ids):
+            self.index['documents'][doc_id] = [shard_pos, doc_pos]
+        ShardReader.write_index(self.folder, self.index)
+        self.__reset()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def compact_shards(folder: str, *, shard_size: int = SHARD_SIZE) -> tuple:
+    """
+    Rewrite documents of index to new shards and remove old shards,
+    so old copies of documents which were added again don't take space.
+
+    New shards are written next to old ones and index is replaced at once,
+    shards must not be written (by ShardWriter) while they are compacted.
+
+    :param folder: str, folder of shards
+    :param shard_size: int, size of text after which new shard is started
+    :return: tuple (<count of removed shards>, <count of new shards>)
+    """
+    reader = ShardReader(folder)
+    old_shards = list(reader.index['shards'])
+    next_shard = reader.index.get('next_shard', len(old_shards))
+    compact_folder = os.path.join(folder, COMPACT_FOLDER)
+    if os.path.isdir(compact_folder):
+        # rest of interrupted compaction
+        shutil.rmtree(compact_folder)
+    with ShardWriter(compact_folder, shard_size=shard_size) as writer:
+        for document in reader:
+            spans = [(TagFlags.tag_id(tag), op_pos, cl_pos) for tag, op_pos, cl_pos in document.spans()]
+            writer.add_spans(document.doc_id, document.lines(), spans)
+    del reader
+
+    # shards are moved to folder with numbers which are not used by old shards
+    index = writer.index
+    for shard_pos, shard_name in enumerate(index['shards']):
+        index['shards'][shard_pos] = SHARD_NAME.format(next_shard + shard_pos)
+        os.replace(os.path.join(compact_folder, shard_name), os.path.join(folder, index['shards'][shard_pos]))
+    index['next_shard'] = next_shard + len(index['shards'])
+    ShardReader.write_index(folder, index)
+
+    for shard_name in old_shards:
+        os.remove(os.path.join(folder, shard_name))
+    shutil.rmtree(compact_folder)
+    return len(old_shards), len(index['shards'])
+
+
+class Shard:
+    """
+    Memory-mapped shard, arrays are views of mapped file (nothing is copied).
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as input_file:
+            self.__map = mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self.__map)
+        magic, docs_count, lines_count, spans_count, text_size = SHARD_HEADER.unpack_from(view)
+        if magic != SHARD_MAGIC:
+            raise ValueError('{} is not a shard'.format(path))
+
+        pos = SHARD_HEADER.size
+        self.text = view[pos:pos + text_size]
+        pos += text_size
+        pos += -pos % 8
+
+        def take(size: int, item_format: str, count: int):
+            nonlocal pos
+            part = view[pos:pos + size * count].cast(item_format)
+            pos += size * count
+            pos += -pos % 8
+            return part
+
+        self.docs = take(8, 'Q', docs_count * 4)
+        self.line_offsets = take(8, 'Q', lines_count + 1)
+        self.spans = take(4, 'I', spans_count * 3)
+
+    def lines_bytes(self, first: int, end: int) -> memoryview:
+        """
+        Text of lines [first, end) without last line break.
+        """
+        start, stop = self.line_offsets[first], self.line_offsets[end]
+        return self.text[start:max(start, stop - 1)]
+
+
+class Document:
+    """
+    Lines and tags of one document from shard.
+    """
+
+    def __init__(self, doc_id: str, shard: Shard, doc_pos: int):
+        self.doc_id = doc_id
+        self.__shard = shard
+        self.first_line, self.end_line, first_span, end_span = shard.docs[doc_pos * 4:doc_pos * 4 + 4]
+        self.__spans = shard.spans[first_span * 3:end_span * 3]
+
+    def __len__(self):
+        return self.end_line - self.first_line
+
+    def line(self, pos: int) -> str:
+        return bytes(self.__shard.lines_bytes(self.first_line + pos,
+                                              self.first_line + pos + 1)).decode('utf-8', 'surrogatepass')
+
+    def lines(self) -> list:
+        return self.text().split('\n') if len(self) else []
+
+    def text_bytes(self, first: int = 0, last: int = -1) -> memoryview:
+        """
+        Text of lines from first to last (including last) as view of shard.
+        """
+        last = last if last >= 0 else len(self) + last
+        return self.__shard.lines_bytes(self.first_line + first, self.first_line + last + 1)
+
+    def text(self, first: int = 0, last: int = -1) -> str:
+        return bytes(self.text_bytes(first, last)).decode('utf-8', 'surrogatepass')
+
+    def spans(self, tag=None) -> list:
+        """
+        Spans of tags in order of opening.
+
+        :param tag: Tag, in case of None spans of all tags are returned
+        :return: list of tuples (<tag>, <opening line>, <closing line>)
+        """
+        spans = self.__spans
+        tag_id = TagFlags.tag_id(tag) if tag is not None else None
+        return [(TagFlags.TAGS[spans[i]], spans[i + 1], spans[i + 2])
+                for i in range(0, len(spans), 3)
+                if tag_id is None or spans[i] == tag_id]
+
+    def tag_lines(self, tag) -> list:
+        """
+        Positions of tag, same as TextTree.tag_lines but in order of opening.
+        """
+        return [(op_pos, cl_pos) for _, op_pos, cl_pos in self.spans(tag)]
+
+    def tag_texts(self, tag) -> list:
+        """
+        Texts of each occurrence of tag.
+        """
+        return [self.text(op_pos, cl_pos) for op_pos, cl_pos in self.tag_lines(tag)]
+
+
+class ShardReader:
+    """
+    Random access to documents of shards by id.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.index = self.read_index(folder)
+        self.__shards = {}
+
+    @staticmethod
+    def read_index(folder: str) -> dict:
+        path = os.path.join(folder, INDEX_NAME)
+        if not os.path.isfile(path):
+            return {'tags': [str(tag) if tag else None for tag in TagFlags.TAGS],
+                    'shards': [], 'next_shard': 0, 'documents': {}}
+        with open(path, 'r', encoding='utf-8') as input_file:
+            return json.load(input_file)
+
+    @staticmethod
+    def write_index(folder: str, index: dict):
+        path = os.path.join(folder, INDEX_NAME)
+        with open(path + '.tmp', 'w', encoding='utf-8') as out_file:
+            json.dump(index, out_file)
+        os.replace(path + '.tmp', path)
+
+    def shard(self, shard_pos: int) -> Shard:
+        if shard_pos not in self.__shards:
+            self.__shards[shard_pos] = Shard(os.path.join(self.folder, self.index['shards'][shard_pos]))
+        return self.__shards[shard_pos]
+
+    def ids(self) -> list:
+        return list(self.index['documents'])
+
+    def __len__(self):
+        return len(self.index['documents'])
+
+    def __contains__(self, doc_id: str):
+        return doc_id in self.index['documents']
+
+    def __getitem__(self, doc_id: str) -> Document:
+        shard_pos, doc_pos = self.index['documents'][doc_id]
+        return Document(doc_id, self.shard(shard_pos), doc_pos)
+
+    def __iter__(self):
+        for doc_id in self.index['documents']:
+            yield self[doc_id]
@@ -1,7 +1,12 @@
-__all__ = ['Tag', 'FileTags',
+__all__ = ['Tag', 'FileTags', 'TagFlags',
            'TextTree', 'build_tree',
-           'tag_positions', 'generate_tree', 'parse_raw_text']
+           'tag_positions', 'generate_tree', 'parse_raw_text', 'iter_tagged_lines',
+           'parser_version', 'Profile',
+           'map_texts', 'parse_many', 'generate_trees']
 
 from .tag import Tag, FileTags
+from .tag_flags import TagFlags
 from .text_tree import TextTree, build_tree
-from .core import tag_positions, generate_tree, parse_raw_text
+from .profile import Profile
+from .core import tag_positions, generate_tree, parse_raw_text, iter_tagged_lines, parser_version
+from .batch import map_texts, parse_many, generate_trees
@@ -0,0 +1,112 @@
+import itertools
+import collections
+import concurrent.futures
+
+from parser.core import parse_raw_text, generate_tree
+
+EXECUTORS = {'thread': concurrent.futures.ThreadPoolExecutor,
+             'process': concurrent.futures.ProcessPoolExecutor}
+
+
+def _apply_to_chunk(function, texts: list, return_exceptions: bool) -> list:
+    results = []
+    for text in texts:
+        try:
+            results.append(function(text))
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            results.append(e)
+    return results
+
+
+def _chunks(texts, chunksize: int):
+    texts = iter(texts)
+    chunk = list(itertools.islice(texts, chunksize))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(texts, chunksize))
+
+
+def map_texts(function, texts, *, workers: int = 1, chunksize: int = 16,
+              executor: str = 'process', ordered: bool = True, return_exceptions: bool = False):
+    """
+    Apply function to each text, texts are sent to pool of workers by chunks.
+
+    At most 2 * workers chunks are in flight, so texts are read from iterable
+    only when there is free place in pool.
+
+    :param function: function which takes one text (must be picklable for 'process' executor)
+    :param texts: iterable of strings
+    :param workers: int, size of pool, in case 1 texts are processed in current thread
+    :param chunksize: int, count of texts which sent to worker at once
+    :param executor: str, 'process' or 'thread', or already running Executor
+                     (it is not shut down, so one pool can be shared between calls)
+    :param ordered: bool, yield results in order of texts, otherwise yield tuples
+                    (<index of text>, <result>) as soon as they are ready
+    :param return_exceptions: bool, yield exceptions instead of raising them
+    :return: generator of results
+    """
+    is_shared = isinstance(executor, concurrent.futures.Executor)
+    if not is_shared and executor not in EXECUTORS:
+        raise ValueError('unknown executor {}, expected one of {}'.format(executor, sorted(EXECUTORS)))
+
+    if workers <= 1 and not is_shared:
+        for i, chunk in enumerate(_chunks(texts, chunksize)):
+            results = _apply_to_chunk(function, chunk, return_exceptions)
+            if ordered:
+                yield from results
+            else:
+                yield from enumerate(results, i * chunksize)
+        return
+
+    max_in_flight = max(workers, 1) * 2
+    pool = executor if is_shared else EXECUTORS[executor](max_workers=workers)
+    # futures with index of first text in chunk
+    in_flight = collections.OrderedDict()
+    try:
+        def ready():
+            if ordered:
+                # wait for oldest chunk
+                future, _ = in_flight.popitem(last=False)
+                yield from future.result()
+                return
+            done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                first = in_flight.pop(future)
+                yield from enumerate(future.result(), first)
+
+        for i, chunk in enumerate(_chunks(texts, chunksize)):
+            if len(in_flight) >= max_in_flight:
+                yield from ready()
+            future = pool.submit(_apply_to_chunk, function, chunk, return_exceptions)
+            in_flight[future] = i * chunksize
+        while in_flight:
+            yield from ready()
+    finally:
+        for future in in_flight:
+            future.cancel()
+        if not is_shared:
+            pool.shutdown()
+
+
+def parse_many(texts, **kwargs):
+    """
+    Parse many texts and add tags to them (see parse_raw_text).
+    Arguments are the same as in map_texts.
+
+    :param texts: iterable of strings
+    :return: generator of strings with tags
+    """
+    return map_texts(parse_raw_text, texts, **kwargs)
+
+
+def generate_trees(texts, **kwargs):
+    """
+    Generate text trees with tags for many texts (see generate_tree).
+    Arguments are the same as in map_texts.
+
+    :param texts: iterable of strings
+    :return: generator of TextTree objects
+    """
+    return map_texts(generate_tree, texts, **kwargs)
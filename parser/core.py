@@ -1,6 +1,11 @@
 import re
+import hashlib
+import tempfile
+from array import array
 from parser.tag import FileTags
+from parser.tag_flags import TagFlags
 from parser.text_tree import TextTree, build_tree
+from parser.profile import Profile
 
 
 TITLE = re.compile(r"""^                       # beginning of the string  
@@ -37,12 +42,40 @@ SINGLE_NUMBER = re.compile(r"""^               # beginning of the string
                                [\d\.\)]+       # number
                                \s*             # whitespaces
                                $""", re.VERBOSE)
+# all line rules in order of priority, name of matched group is class of line
+# ('single_number' goes before 'list' because such lines are not lists)
+LINE_CLASS = re.compile('|'.join('(?P<{}>{})'.format(name, rule.pattern)
+                                 for name, rule in [('section', SECTION),
+                                                    ('exact_section', EXACT_SECTION),
+                                                    ('single_number', SINGLE_NUMBER),
+                                                    ('list', LIST)]),
+                        re.VERBOSE)
+CONTINUATION = re.compile(r'\s*^[a-z]+')
+# size of text which iter_tagged_lines keeps in memory
+SPILL_SIZE = 1 << 24
 
 LIST_TYPES = [r'(\d+)\.?\)?',                 # number
               r'(\w+)\.?\)', r'\((\w+)\)',    # chars
               r'(•|-|\*)']                    # special symbol
 
 
+def parser_version() -> str:
+    """
+    Fingerprint of rules which used for tagging,
+    any change of regular expressions gives new fingerprint.
+
+    :return: str, hex digest
+    """
+    rules = [TITLE, EXHIBIT, EMPTY_LINE, EXACT_SECTION, SECTION, LIST, SINGLE_NUMBER, CONTINUATION]
+    fingerprint = hashlib.sha1()
+    for rule in rules:
+        fingerprint.update(rule.pattern.encode('utf-8'))
+        fingerprint.update(str(rule.flags).encode('utf-8'))
+    for list_pattern in LIST_TYPES:
+        fingerprint.update(list_pattern.encode('utf-8'))
+    return fingerprint.hexdigest()
+
+
 def _list_type(list_string: str):
     for list_pattern in LIST_TYPES:
         if re.match(list_pattern, list_string):
@@ -140,164 +173,220 @@ def _get_list_sequence(flags: list, lines: list):
     return list_stack
 
 
+def _is_empty(line: str) -> bool:
+    """
+    Same as EMPTY_LINE.match for single line (without line breaks).
+    """
+    return not line or line.isspace()
+
+
 def _normalize_lines(text_lines: list) -> list:
-    i, lines_size = 1, len(text_lines)
-    normalized = [text_lines[0]]
+    """
+    Join lines which continue previous sentence (starts with lowercase letter)
+    and remove empty lines.
+
+    :param text_lines: list of lines
+    :return: list of normalized lines
+    """
+    return list(_iter_normalized_lines(text_lines))
+
+
+def _split_lines(lines):
+    """
+    Split lines (for example lines of file which ends with line break)
+    in the same way as str.splitlines splits whole text.
+    """
+    for line in lines:
+        yield from line.splitlines() or ['']
+
+
+def _iter_normalized_lines(text_lines):
+    """
+    Normalize iterable of lines, next line is yielded only when it is known
+    that it will not be continued. Pieces of each line are joined once.
+    """
+    text_lines = iter(text_lines)
+    first = next(text_lines, None)
+    if first is None:
+        raise IndexError('list index out of range')
 
-    while i < lines_size:
-        line = text_lines[i]
+    pieces, is_empty = [first], _is_empty(first)
+    for line in text_lines:
         # continue previous sentence
-        if re.match(r'\s*^[a-z]+', line):
-            while len(normalized) > 0 and EMPTY_LINE.match(normalized[-1]):
-                normalized.pop()
-            normalized[-1] += line
+        if CONTINUATION.match(line):
+            if is_empty:
+                # nothing to continue (only empty lines before)
+                raise IndexError('list index out of range')
+            pieces.append(line)
+        elif not is_empty and not _is_empty(line):
+            yield ''.join(pieces)
+            pieces = [line]
+    yield ''.join(pieces)
+
+
+# classes of lines
+_EMPTY, _TITLE, _PLAIN, _LIST, _SECTION, _UPPERCASE_SECTION = range(6)
+# class of line by number of matched group of LINE_CLASS
+_GROUP_CLASSES = {LINE_CLASS.groupindex['section']: _SECTION,
+                  LINE_CLASS.groupindex['exact_section']: _SECTION,
+                  LINE_CLASS.groupindex['single_number']: _PLAIN,
+                  LINE_CLASS.groupindex['list']: _LIST}
+_SECTIONS_RUN = re.compile(bytes([ord('['), _SECTION, ord(']'), ord('+')]))
+
+
+def _line_class(line: str) -> int:
+    # in case of empty line or line with whitespaces
+    if not line or line.isspace():
+        return _EMPTY
+    match = LINE_CLASS.match(line)
+    if match is None:
+        return _PLAIN
+    line_class = _GROUP_CLASSES[match.lastindex]
+    if line_class == _SECTION and line.isupper():
+        return _UPPERCASE_SECTION
+    return line_class
+
+
+def _line_classes(text_lines):
+    """
+    Classify each normalized line once.
+
+    :param text_lines: iterable of normalized lines
+    :return: generator of classes of lines
+    """
+    text_lines = iter(text_lines)
+    first = next(text_lines)
+
+    # check that file has 'Exhibit' line
+    if EXHIBIT.match(first):
+        yield _PLAIN
+        # next nonempty line is title
+        for line in text_lines:
+            if _is_empty(line):
+                yield _EMPTY
+            else:
+                yield _TITLE
+                break
         else:
-            if not EMPTY_LINE.match(normalized[-1]) and not EMPTY_LINE.match(line):
-                normalized.append(line)
+            raise IndexError('list index out of range')
+    # check that first line of file has title
+    elif TITLE.match(first):
+        yield _TITLE
+    else:
+        yield _line_class(first)
 
-        i += 1
+    yield from map(_line_class, text_lines)
 
-    return normalized
+
+# bit flags and ids of tags by class of line
+_CLASS_BITS = bytes.maketrans(bytes([_EMPTY, _TITLE, _PLAIN, _LIST, _SECTION, _UPPERCASE_SECTION]),
+                              bytes([0, (1 << 0), (1 << 0) | (1 << 1), (1 << 0) | (1 << 1),
+                                     (1 << 0), (1 << 0)]))
+_CLASS_TAG_IDS = bytes.maketrans(bytes([_EMPTY, _TITLE, _PLAIN, _LIST, _SECTION, _UPPERCASE_SECTION]),
+                                 bytes([TagFlags.tag_id(None), TagFlags.tag_id(FileTags.TITLE),
+                                        TagFlags.tag_id(FileTags.PLAIN_TEXT), TagFlags.tag_id(FileTags.LIST),
+                                        TagFlags.tag_id(FileTags.SECTION), TagFlags.tag_id(FileTags.SECTION)]))
+
+
+def _tag_flags(classes: array) -> TagFlags:
+    """
+    Generate tags of lines using classes of lines.
+
+    Uppercase sections are plain text in case of mixed (uppercase and not) sections,
+    each second section closes previous section if it is right before it,
+    last line closes section in case of even count of sections.
+
+    :param classes: array of classes of lines
+    :return: TagFlags
+    """
+    # checking that right matched sections
+    classes = classes.tobytes()
+    if _SECTION in classes:
+        classes = classes.replace(bytes([_UPPERCASE_SECTION]), bytes([_PLAIN]))
+    else:
+        classes = classes.replace(bytes([_UPPERCASE_SECTION]), bytes([_SECTION]))
+
+    bits = array('B', classes.translate(_CLASS_BITS))
+    tag_ids = array('B', classes.translate(_CLASS_TAG_IDS))
+
+    # sections go in runs of consecutive lines
+    section_pos = 0
+    for run in _SECTIONS_RUN.finditer(classes):
+        start, end = run.span()
+        first = start if section_pos % 2 == 0 else start + 1
+        for i in range(first, end - 1, 2):
+            bits[i] = (1 << 0) | (1 << 1)
+        section_pos += end - start
+
+    # case not closed section
+    if section_pos and section_pos % 2 == 0:
+        bits[-1] = (1 << 1)
+        tag_ids[-1] = TagFlags.tag_id(FileTags.SECTION)
+    return TagFlags(bits, tag_ids)
+
+
+def _tag_line(line: str, bit_flags: int, tag) -> str:
+    """
+    Add tags to line in the same way as parse_raw_text.
+    """
+    if tag:
+        # opened tag
+        if bit_flags & (1 << 0):
+            line = tag.op() + ' ' + line
+        # closed tag
+        if bit_flags & (1 << 1):
+            line = line.rstrip() + ' ' + tag.cl()
+    return line
 
 
 # MAGIC METHOD
-def tag_positions(text: str) -> tuple:
+def tag_positions(text: str, *, profile: Profile = None) -> tuple:
     """
     Generate list of tags positions and lines which match these tags.
 
+    Each line is classified only once (single match of LINE_CLASS),
+    after that tags are generated from classes of lines.
+
     :param text: str, which will used for searching tags
-    :return: tuple of lists
+    :param profile: Profile, time of stages and counters of lines and tags are added to it
+    :return: tuple of TagFlags (works as list of tuples (<bit flags>, <tag>)) and list of lines
     """
+    if profile is not None:
+        return _profiled_tag_positions(text, profile)
 
     text_lines = _normalize_lines(text.splitlines())
-    lines_length = len(text_lines)
+    classes = array('B', _line_classes(text_lines))
     # first - bit marks of opening/closing tag, second - tag
-    flags = [(0, None) for _ in text_lines]
-
+    flags = _tag_flags(classes)
+    return flags, text_lines
 
-    title_pos = 0
-    # check that file has 'Exhibit' line
-    if EXHIBIT.match(text_lines[title_pos]):
-        title_pos += 1
-        while EMPTY_LINE.match(text_lines[title_pos]):
-            title_pos += 1
-        flags[title_pos] = ((1 << 0), FileTags.TITLE)
-        title_pos += 1
-    # check that first line of file has title
-    elif TITLE.match(text_lines[title_pos]):
-        flags[title_pos] = ((1 << 0), FileTags.TITLE)
-        title_pos += 1
-
-    # searching another tags
-    for i in range(title_pos, lines_length):
-        line = text_lines[i]
-        # in case of empty line or line with whitespaces
-        if EMPTY_LINE.match(line):
-            continue
-        elif SECTION.match(line) or EXACT_SECTION.match(line):
-            flags[i] = ((1 << 0), FileTags.SECTION)
-            continue
-        elif LIST.match(line) and not SINGLE_NUMBER.match(line):
-            # set open tag bit and close tag bit
-            flags[i] = ((1 << 0) | (1 << 1), FileTags.LIST)
-
-    # for i in range(1, lines_length - 1):
-    #     flag, item_type = flags[i]
-    #     # remove mismatched sections inside of lists
-    #     if flag == 's':
-    #         # checking if marked 'i' as section between one list
-    #         upper, lower = i - 1, i + 1
-    #         while upper > 0:
-    #             _, upper_type = flags[upper]
-    #             while lower < len(flags):
-    #                 _, lower_type = flags[lower]
-    #                 if _is_same_types_of_list(upper_type, lower_type):
-    #                     flags[i] = ('', '')
-    #                 lower += 1
-    #             upper -= 1
 
-    # checking that right matched sections
-    def is_all_sections_uppercase(tags, lines):
-        """
-        Check that all text which matched as section is uppercase.
-
-        :param tags: list of tuples
-        :param lines: list of text strings
-        :return: True if all sections is uppercase and False otherwise.
-        """
-        all_sections_uppercase = True
-        for pos in range(len(lines)):
-            if tags[pos][1] != FileTags.SECTION:
-                continue
-            if not lines[pos].isupper():
-                all_sections_uppercase = False
-                break
-        return all_sections_uppercase
-
-    if not is_all_sections_uppercase(flags, text_lines):
-        for i in range(title_pos, lines_length):
-            info, tag = flags[i]
-            line = text_lines[i]
-            if tag == FileTags.SECTION and line.isupper():
-                flags[i] = (0, None)
-
-    # set not marked lines as plain text
-    for i in range(lines_length):
-        line = text_lines[i]
-        if EMPTY_LINE.match(line) or flags[i][1]:
-            continue
-        else:
-            flags[i] = ((1 << 0) | (1 << 1), FileTags.PLAIN_TEXT)
-
-    def prettify_tags(tags: list):
-        """
-        Generate list of tuples where each element has structure of tuple where:
-
-        - first element is number where first bit (0 indexed) indicates that opened tag
-          and second bit indicates that closed tag
-        - second element is tag (Tag object)
-
-        :param tags: list of rude parsed tags.
-        :return:
-        """
-
-        # list of tuples, where each element has structure - (<bit flags>, <tag>)
-        tag_pos, tags_size = 0, len(tags)
-        is_opened_section, any_section = False, False
-        while tag_pos < tags_size:
-            modifier, tag = tags[tag_pos]
-            if tag == FileTags.SECTION:
-                if is_opened_section:
-                    # close tag
-                    flag, tag = tags[tag_pos - 1]
-                    if tag == FileTags.SECTION:
-                        tags[tag_pos - 1] = flag | (1 << 1), tag
-                # open tag
-                tags[tag_pos] = ((1 << 0), FileTags.SECTION)
-                is_opened_section = not is_opened_section
-                any_section = True
-            elif tag == 'p':
-                # set open tag bit and close tag bit
-                bit_flags = (1 << 0) | (1 << 1)
-                tags[tag_pos] = (bit_flags, FileTags.PLAIN_TEXT)
-            # case not closed section
-            if tag_pos + 1 == tags_size and any_section and not is_opened_section:
-                tags[tag_pos] = ((1 << 1), FileTags.SECTION)
-            tag_pos += 1
-
-    prettify_tags(flags)
+def _profiled_tag_positions(text: str, profile: Profile) -> tuple:
+    with profile.stage('normalize'):
+        text_lines = _normalize_lines(text.splitlines())
+    with profile.stage('classify'):
+        classes = array('B', _line_classes(text_lines))
+    with profile.stage('tags'):
+        flags = _tag_flags(classes)
+    profile.add('chars', len(text))
+    profile.add('lines', len(text_lines))
+    profile.count_tags(flags)
     return flags, text_lines
 
 
-def generate_tree(text: str) -> TextTree:
+def generate_tree(text: str, *, profile: Profile = None) -> TextTree:
     """
     Generate text tree with tags.
 
     :param text: string which need to be tagged
+    :param profile: Profile, time of stages and counters are added to it
     :return: TextTree object
     """
-    text_tags, lines = tag_positions(text)
-    return build_tree(text_tags)
+    text_tags, lines = tag_positions(text, profile=profile)
+    if profile is None:
+        return build_tree(text_tags)
+    with profile.stage('build_tree'):
+        return build_tree(text_tags)
 
 
 # MAGIC METHOD
@@ -311,9 +400,7 @@ def parse_raw_text(text: str) -> str:
 
     text_tags, lines = tag_positions(text)
 
-    i, lines_size = 0, len(lines)
-    while i < lines_size:
-        bit_flags, tag = text_tags[i]
+    for i, (bit_flags, tag) in enumerate(text_tags):
         if tag:
             # opened tag
             if bit_flags & (1 << 0):
@@ -321,7 +408,53 @@ def parse_raw_text(text: str) -> str:
             # closed tag
             if bit_flags & (1 << 1):
                 lines[i] = lines[i].rstrip() + ' ' + tag.cl()
-        i += 1
 
     # TODO: remove lines without text
     return '\n'.join(lines)
+
+
+def iter_tagged_lines(text_lines, *, max_memory_size: int = SPILL_SIZE, profile: Profile = None):
+    """
+    Parse lines and add tags to them, same as parse_raw_text but without loading whole text.
+
+    Tags of lines depend on all sections of text, so normalized lines are spilled
+    to temporary file (kept in memory while they are smaller than max_memory_size)
+    and tagged on the second pass.
+
+    :param text_lines: iterable of lines (for example opened file)
+    :param max_memory_size: int, size of normalized lines (in bytes) which will be kept in memory
+    :param profile: Profile, time of stages and counters of lines and tags are added to it
+    :return: generator of tagged lines (without line breaks)
+    """
+    if profile is not None:
+        return profile.iter('format', _iter_tagged_lines(text_lines, max_memory_size, profile))
+    return _iter_tagged_lines(text_lines, max_memory_size, None)
+
+
+def _not_timed(name: str, iterable):
+    return iterable
+
+
+def _iter_tagged_lines(text_lines, max_memory_size: int, profile):
+    timed = profile.iter if profile is not None else _not_timed
+    with tempfile.SpooledTemporaryFile(max_size=max_memory_size, mode='w+',
+                                       encoding='utf-8', errors='surrogatepass',
+                                       newline='\n') as spill:
+        def spilled(lines):
+            for line in lines:
+                spill.write(line)
+                spill.write('\n')
+                yield line
+
+        normalized_lines = timed('normalize', _iter_normalized_lines(_split_lines(text_lines)))
+        classes = array('B', timed('classify', _line_classes(timed('spill', spilled(normalized_lines)))))
+        if profile is None:
+            flags = _tag_flags(classes)
+        else:
+            with profile.stage('tags'):
+                flags = _tag_flags(classes)
+            profile.add('lines', len(classes))
+            profile.count_tags(flags)
+        spill.seek(0)
+        for line, (bit_flags, tag) in zip(spill, flags):
+            yield _tag_line(line[:-1], bit_flags, tag)
@@ -0,0 +1,92 @@
+import time
+import contextlib
+import collections
+
+
+class Profile:
+    """
+    Time of stages and counters of processed data.
+
+    Time of stage is exclusive: when stage is entered from another stage
+    (for example generator of one stage reads lines from generator of another stage),
+    time of outer stage is paused. Functions which take profile do nothing extra in case of None.
+    """
+    __slots__ = ('timings', 'counters', '__stack', '__last')
+
+    def __init__(self):
+        self.timings = collections.defaultdict(float)
+        self.counters = collections.Counter()
+        self.__stack = []
+        self.__last = 0.0
+
+    def enter(self, name: str):
+        now = time.perf_counter()
+        if self.__stack:
+            self.timings[self.__stack[-1]] += now - self.__last
+        self.__stack.append(name)
+        self.__last = now
+
+    def exit(self):
+        now = time.perf_counter()
+        self.timings[self.__stack.pop()] += now - self.__last
+        self.__last = now
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        self.enter(name)
+        try:
+            yield self
+        finally:
+            self.exit()
+
+    def iter(self, name: str, iterable):
+        """
+        Pass items of iterable, time of getting each item is added to stage.
+        """
+        iterator = iter(iterable)
+        while True:
+            self.enter(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.exit()
+            yield item
+
+    def add(self, name: str, value: int = 1):
+        self.counters[name] += value
+
+    def count_tags(self, flags):
+        """
+        Count opened tags by type.
+
+        :param flags: TagFlags
+        """
+        opened = collections.Counter(tag_id for bit_flags, tag_id in zip(flags.bits, flags.tag_ids)
+                                     if bit_flags & (1 << 0))
+        for tag_id, count in opened.items():
+            self.counters['tags ' + str(flags.TAGS[tag_id])] += count
+
+    def total(self) -> float:
+        return sum(self.timings.values())
+
+    def merge(self, other):
+        """
+        Add timings and counters of another profile (for example profile of one file).
+        """
+        for name, seconds in other.timings.items():
+            self.timings[name] += seconds
+        self.counters.update(other.counters)
+        return self
+
+    def as_dict(self) -> dict:
+        return {'timings': dict(self.timings), 'counters': dict(self.counters)}
+
+    def __getstate__(self):
+        return self.as_dict()
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.timings.update(state['timings'])
+        self.counters.update(state['counters'])
@@ -0,0 +1,118 @@
+from array import array
+from collections.abc import MutableSequence
+from parser.tag import Tag, FileTags
+
+
+class TagFlags(MutableSequence):
+    """
+    Compact tags of lines.
+
+    Bit flags (first bit - opened tag, second bit - closed tag) and ids of tags
+    are stored in two parallel byte arrays, id of tag is index in TAGS.
+    Object works as list of tuples (<bit flags>, <tag>): items are appended, inserted
+    and assigned as tuples, slices are TagFlags too.
+    """
+    __slots__ = ('bits', 'tag_ids')
+
+    TAGS = [None, FileTags.TITLE, FileTags.PLAIN_TEXT, FileTags.LIST,
+            FileTags.SECTION, FileTags.LIST_ITEM]
+
+    def __init__(self, bits=None, tag_ids=None):
+        self.bits = bits if bits is not None else array('B')
+        self.tag_ids = tag_ids if tag_ids is not None else array('B', bytes(len(self.bits)))
+        if len(self.bits) != len(self.tag_ids):
+            raise ValueError('bits and tag ids have different sizes')
+
+    @classmethod
+    def from_tuples(cls, tags):
+        """
+        Create compact tags from iterable of tuples (<bit flags>, <tag>).
+        """
+        flags = cls()
+        flags.extend(tags)
+        return flags
+
+    @classmethod
+    def tag_id(cls, tag: Tag) -> int:
+        for i, known_tag in enumerate(cls.TAGS):
+            if known_tag == tag:
+                return i
+        raise ValueError('unknown tag {}'.format(tag))
+
+    def append(self, value: tuple):
+        bit_flags, tag = value
+        self.bits.append(bit_flags)
+        self.tag_ids.append(self.tag_id(tag))
+
+    def extend(self, values):
+        if isinstance(values, TagFlags):
+            self.bits.extend(values.bits)
+            self.tag_ids.extend(values.tag_ids)
+            return
+        for value in values:
+            self.append(value)
+
+    def insert(self, item: int, value: tuple):
+        bit_flags, tag = value
+        self.bits.insert(item, bit_flags)
+        self.tag_ids.insert(item, self.tag_id(tag))
+
+    def tuples(self) -> list:
+        """
+        Tags as list of tuples (<bit flags>, <tag>).
+        """
+        return list(self)
+
+    def copy(self):
+        return TagFlags(array('B', self.bits), array('B', self.tag_ids))
+
+    def __len__(self):
+        return len(self.bits)
+
+    def __iter__(self):
+        tags = self.TAGS
+        for bit_flags, tag_id in zip(self.bits, self.tag_ids):
+            yield bit_flags, tags[tag_id]
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return TagFlags(self.bits[item], self.tag_ids[item])
+        return self.bits[item], self.TAGS[self.tag_ids[item]]
+
+    def __setitem__(self, item, value):
+        if isinstance(item, slice):
+            values = value if isinstance(value, TagFlags) else TagFlags.from_tuples(value)
+            self.bits[item] = values.bits
+            self.tag_ids[item] = values.tag_ids
+            return
+        bit_flags, tag = value
+        self.bits[item] = bit_flags
+        self.tag_ids[item] = self.tag_id(tag)
+
+    def __delitem__(self, item):
+        del self.bits[item]
+        del self.tag_ids[item]
+
+    def __add__(self, other):
+        flags = self.copy()
+        flags.extend(other)
+        return flags
+
+    def __radd__(self, other):
+        flags = TagFlags.from_tuples(other)
+        flags.extend(self)
+        return flags
+
+    def __eq__(self, other):
+        if isinstance(other, TagFlags):
+            return self.bits == other.bits and self.tag_ids == other.tag_ids
+        try:
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        except TypeError:
+            return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __repr__(self):
+        return 'TagFlags({})'.format(self.tuples())
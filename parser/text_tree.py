@@ -1,21 +1,20 @@
 from parser.tag import Tag
-from queue import Queue
+from collections import deque
 
 
 class TextTree:
-    # tree params
-    parent = None
-    subtrees = []
-    # tree data
-    tag, op_pos, cl_pos = None, 0, 0
+    __slots__ = ('parent', 'subtrees', 'tag', 'op_pos', 'cl_pos', 'tag_index')
 
     def __init__(self, start_pos: int, end_pos: int, tag: Tag, parent=None):
+        # tree params
         self.parent = parent
         self.subtrees = []
-        # data
+        # tree data
         self.tag = tag
         self.op_pos = start_pos
         self.cl_pos = end_pos
+        # positions of tags in whole tree (only for tree built by build_tree)
+        self.tag_index = None
 
     def __str__(self):
         return "<tag={},left={},right={},subtrees_size={}>".format(str(self.tag),
@@ -31,16 +30,24 @@ class TextTree:
         return repr_text
 
     def tag_lines(self, tag: Tag) -> list:
+        """
+        Positions of tag in tree in breadth-first order.
+
+        :param tag: Tag (None for root of tree)
+        :return: list of tuples (<opening line>, <closing line>)
+        """
+        # only tags are indexed, root (and anything else) is found by traversal
+        if self.tag_index is not None and isinstance(tag, Tag):
+            return list(self.tag_index.get(str(tag), []))
+
         positions = []
-        nodes = Queue()
-        nodes.put(self)
+        nodes = deque([self])
 
-        while not nodes.empty():
-            node = nodes.get()
+        while nodes:
+            node = nodes.popleft()
             if node.tag == tag:
                 positions.append((node.op_pos, node.cl_pos))
-            for item in node.subtrees:
-                nodes.put(item)
+            nodes.extend(node.subtrees)
         return positions
 
     @staticmethod
@@ -69,15 +76,12 @@ class TextTree:
             if not t or not isinstance(t, TextTree):
                 return
 
-            nodes_queue = Queue()
-            nodes_queue.put(t)
+            nodes_queue = deque([t])
 
-            while not nodes_queue.empty():
-                node = nodes_queue.get()
+            while nodes_queue:
+                node = nodes_queue.popleft()
                 print_tag(node)
-
-                for item in node.subtrees:
-                    nodes_queue.put(item)
+                nodes_queue.extend(node.subtrees)
 
         if is_recursive:
             recursive(tree)
@@ -88,27 +92,36 @@ class TextTree:
 def build_tree(tags: list):
     """
     Building tree using list of tags.
+    Tree has index of tags, so TextTree.tag_lines of whole tree doesn't walk through the tree.
 
-    :param tags: list of tuples where each element is a tuple where first element - bit flag, second - Tag
+    :param tags: list of tuples (or TagFlags) where each element is a tuple where first element - bit flag, second - Tag
     :return: TextTree object
     """
     
     tags_size = len(tags)
     tree = TextTree(0, tags_size, None)
-    current = tree
+    current, depth = tree, 0
+    # tuples (<depth>, <node>) for each tag in order of opening
+    nodes = {}
 
-    i = 0
-    while i < tags_size:
-        bit_flag, curr_tag = tags[i]
+    for i, (bit_flag, curr_tag) in enumerate(tags):
         if curr_tag:
             # open tag
             if bit_flag & (1 << 0):
                 tmp = TextTree(start_pos=i, end_pos=i, tag=curr_tag, parent=current)
                 current.subtrees.append(tmp)
                 current = tmp
+                depth += 1
+                nodes.setdefault(str(curr_tag), []).append((depth, tmp))
             # close tag
             if bit_flag & (1 << 1):
                 current.cl_pos = i
                 current = current.parent
-        i += 1
+                depth -= 1
+
+    # breadth-first order is order of opening sorted by depth
+    tree.tag_index = {}
+    for tag_name, tag_nodes in nodes.items():
+        tag_nodes.sort(key=lambda item: item[0])
+        tree.tag_index[tag_name] = [(node.op_pos, node.cl_pos) for _, node in tag_nodes]
     return tree
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# modules of repository are imported from its root (as file_parser.py does)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
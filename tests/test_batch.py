@@ -0,0 +1,50 @@
+import concurrent.futures
+
+import pytest
+
+from parser import FileTags, parse_raw_text, generate_tree, map_texts, parse_many, generate_trees
+from benchmarks.contracts import generate_contract
+
+TEXTS = [generate_contract(1000 + 100 * i, seed=i) for i in range(40)]
+TAGS = [FileTags.TITLE, FileTags.SECTION, FileTags.LIST, FileTags.PLAIN_TEXT, None]
+
+
+def tree_lines(tree) -> list:
+    return [tree.tag_lines(tag) for tag in TAGS]
+
+
+@pytest.mark.parametrize('workers, executor', [(1, 'process'), (3, 'process'), (3, 'thread')])
+def test_parse_many_keeps_order(workers, executor):
+    expected = [parse_raw_text(text) for text in TEXTS]
+    assert list(parse_many(iter(TEXTS), workers=workers, executor=executor, chunksize=3)) == expected
+
+
+@pytest.mark.parametrize('workers, executor', [(1, 'process'), (3, 'process'), (3, 'thread')])
+def test_generate_trees_keeps_order(workers, executor):
+    expected = [tree_lines(generate_tree(text)) for text in TEXTS]
+    trees = generate_trees(TEXTS, workers=workers, executor=executor, chunksize=4)
+    assert [tree_lines(tree) for tree in trees] == expected
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_unordered_results_have_indices(workers):
+    results = dict(map_texts(len, TEXTS, workers=workers, executor='thread', chunksize=5, ordered=False))
+    assert results == {i: len(text) for i, text in enumerate(TEXTS)}
+
+
+def test_shared_executor_and_exceptions():
+    texts = ['Agreement\nSome text.', '\nlowercase line', 'Title\n1. First item']
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(parse_many(texts, executor=executor, chunksize=1, return_exceptions=True))
+        # executor is not shut down by map_texts
+        assert executor.submit(len, 'text').result() == 4
+    assert results[0] == parse_raw_text(texts[0])
+    assert isinstance(results[1], IndexError)
+    assert results[2] == parse_raw_text(texts[2])
+    with pytest.raises(IndexError):
+        list(parse_many(texts, workers=2, executor='thread', chunksize=1))
+
+
+def test_unknown_executor():
+    with pytest.raises(ValueError):
+        list(map_texts(len, TEXTS, executor='gpu'))
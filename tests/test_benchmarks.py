@@ -0,0 +1,53 @@
+import math
+
+import pytest
+
+from parser import FileTags, tag_positions
+from benchmarks import run as benchmarks_run
+from benchmarks.contracts import generate_contract, parse_size, format_size
+
+
+@pytest.mark.parametrize('text, size', [('512', 512), ('1KB', 1 << 10), (' 10mb ', 10 << 20), ('2GB', 2 << 30)])
+def test_sizes(text, size):
+    assert parse_size(text) == size
+    assert parse_size(format_size(size)) == size
+
+
+def test_wrong_size():
+    with pytest.raises(ValueError):
+        parse_size('10 MiB')
+
+
+def test_contract_is_seeded_and_has_tags():
+    text = generate_contract(20000, seed=3)
+    assert len(text) >= 20000
+    assert text == generate_contract(20000, seed=3)
+    assert text != generate_contract(20000, seed=4)
+    flags, _ = tag_positions(text)
+    tags = [tag for bit_flags, tag in flags if bit_flags & (1 << 0)]
+    for tag in (FileTags.TITLE, FileTags.SECTION, FileTags.LIST, FileTags.PLAIN_TEXT):
+        assert tag in tags
+
+
+def test_scaling_and_comparison():
+    results = [{'benchmark': 'linear', 'size': str(size), 'bytes': size, 'seconds': size * 1e-6}
+               for size in (1000, 10000, 100000)]
+    results += [{'benchmark': 'quadratic', 'size': str(size), 'bytes': size, 'seconds': (size * 1e-3) ** 2}
+                for size in (1000, 10000)]
+    exponents = benchmarks_run.scaling(results)
+    assert math.isclose(exponents['linear'], 1)
+    assert math.isclose(exponents['quadratic'], 2)
+
+    baseline = [dict(result, seconds=result['seconds'] / 2) for result in results[:2]]
+    comparison = benchmarks_run.compare(results, baseline, tolerance=0.5)
+    assert [(ratio, is_regression) for _, ratio, is_regression in comparison] == [(2, True), (2, True)]
+    assert not any(is_regression for _, _, is_regression in benchmarks_run.compare(results, baseline, 1.5))
+
+
+def test_run():
+    results = list(benchmarks_run.run(list(benchmarks_run.BENCHMARKS), [1 << 10], min_time=0))
+    assert [result['benchmark'] for result in results] == list(benchmarks_run.BENCHMARKS)
+    for result in results:
+        assert result['size'] == '1KB'
+        assert result['seconds'] > 0
+        assert result['peak_mb'] >= 0
@@ -0,0 +1,51 @@
+import numpy as np
+import scipy.sparse
+
+from classification import clustering
+
+
+def blobs(count: int = 60, seed: int = 0):
+    # three well separated groups of rows
+    rng = np.random.default_rng(seed)
+    centers = np.array([[10, 0, 0, 0], [0, 10, 0, 0], [0, 0, 10, 0]], dtype=float)
+    return np.vstack([center + rng.normal(scale=0.5, size=(count, 4)) for center in centers])
+
+
+def test_sweep_in_order_of_counts():
+    features = blobs()
+    scores = clustering.sweep_clusters(features, [4, 2, 3], batch_size=64, random_state=1)
+    assert [score.k for score in scores] == [2, 3, 4]
+    assert all(len(score.labels) == len(features) for score in scores)
+    assert max(scores, key=lambda score: score.silhouette).k == 3
+    assert scores[0].inertia > scores[1].inertia
+
+
+def test_workers_give_the_same_scores():
+    features = scipy.sparse.csr_matrix(np.abs(blobs()))
+    sequential = clustering.sweep_clusters(features, [2, 3], batch_size=64, random_state=1)
+    parallel = clustering.sweep_clusters(features, [2, 3], batch_size=64, random_state=1, workers=2)
+    for first, second in zip(sequential, parallel):
+        assert first.k == second.k
+        assert np.isclose(first.inertia, second.inertia)
+        assert np.array_equal(first.labels, second.labels)
+
+
+def test_warm_start():
+    features = blobs()
+    scores = clustering.sweep_clusters(features, [2, 3, 4], warm_start=True, batch_size=64,
+                                       silhouette_sample=0, random_state=1)
+    assert [score.k for score in scores] == [2, 3, 4]
+    assert all(score.silhouette is None for score in scores)
+    assert [len(np.unique(score.labels)) for score in scores][:2] == [2, 3]
+
+    centers = clustering._extend_centers(features, features[:1], 2, np.random.default_rng(0))
+    assert centers.shape == (3, 4)
+
+
+def test_reduce_features():
+    matrix = scipy.sparse.csr_matrix(np.abs(blobs()))
+    features = clustering.reduce_features(matrix, 2, random_state=0)
+    assert features.shape == (matrix.shape[0], 2)
+    assert np.allclose(np.linalg.norm(features, axis=1), 1)
+    scores = clustering.sweep_clusters(matrix, [3], svd_components=2, batch_size=64, random_state=1)
+    assert scores[0].k == 3
@@ -0,0 +1,48 @@
+import os
+import json
+
+import numpy as np
+
+from classification.dataset import build_dataset, SectionDataset, TEXTS_NAME
+
+
+def write_marks(path, files: dict):
+    with open(path, 'w', encoding='utf-8') as out_file:
+        json.dump({'files': files}, out_file)
+
+
+def test_build_and_read(tmp_path):
+    marks = str(tmp_path / 'marks.json')
+    write_marks(marks, {'a.txt': {'title': 'Agreement', 'marks': [['he', 'Definitions'], ['plain', 'Some text.']]},
+                        'b.txt': {'marks': [['unknown', 'Ünïcode text']]}})
+    dataset = build_dataset(marks, str(tmp_path / 'dataset'))
+    assert len(dataset) == 4
+    assert dataset.texts(range(4)) == ['Agreement', 'Definitions', 'Some text.', 'Ünïcode text']
+    assert [dataset.label_names[code] for code in dataset.labels] == ['title', 'he', 'plain', 'unknown']
+    assert [dataset.file_names[code] for code in dataset.files] == ['a.txt', 'a.txt', 'a.txt', 'b.txt']
+    texts, labels = next(dataset.iter_chunks(chunk_size=3))
+    assert texts == ['agreement', 'definitions', 'some text.']
+    assert np.array_equal(labels, [0, 1, 3])
+
+
+def test_sections_with_empty_texts(tmp_path):
+    marks = str(tmp_path / 'marks.json')
+    write_marks(marks, {'a.txt': {'marks': [['plain', ''], ['he', '']]}})
+    folder = str(tmp_path / 'dataset')
+    build_dataset(marks, folder)
+    assert os.path.getsize(os.path.join(folder, TEXTS_NAME)) == 0
+    dataset = SectionDataset(folder)
+    assert len(dataset) == 2
+    assert dataset.texts([0, 1]) == ['', '']
+
+
+def test_empty_file_of_texts(tmp_path):
+    marks = str(tmp_path / 'marks.json')
+    write_marks(marks, {'a.txt': {'marks': [['plain', 'Some text.']]}})
+    folder = str(tmp_path / 'dataset')
+    build_dataset(marks, folder)
+    # texts were lost, but dataset is opened
+    open(os.path.join(folder, TEXTS_NAME), 'wb').close()
+    dataset = SectionDataset(folder)
+    assert len(dataset) == 1
+    assert dataset.text(0) == ''
@@ -0,0 +1,39 @@
+import numpy as np
+
+from classification import MinHasher, LSHIndex
+
+TEXT = 'The Supplier shall deliver the goods to the premises of the Buyer within thirty days of the order'
+
+
+def test_add_and_query():
+    index = LSHIndex()
+    assert index.add('a', TEXT) == []
+    assert index.add('b', 'Unrelated clause about governing law of the State of New York and courts') == []
+    duplicates = index.add('c', TEXT + '.')
+    assert [item_id for item_id, _ in duplicates] == ['a']
+    assert len(index) == 3
+    assert np.array_equal(index.signature('c'), index.hasher.signature(TEXT + '.'))
+
+
+def test_signatures_are_not_copied_on_add():
+    index = LSHIndex()
+    rng = np.random.default_rng(0)
+    signatures = rng.integers(0, 1 << 32, size=(10000, index.hasher.num_perm), dtype=np.uint32)
+    for pos, signature in enumerate(signatures):
+        index.add_signature(pos, signature)
+        # signatures are read after each add, so copies of all signatures would be quadratic
+        assert index.signature(pos)[0] == signature[0]
+    assert np.array_equal(index.signatures(), signatures)
+
+
+def test_add_to_loaded_index(tmp_path):
+    index = LSHIndex()
+    index.add(('doc', 0, 1), TEXT)
+    index.save(str(tmp_path))
+
+    loaded = LSHIndex.load(str(tmp_path))
+    assert np.array_equal(loaded.signatures(), index.signatures())
+    duplicates = loaded.add(('doc', 2, 3), TEXT)
+    assert duplicates == [(('doc', 0, 1), 1.0)]
+    assert np.array_equal(loaded.signature(('doc', 2, 3)), MinHasher().signature(TEXT))
+    assert len(loaded.signatures()) == 2
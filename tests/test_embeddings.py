@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from classification import embeddings
+from classification.embeddings import Embeddings, convert_glove
+
+GLOVE = {'the': [0.1, 0.2, 0.3], 'party': [-1.5, 2.0, 0.25], 'new york': [3.0, -0.5, 1e-3],
+         'fee': [0.0, 0.0, 1.0], '.': [7.0, 8.0, 9.0]}
+
+
+@pytest.fixture
+def glove_prefix(tmp_path, monkeypatch):
+    # several chunks of lines are converted
+    monkeypatch.setattr(embeddings, 'CONVERT_CHUNK', 2)
+    path = tmp_path / 'glove.test.3d.txt'
+    with open(str(path), 'w', encoding='utf-8') as out_file:
+        for word, vector in GLOVE.items():
+            out_file.write('{} {}\n'.format(word, ' '.join(str(value) for value in vector)))
+    return convert_glove(str(path))
+
+
+def test_convert_glove(glove_prefix):
+    assert glove_prefix.endswith('glove.test.3d')
+    vectors = Embeddings(glove_prefix)
+    assert isinstance(vectors.vectors, np.memmap)
+    assert vectors.dim == 3
+    assert len(vectors) == len(GLOVE)
+    for word, vector in GLOVE.items():
+        assert word in vectors
+        assert np.allclose(vectors[word], vector)
+    assert vectors.get('unknown') is None
+
+
+def test_embedding_matrix(glove_prefix):
+    vectors = Embeddings(glove_prefix)
+    word_index = {'party': 1, 'unknown': 2, 'fee': 4, 'the': 3}
+    matrix = vectors.embedding_matrix(word_index, fill='zeros')
+    assert matrix.shape == (5, 3)
+    assert np.allclose(matrix[[1, 3, 4]], [GLOVE['party'], GLOVE['the'], GLOVE['fee']])
+    assert not matrix[[0, 2]].any()
+
+    random_matrix = vectors.embedding_matrix(word_index, random_state=1)
+    assert np.allclose(random_matrix[1], GLOVE['party'])
+    assert ((random_matrix[2] >= 0) & (random_matrix[2] < 1)).all()
+    assert np.array_equal(random_matrix, vectors.embedding_matrix(word_index, random_state=1))
+    with pytest.raises(ValueError):
+        vectors.embedding_matrix(word_index, fill='ones')
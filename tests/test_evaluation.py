@@ -0,0 +1,39 @@
+import random
+
+import numpy as np
+import pytest
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.naive_bayes import MultinomialNB
+
+from classification import evaluation
+
+WORDS = ['party', 'agreement', 'term', 'payment', 'notice', 'law', 'state', 'court', 'fee', 'service']
+
+
+@pytest.mark.parametrize('vectorizer, is_invariant', [
+    (CountVectorizer(), True),
+    (CountVectorizer(min_df=0, binary=True), True),
+    (CountVectorizer(min_df=1.0), False),
+    (CountVectorizer(min_df=2), False),
+    (CountVectorizer(max_df=1), False),
+    (CountVectorizer(max_df=0.5), False),
+    (CountVectorizer(max_features=5), False),
+    (TfidfVectorizer(), False),
+])
+def test_fold_invariant_vectorizers(vectorizer, is_invariant):
+    assert evaluation._is_fold_invariant(vectorizer) == is_invariant
+
+
+def test_cached_counts_give_same_results(monkeypatch):
+    generator = random.Random(1)
+    labels = np.array([i % 3 for i in range(90)])
+    texts = [' '.join(generator.choice(WORDS[label * 3:label * 3 + 4] + WORDS) for _ in range(12))
+             for label in labels]
+    models = {'mnb': MultinomialNB()}
+    metrics = ('f1', 'accuracy', 'train_size', 'test_size')
+
+    cached = evaluation.cross_validate(models, texts, labels, n_splits=3, random_state=1)
+    monkeypatch.setattr(evaluation, '_is_fold_invariant', lambda vectorizer: False)
+    fitted = evaluation.cross_validate(models, texts, labels, n_splits=3, random_state=1)
+    for cached_fold, fitted_fold in zip(cached['mnb']['folds'], fitted['mnb']['folds']):
+        assert {key: cached_fold[key] for key in metrics} == {key: fitted_fold[key] for key in metrics}
@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+import pytest
+from nltk.stem import PorterStemmer
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from classification import features
+
+TEXTS = ['The Parties agree to the Terms of payment.',
+         'Payment of fees is due within thirty days.',
+         'Notices shall be given in writing to the Parties.',
+         'This Agreement is governed by the law of the State.',
+         'The Company shall pay the fees and expenses of the Parties.']
+
+
+@pytest.fixture(autouse=True)
+def split_tokenizer(monkeypatch):
+    # models of nltk tokenizer are not needed for tests of features
+    monkeypatch.setattr(features, 'word_tokenize', str.split)
+
+
+def test_tokenize_text():
+    assert features.tokenize_text('The Parties, agreed.') == ['the', 'parti', 'agre']
+    assert features.tokenize_text('The Parties, agreed.', stem=False, lowercase=False) == ['The', 'Parties', 'agreed']
+    assert features.stem_token('payments') == PorterStemmer().stem('payments')
+
+
+def test_tfidf_is_the_same_as_vectorizer_of_texts(tmp_path):
+    stop_words = ['the', 'of']
+    expected = TfidfVectorizer(tokenizer=features.tokenize_text, token_pattern=None, lowercase=False,
+                               stop_words=stop_words, max_df=0.9, min_df=1).fit_transform(TEXTS)
+    matrix, vectorizer = features.tfidf_features(TEXTS, stop_words=stop_words, max_df=0.9, min_df=1)
+    assert np.allclose(matrix.toarray(), expected.toarray())
+    cached, _ = features.tfidf_features(TEXTS, cache_folder=str(tmp_path), stop_words=stop_words,
+                                        max_df=0.9, min_df=1)
+    assert np.allclose(cached.toarray(), expected.toarray())
+    # vectorizer takes tokens
+    assert np.allclose(vectorizer.transform([features.tokenize_text(TEXTS[0])]).toarray(), expected[0].toarray())
+
+
+def test_cache_is_used_only_for_the_same_corpus(tmp_path, monkeypatch):
+    cache = features.FeatureCache(str(tmp_path))
+    tokens = cache.tokens(TEXTS)
+    matrix, _ = cache.tfidf(TEXTS, min_df=1, max_df=1.0)
+    files = sorted(os.listdir(str(tmp_path)))
+
+    def tokenize_texts(*args, **kwargs):
+        raise AssertionError('texts are tokenized again')
+
+    monkeypatch.setattr(features, 'tokenize_texts', tokenize_texts)
+    assert cache.tokens(TEXTS) == tokens
+    cached, _ = cache.tfidf(TEXTS, min_df=1, max_df=1.0)
+    assert (cached != matrix).nnz == 0
+    assert sorted(os.listdir(str(tmp_path))) == files
+
+    # matrix of another parameters is computed from cached tokens
+    other, _ = cache.tfidf(TEXTS, min_df=2, max_df=1.0)
+    assert other.shape[1] < matrix.shape[1]
+    assert len(os.listdir(str(tmp_path))) == len(files) + 2
+    # tokens of another texts are not taken from cache
+    with pytest.raises(AssertionError):
+        cache.tokens(TEXTS[:-1])
+    assert features.corpus_hash(['ab', 'c']) != features.corpus_hash(['a', 'bc'])
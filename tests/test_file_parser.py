@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import asyncio
+import concurrent.futures
+
+import pytest
+
+import file_parser
+
+
+@pytest.fixture
+def folders(tmp_path):
+    data, clean, parsed = tmp_path / 'data', tmp_path / 'clean', tmp_path / 'parsed'
+    for folder in (data, clean, parsed):
+        folder.mkdir()
+    return str(data), str(clean), str(parsed)
+
+
+def test_process_file(folders):
+    data, clean, parsed = folders
+    path = os.path.join(data, 'a.txt')
+    with open(path, 'w', encoding='utf-8') as out_file:
+        out_file.write('Agreement\nDefinitions\nSome text.\n')
+    file_parser.process_file(path, clean, parsed)
+    with open(os.path.join(clean, 'a.txt'), encoding='utf-8') as input_file:
+        assert input_file.read() == 'Agreement\nDefinitions\nSome text.\n'
+    with open(os.path.join(parsed, 'a.txt'), encoding='utf-8') as input_file:
+        assert input_file.read() == file_parser.parse_raw_text('Agreement\nDefinitions\nSome text.\n')
+
+
+def test_undecodable_file_leaves_no_output(folders):
+    data, clean, parsed = folders
+    path = os.path.join(data, 'a.txt')
+    with open(path, 'wb') as out_file:
+        out_file.write(b'Agreement\n' * 10000 + b'\xff\xfe broken\n')
+    with pytest.raises(UnicodeDecodeError):
+        file_parser.process_file(path, clean, parsed)
+    assert os.listdir(clean) == []
+    assert os.listdir(parsed) == []
+
+
+def test_clean_text_is_saved_when_text_is_not_tagged(folders):
+    data, clean, parsed = folders
+    path = os.path.join(data, 'a.txt')
+    with open(path, 'w', encoding='utf-8') as out_file:
+        # continuation of empty line can't be tagged
+        out_file.write('\nlowercase line\n')
+    with pytest.raises(IndexError):
+        file_parser.process_file(path, clean, parsed)
+    assert os.listdir(clean) == ['a.txt']
+    assert os.listdir(parsed) == []
+
+
+def test_async_run_skips_unchanged_files(tmp_path):
+    data, output = tmp_path / 'data', tmp_path / 'output'
+    data.mkdir()
+    for i in range(150):
+        with open(str(data / 'f{:03}.txt'.format(i)), 'w', encoding='utf-8') as out_file:
+            out_file.write('Agreement {}\nDefinitions\nSome text.\n'.format(i))
+
+    def run():
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as cpu_executor:
+            return asyncio.run(file_parser.parse_folder_async(
+                str(data), ['.txt'], -1, str(output), io_workers=4, cpu_executor=cpu_executor, verbose=False))
+
+    assert run() == []
+    os.remove(str(output / 'parsed' / 'f140.txt'))
+    parsed_before = {name: os.stat(str(output / 'parsed' / name)).st_mtime_ns
+                     for name in os.listdir(str(output / 'parsed'))}
+    assert run() == []
+    # only removed output is written again, records of all files are kept
+    assert sorted(os.listdir(str(output / 'parsed'))) == ['f{:03}.txt'.format(i) for i in range(150)]
+    for name, mtime in parsed_before.items():
+        assert os.stat(str(output / 'parsed' / name)).st_mtime_ns == mtime
+    with open(str(output / 'manifest.json'), encoding='utf-8') as input_file:
+        assert len(json.load(input_file)['files']) == 150
+
+
+def test_watch_refills_pool_and_skips_unreadable_files(tmp_path, monkeypatch):
+    data, output = tmp_path / 'data', tmp_path / 'output'
+    data.mkdir()
+    for i in range(12):
+        path = str(data / 'f{:03}.txt'.format(i))
+        with open(path, 'w', encoding='utf-8') as out_file:
+            out_file.write('Agreement {}\nDefinitions\nSome text.\n'.format(i))
+        # files are not written anymore
+        os.utime(path, (time.time() - 60, time.time() - 60))
+
+    needs_parsing = file_parser._needs_parsing
+
+    def unreadable_first_file(manifest, key, *args):
+        if key == 'f000.txt':
+            raise OSError('file is not readable')
+        return needs_parsing(manifest, key, *args)
+
+    def stop(seconds):
+        # watcher waits for next scan only when there are no files in pool
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(file_parser, '_needs_parsing', unreadable_first_file)
+    monkeypatch.setattr(file_parser.time, 'sleep', stop)
+    file_parser.watch_folder(str(data), ['.txt'], str(output), workers=1, interval=30)
+    assert sorted(os.listdir(str(output / 'parsed'))) == ['f{:03}.txt'.format(i) for i in range(1, 12)]
+
+
+def test_write_outputs_leaves_no_partial_files(folders):
+    data, clean, parsed = folders
+    path = os.path.join(data, 'a.txt')
+    with pytest.raises(IndexError):
+        file_parser._write_outputs(path, clean, parsed, '\nlowercase line\n', IndexError('not tagged'))
+    assert os.listdir(clean) == ['a.txt']
+    # tagged text which can't be written
+    with pytest.raises(TypeError):
+        file_parser._write_outputs(path, '', parsed, 'text', 123)
+    assert os.listdir(parsed) == []
+
+
+def test_scan_follows_symlinks_and_skips_cycles(tmp_path):
+    data, other = tmp_path / 'data', tmp_path / 'other'
+    (data / 'a').mkdir(parents=True)
+    other.mkdir()
+    for path in (data / 'a' / 'x.txt', other / 'y.txt', data / 'a' / 'z.pdf'):
+        path.write_text('Title\n', encoding='utf-8')
+    os.symlink(str(other), str(data / 'other'))
+    # cycle of folders
+    os.symlink(str(data), str(data / 'a' / 'cycle'))
+
+    def scanned(**kwargs):
+        return sorted(os.path.relpath(path, str(data))
+                      for path in file_parser.get_files_in_folder(str(data), ['.txt'], **kwargs))
+
+    assert scanned() == ['a/x.txt', 'other/y.txt']
+    assert scanned(follow_symlinks=False) == ['a/x.txt']
+
+
+def test_pool_passes_only_errors_of_files_to_on_done(folders):
+    data, clean, parsed = folders
+    good, bad = os.path.join(data, 'good.txt'), os.path.join(data, 'bad.txt')
+    with open(good, 'w', encoding='utf-8') as out_file:
+        out_file.write('Agreement\nSome text.\n')
+    with open(bad, 'w', encoding='utf-8') as out_file:
+        out_file.write('\nlowercase line\n')
+    calls = []
+
+    def on_done(path_to_file, result, error):
+        calls.append((path_to_file, type(error)))
+
+    file_parser._process_in_pool([good, bad], clean, parsed, 2, on_done)
+    assert sorted(calls) == [(bad, IndexError), (good, type(None))]
+
+    def failed_on_done(path_to_file, result, error):
+        calls.append((path_to_file, type(error)))
+        raise RuntimeError('on_done failed')
+
+    del calls[:]
+    with pytest.raises(RuntimeError):
+        file_parser._process_in_pool([good], clean, parsed, 2, failed_on_done)
+    # file is not reported again as failed
+    assert calls == [(good, type(None))]
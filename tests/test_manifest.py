@@ -0,0 +1,110 @@
+import os
+
+import file_parser
+from parser import FileTags, TagFlags
+from ingest import Manifest, ShardWriter, file_record, is_same_file
+
+
+def write(path, text):
+    with open(path, 'w', encoding='utf-8') as out_file:
+        out_file.write(text)
+
+
+def test_record_of_unchanged_file(tmp_path):
+    path = str(tmp_path / 'a.txt')
+    write(path, 'Title\nSome text.\n')
+    record = file_record(path)
+    assert record['size'] == os.path.getsize(path)
+    assert is_same_file(record, path)
+
+    manifest = Manifest(str(tmp_path), 'version')
+    manifest.update('a.txt', record)
+    assert not manifest.is_changed('a.txt', path)
+
+
+def test_file_changed_while_parsed(tmp_path, monkeypatch):
+    data, output = tmp_path / 'data', tmp_path / 'output'
+    data.mkdir()
+    (output / 'parsed').mkdir(parents=True)
+    path = str(data / 'a.txt')
+    write(path, 'Title\nSome text.\n')
+    read_lines = file_parser.read_lines
+
+    def read_and_change(filename):
+        lines = list(read_lines(filename))
+        write(filename, 'Title\nSome text.\nNew line which was saved while file was parsed.\n')
+        os.utime(filename, ns=(0, 0))
+        return iter(lines)
+
+    monkeypatch.setattr(file_parser, 'read_lines', read_and_change)
+    *_, record = file_parser._process_file_job(path, '', str(output / 'parsed'))
+    assert record is None
+
+    monkeypatch.setattr(file_parser, 'read_lines', read_lines)
+    *_, record = file_parser._process_file_job(path, '', str(output / 'parsed'))
+    assert record == file_record(path)
+
+
+def test_needs_parsing_when_output_is_missing(tmp_path):
+    data, clean, parsed = tmp_path / 'data', tmp_path / 'clean', tmp_path / 'parsed'
+    for folder in (data, clean, parsed):
+        folder.mkdir()
+    path = str(data / 'a.txt')
+    write(path, 'Title\nSome text.\n')
+    manifest = Manifest(str(tmp_path), 'version')
+    assert file_parser._needs_parsing(manifest, 'a.txt', path, str(clean), str(parsed))
+
+    manifest.update('a.txt', file_record(path))
+    # outputs were removed by user
+    assert file_parser._needs_parsing(manifest, 'a.txt', path, str(clean), str(parsed))
+    write(str(parsed / 'a.txt'), '')
+    assert file_parser._needs_parsing(manifest, 'a.txt', path, str(clean), str(parsed))
+    assert not file_parser._needs_parsing(manifest, 'a.txt', path, '', str(parsed))
+    write(str(clean / 'a.txt'), '')
+    assert not file_parser._needs_parsing(manifest, 'a.txt', path, str(clean), str(parsed))
+
+    with ShardWriter(str(tmp_path / 'shards')) as shards:
+        assert file_parser._needs_parsing(manifest, 'a.txt', path, str(clean), '', shards)
+        shards.add('a.txt', ['Title'], TagFlags.from_tuples([(1, FileTags.TITLE)]))
+        # document of shard which is not written yet is not parsed again
+        assert not file_parser._needs_parsing(manifest, 'a.txt', path, str(clean), '', shards)
+
+
+def test_records_are_dropped_when_options_are_changed(tmp_path):
+    path = str(tmp_path / 'a.txt')
+    write(path, 'Title\nSome text.\n')
+    manifest = Manifest(str(tmp_path), 'version', options={'colors': False})
+    manifest.update('a.txt', file_record(path))
+    manifest.save()
+
+    assert 'a.txt' in Manifest(str(tmp_path), 'version', options={'colors': False}).load().files
+    assert Manifest(str(tmp_path), 'version', options={'colors': True}).load().files == {}
+    assert Manifest(str(tmp_path), 'other version', options={'colors': False}).load().files == {}
+
+
+def test_run_with_other_options_parses_files_again(tmp_path, monkeypatch):
+    data, output = tmp_path / 'data', tmp_path / 'output'
+    data.mkdir()
+    write(str(data / 'a.txt'), 'Title\nSome text.\n')
+    parsed = []
+    process_file_job = file_parser._process_file_job
+
+    def counted_job(path_to_file, *args):
+        parsed.append(os.path.basename(path_to_file))
+        return process_file_job(path_to_file, *args)
+
+    monkeypatch.setattr(file_parser, '_process_file_job', counted_job)
+    file_parser.parse_folder(str(data), ['.txt'], -1, str(output), clean_output=False)
+    file_parser.parse_folder(str(data), ['.txt'], -1, str(output), clean_output=False)
+    assert parsed == ['a.txt']
+    # clean text is missing
+    file_parser.parse_folder(str(data), ['.txt'], -1, str(output))
+    assert parsed == ['a.txt', 'a.txt']
+    assert os.path.isfile(str(output / 'clean' / 'a.txt'))
+    file_parser.parse_folder(str(data), ['.txt'], -1, str(output), output_format='shards')
+    assert parsed == ['a.txt', 'a.txt', 'a.txt']
+
+    # records of previous runs are not read in case of force
+    monkeypatch.setattr(Manifest, 'load', None)
+    file_parser.parse_folder(str(data), ['.txt'], -1, str(output), output_format='shards', force=True)
+    assert parsed == ['a.txt', 'a.txt', 'a.txt', 'a.txt']
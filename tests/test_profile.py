@@ -0,0 +1,62 @@
+import pickle
+
+import pytest
+
+from parser import Profile, FileTags, parse_raw_text, iter_tagged_lines
+from parser import profile as profile_module
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(profile_module.time, 'perf_counter', clock)
+    return clock
+
+
+def test_time_of_stage_is_exclusive(clock):
+    profile = Profile()
+
+    def lines():
+        for line in ['a', 'b']:
+            clock.now += 1
+            yield line
+
+    with profile.stage('write'):
+        clock.now += 10
+        for _ in profile.iter('read', lines()):
+            clock.now += 100
+    # getting of each line and end of iteration
+    assert profile.timings == {'write': 210, 'read': 2}
+    assert profile.total() == 212
+
+
+def test_merge_and_pickle(clock):
+    first, second = Profile(), Profile()
+    with first.stage('read'):
+        clock.now += 1
+    first.add('bytes in', 10)
+    with second.stage('read'):
+        clock.now += 2
+    with second.stage('tags'):
+        clock.now += 3
+    second.add('bytes in', 5)
+    first.merge(pickle.loads(pickle.dumps(second)))
+    assert first.as_dict() == {'timings': {'read': 3, 'tags': 3}, 'counters': {'bytes in': 15}}
+
+
+def test_profile_of_tagging():
+    text = 'Agreement\nDefinitions\nSome text.\n1. First item\n2. Second item\nTerm\nOther text.'
+    profile = Profile()
+    assert '\n'.join(iter_tagged_lines(text.splitlines(keepends=True), profile=profile)) == parse_raw_text(text)
+    assert {'normalize', 'classify', 'tags', 'format'} <= set(profile.timings)
+    assert profile.counters['lines'] == 7
+    assert profile.counters['tags ' + str(FileTags.TITLE)] == 1
+    assert profile.counters['tags ' + str(FileTags.LIST)] == 2
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from classification import retrieval
+from classification.embeddings import Embeddings, convert_glove
+from classification.dedup import iter_sections
+from benchmarks.contracts import WORDS, generate_contract
+
+DOCUMENTS = [('doc{}'.format(seed), generate_contract(6000, seed=seed)) for seed in range(4)]
+
+
+@pytest.fixture(scope='module')
+def glove_prefix(tmp_path_factory):
+    path = tmp_path_factory.mktemp('glove') / 'glove.test.8d.txt'
+    rng = np.random.default_rng(0)
+    with open(str(path), 'w', encoding='utf-8') as out_file:
+        for word in WORDS:
+            out_file.write('{} {}\n'.format(word, ' '.join('{:.6f}'.format(value) for value in rng.normal(size=8))))
+    return convert_glove(str(path))
+
+
+@pytest.fixture(scope='module')
+def index(tmp_path_factory, glove_prefix):
+    folder = str(tmp_path_factory.mktemp('index'))
+    count = retrieval.build_index(iter(DOCUMENTS), folder, n_features=1 << 12, max_df=0.9,
+                                  embeddings=glove_prefix)
+    assert count == len(list(iter_sections(DOCUMENTS)))
+    return retrieval.SectionIndex(folder)
+
+
+def tfidf_vector(index, text: str) -> np.ndarray:
+    # dense tf-idf vector with the same hashing and idf as index
+    columns, counts = retrieval.hash_terms(text, n_features=index.meta['n_features'])
+    vector = np.zeros(index.meta['n_features'])
+    vector[columns] = (1 + np.log(counts)) * index.idf[columns]
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def test_scores_are_cosine_similarities(index):
+    sections = [text for _, text in iter_sections(DOCUMENTS)]
+    matrix = np.vstack([tfidf_vector(index, text) for text in sections])
+    query = sections[3] + ' payment notice'
+    expected = matrix @ tfidf_vector(index, query)
+    positions, scores = index.scores(query)
+    assert np.array_equal(positions, np.flatnonzero(expected))
+    assert np.allclose(scores, expected[positions], atol=1e-5)
+    # scores of heads of lists of postings are not bigger than exact scores
+    _, partial_scores = index.scores(query, max_postings=2)
+    assert len(partial_scores) <= len(scores)
+
+
+def test_search_finds_section(index):
+    (doc_id, op_pos, cl_pos), text = max(iter_sections(DOCUMENTS), key=lambda item: len(item[1]))
+    matches = index.search(text, k=3)
+    assert len(matches) == 3
+    assert matches[0][:3] == (doc_id, op_pos, cl_pos)
+    assert matches[0].score == pytest.approx(1, abs=1e-5)
+    assert [match.score for match in matches] == sorted((match.score for match in matches), reverse=True)
+    assert index.search('zzz unknown words', k=3) == []
+
+
+def test_dense_reranking(index, glove_prefix):
+    query = ' '.join(text for _, text in iter_sections(DOCUMENTS))[:400]
+    positions, sparse_scores = index.scores(query)
+    sparse = dict(zip(positions.tolist(), sparse_scores.tolist()))
+    positions_of_sections = {index.section(pos): pos for pos in range(len(index))}
+    query_vector = retrieval.embed_text(Embeddings(glove_prefix), query)
+    matches = index.search(query, k=5, dense_weight=0.5, candidates=len(index))
+    assert len(matches) == 5
+    for match in matches:
+        pos = positions_of_sections[match[:3]]
+        expected = 0.5 * sparse[pos] + 0.5 * float(index.vectors[pos] @ query_vector)
+        assert match.score == pytest.approx(expected, abs=1e-5)
+    assert [match.score for match in matches] == sorted((match.score for match in matches), reverse=True)
+
+
+def test_dense_reranking_needs_vectors(tmp_path):
+    retrieval.build_index(DOCUMENTS[:1], str(tmp_path), n_features=1 << 10)
+    index = retrieval.SectionIndex(str(tmp_path))
+    assert index.search('payment', k=1)
+    with pytest.raises(ValueError):
+        index.search('payment', k=1, dense_weight=0.5)
@@ -0,0 +1,72 @@
+import json
+import threading
+import http.client
+import http.server
+
+import pytest
+
+from classification.inference import MicroBatcher, document_sections
+from classification.server import make_handler
+
+
+def predict(texts: list) -> list:
+    return ['long' if len(text) > 20 else 'short' for text in texts]
+
+
+@pytest.fixture
+def server():
+    batcher = MicroBatcher(predict, max_wait=0.001)
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), make_handler(batcher))
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    batcher.close()
+
+
+def post(server, path: str, body) -> tuple:
+    connection = http.client.HTTPConnection(*server.server_address, timeout=10)
+    data = body if isinstance(body, bytes) else json.dumps(body).encode('utf-8')
+    connection.request('POST', path, data, {'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    result = response.status, json.loads(response.read().decode('utf-8'))
+    connection.close()
+    return result
+
+
+def test_classify(server):
+    assert post(server, '/classify', {'texts': ['short text', 'some long text of paragraph']}) == \
+        (200, {'labels': ['short', 'long']})
+    assert post(server, '/classify', {'text': 'short text'}) == (200, {'labels': ['short']})
+    status, content = post(server, '/classify-document', {'text': 'Agreement\nDefinitions\nSome text.\n'})
+    assert status == 200 and content['sections']
+
+
+@pytest.mark.parametrize('path, body', [
+    ('/classify', b'{not json'),
+    ('/classify', b'\xff\xfe'),
+    ('/classify', []),
+    ('/classify', {'texts': 'text'}),
+    ('/classify', {'texts': ['text', 1]}),
+    ('/classify', {'text': None}),
+    ('/classify-document', {'texts': ['text']}),
+    ('/classify-document', {'text': 1}),
+])
+def test_invalid_requests(server, path, body):
+    status, content = post(server, path, body)
+    assert status == 400
+    assert content['error']
+
+
+def test_empty_document(server):
+    assert document_sections('') == []
+    assert document_sections(' \n ') == []
+    assert post(server, '/classify-document', {'text': ''}) == (200, {'sections': []})
+
+
+def test_internal_errors(server):
+    # continuation without previous line can't be tagged
+    status, content = post(server, '/classify-document', {'text': '\nlowercase line'})
+    assert status == 500
+    assert 'IndexError' in content['error']
@@ -0,0 +1,67 @@
+import os
+
+from ingest import ShardWriter, ShardReader, compact_shards
+from parser import FileTags, tag_positions
+
+TEXTS = {'a': 'Agreement\nDefinitions\nSome text.\nTerm\nOther text.\n',
+         'b': 'Contract\n1. First item\n2. Second item\n',
+         'empty': 'Title'}
+
+
+def add_texts(writer, texts):
+    for doc_id, text in texts.items():
+        flags, lines = tag_positions(text)
+        writer.add(doc_id, lines, flags)
+
+
+def check_documents(folder, texts):
+    reader = ShardReader(folder)
+    assert sorted(reader.ids()) == sorted(texts)
+    for doc_id, text in texts.items():
+        flags, lines = tag_positions(text)
+        document = reader[doc_id]
+        assert document.lines() == lines
+        assert document.tag_texts(FileTags.SECTION) == [
+            '\n'.join(lines[op_pos:cl_pos + 1]) for op_pos, cl_pos in document.tag_lines(FileTags.SECTION)]
+
+
+def test_write_and_read(tmp_path):
+    folder = str(tmp_path / 'shards')
+    with ShardWriter(folder, shard_size=40) as writer:
+        add_texts(writer, TEXTS)
+        assert 'a' in writer
+    check_documents(folder, TEXTS)
+    assert len(ShardReader(folder).index['shards']) == 2
+
+
+def test_text_is_written_while_documents_are_added(tmp_path):
+    folder = str(tmp_path / 'shards')
+    texts = dict(TEXTS, big='Title\n' + 'Some text.\n' * 300000)
+    writer = ShardWriter(folder)
+    add_texts(writer, texts)
+    tmp_files = [name for name in os.listdir(folder) if name.endswith('.tmp')]
+    assert len(tmp_files) == 1
+    # text is not kept in memory
+    assert os.path.getsize(os.path.join(folder, tmp_files[0])) > 3000000
+    assert 'b' in writer and 'b' not in ShardReader(folder)
+    writer.close()
+    check_documents(folder, texts)
+
+
+def test_compaction(tmp_path):
+    folder = str(tmp_path / 'shards')
+    with ShardWriter(folder) as writer:
+        add_texts(writer, TEXTS)
+    changed = dict(TEXTS, a='Agreement\nTerm\nChanged text.\n')
+    with ShardWriter(folder) as writer:
+        add_texts(writer, {'a': changed['a']})
+    assert len(ShardReader(folder).index['shards']) == 2
+
+    assert compact_shards(folder) == (2, 1)
+    check_documents(folder, changed)
+    assert sorted(os.listdir(folder)) == ['index.json', 'shard-00002.bin']
+
+    # new shards don't replace compacted ones
+    with ShardWriter(folder) as writer:
+        add_texts(writer, {'c': TEXTS['b']})
+    check_documents(folder, dict(changed, c=TEXTS['b']))
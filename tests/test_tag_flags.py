@@ -0,0 +1,31 @@
+from parser import FileTags, TagFlags, tag_positions
+
+TEXT = 'Agreement\nDefinitions\nSome text.\n1. First item\n2. Second item\nTerm\nOther text.\n'
+
+
+def test_works_as_list_of_tuples():
+    flags, _ = tag_positions(TEXT)
+    tuples = flags.tuples()
+    assert flags == tuples
+
+    for items in (flags, tuples):
+        items.append((3, FileTags.LIST))
+        items.extend([(0, None), (1, FileTags.SECTION)])
+        items.insert(0, (1, FileTags.TITLE))
+        items[1:3] = [(0, None)]
+        del items[-1]
+        items += [(2, FileTags.SECTION)]
+    assert flags == tuples
+    assert flags.pop() == tuples.pop()
+    assert flags.index((3, FileTags.LIST)) == tuples.index((3, FileTags.LIST))
+    assert (3, FileTags.LIST) in flags
+    assert list(reversed(flags)) == list(reversed(tuples))
+
+
+def test_slices_are_tag_flags():
+    flags, _ = tag_positions(TEXT)
+    part = flags[1:4]
+    assert isinstance(part, TagFlags)
+    assert part == flags.tuples()[1:4]
+    assert isinstance(part + [(0, None)], TagFlags)
+    assert [(0, None)] + part == [(0, None)] + flags.tuples()[1:4]
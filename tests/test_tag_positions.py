@@ -0,0 +1,171 @@
+import io
+import re
+import random
+import functools
+
+import pytest
+
+from parser import FileTags, tag_positions, parse_raw_text, iter_tagged_lines
+from benchmarks.contracts import generate_contract
+
+# reference copy of per-line matcher which was used before lines were classified in a single pass
+
+TITLE = re.compile(r'^\ufeff?([\w ]+)[^.]?')
+EXHIBIT = re.compile(r'^\ufeff?Exhibit.+$')
+EMPTY_LINE = re.compile(r'^\s*$')
+EXACT_SECTION = re.compile(r'^(Section.*|[A-Z ]+|\d+\.\s*[A-Z ]+)$')
+SECTION = re.compile(r'^[A-Z][a-z ]+[^.]?$')
+LIST = re.compile(r'^\s*(\d+(\.|\))|\w(\.|\))|\(\w+\)|(•|-|\*)).*$')
+SINGLE_NUMBER = re.compile(r'^\s*[\d\.\)]+\s*$')
+
+
+def reference_normalize_lines(text_lines: list) -> list:
+    i, lines_size = 1, len(text_lines)
+    normalized = [text_lines[0]]
+
+    while i < lines_size:
+        line = text_lines[i]
+        # continue previous sentence
+        if re.match(r'\s*^[a-z]+', line):
+            while len(normalized) > 0 and EMPTY_LINE.match(normalized[-1]):
+                normalized.pop()
+            normalized[-1] += line
+        else:
+            if not EMPTY_LINE.match(normalized[-1]) and not EMPTY_LINE.match(line):
+                normalized.append(line)
+        i += 1
+    return normalized
+
+
+def reference_tag_positions(text: str) -> tuple:
+    text_lines = reference_normalize_lines(text.splitlines())
+    lines_length = len(text_lines)
+    flags = [(0, None) for _ in text_lines]
+
+    title_pos = 0
+    if EXHIBIT.match(text_lines[title_pos]):
+        title_pos += 1
+        while EMPTY_LINE.match(text_lines[title_pos]):
+            title_pos += 1
+        flags[title_pos] = ((1 << 0), FileTags.TITLE)
+        title_pos += 1
+    elif TITLE.match(text_lines[title_pos]):
+        flags[title_pos] = ((1 << 0), FileTags.TITLE)
+        title_pos += 1
+
+    for i in range(title_pos, lines_length):
+        line = text_lines[i]
+        if EMPTY_LINE.match(line):
+            continue
+        elif SECTION.match(line) or EXACT_SECTION.match(line):
+            flags[i] = ((1 << 0), FileTags.SECTION)
+            continue
+        elif LIST.match(line) and not SINGLE_NUMBER.match(line):
+            flags[i] = ((1 << 0) | (1 << 1), FileTags.LIST)
+
+    all_sections_uppercase = all(text_lines[pos].isupper() for pos in range(lines_length)
+                                 if flags[pos][1] == FileTags.SECTION)
+    if not all_sections_uppercase:
+        for i in range(title_pos, lines_length):
+            if flags[i][1] == FileTags.SECTION and text_lines[i].isupper():
+                flags[i] = (0, None)
+
+    for i in range(lines_length):
+        if EMPTY_LINE.match(text_lines[i]) or flags[i][1]:
+            continue
+        flags[i] = ((1 << 0) | (1 << 1), FileTags.PLAIN_TEXT)
+
+    tag_pos, tags_size = 0, len(flags)
+    is_opened_section, any_section = False, False
+    while tag_pos < tags_size:
+        _, tag = flags[tag_pos]
+        if tag == FileTags.SECTION:
+            if is_opened_section:
+                flag, tag = flags[tag_pos - 1]
+                if tag == FileTags.SECTION:
+                    flags[tag_pos - 1] = flag | (1 << 1), tag
+            flags[tag_pos] = ((1 << 0), FileTags.SECTION)
+            is_opened_section = not is_opened_section
+            any_section = True
+        if tag_pos + 1 == tags_size and any_section and not is_opened_section:
+            flags[tag_pos] = ((1 << 1), FileTags.SECTION)
+        tag_pos += 1
+    return flags, text_lines
+
+
+def reference_parse_raw_text(text: str) -> str:
+    text_tags, lines = reference_tag_positions(text)
+    for i, (bit_flags, tag) in enumerate(text_tags):
+        if tag:
+            if bit_flags & (1 << 0):
+                lines[i] = tag.op() + ' ' + lines[i]
+            if bit_flags & (1 << 1):
+                lines[i] = lines[i].rstrip() + ' ' + tag.cl()
+    return '\n'.join(lines)
+
+
+def outcome(function, text: str):
+    """
+    Result of function or type of exception which was raised by it.
+    """
+    try:
+        return function(text)
+    except Exception as e:
+        return type(e)
+
+
+def streamed_parse(text: str, max_memory_size: int, is_file: bool) -> str:
+    """
+    Tagged text of iter_tagged_lines, lines are read from text file (split only by line feeds)
+    or split by str.splitlines with line breaks.
+    """
+    lines = io.StringIO(text, newline='') if is_file else text.splitlines(keepends=True)
+    return '\n'.join(iter_tagged_lines(lines, max_memory_size=max_memory_size))
+
+
+def assert_same_tags(text: str):
+    expected = outcome(reference_tag_positions, text)
+    result = outcome(tag_positions, text)
+    if isinstance(expected, type):
+        assert result is expected
+    else:
+        flags, lines = result
+        assert list(flags) == expected[0]
+        assert lines == expected[1]
+    expected = outcome(reference_parse_raw_text, text)
+    assert outcome(parse_raw_text, text) == expected
+    # lines are spilled to disk in case of small max_memory_size
+    for max_memory_size in (1 << 20, 64):
+        for is_file in (False, True):
+            streamed = functools.partial(streamed_parse, max_memory_size=max_memory_size, is_file=is_file)
+            assert outcome(streamed, text) == expected
+
+
+# pieces of lines which cover all rules of matcher (titles, sections, lists, continuations and empty lines)
+PIECES = list('aAbBsSzZ .)(1290-*•\t  \ufeff٣Éé_') + \
+    ['Section', 'Exhibit', 'ARTICLE', '\n', '\n', '\n', '\r\n', '\x0c', ' ']
+LINES = ['Exhibit 10.1', '', '   ', 'SERVICE AGREEMENT', 'Definitions', 'Section 2. Payment',
+         '1. TERM', '2.', '1.', '(a) first item', 'a) item', 'A. Item', '- dash item', '• bullet',
+         '* star', 'continued sentence in lowercase', 'The parties agree as follows.',
+         'Confidential Information', 'GENERAL PROVISIONS', '12) Notices', '(iv) other', '3.5']
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_contracts(seed):
+    for size in (2000, 20000):
+        assert_same_tags(generate_contract(size, seed=seed))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_fuzzed_characters(seed):
+    generator = random.Random(seed)
+    for _ in range(2000):
+        assert_same_tags(''.join(generator.choice(PIECES) for _ in range(generator.randrange(0, 80))))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_fuzzed_lines(seed):
+    generator = random.Random(seed)
+    for _ in range(500):
+        lines = [generator.choice(LINES) for _ in range(generator.randrange(1, 40))]
+        assert_same_tags('\n'.join(lines))
@@ -0,0 +1,28 @@
+import pytest
+
+from parser import FileTags, TextTree, tag_positions, build_tree
+from benchmarks.contracts import generate_contract
+
+
+def traversed_tag_lines(tree: TextTree, tag) -> list:
+    # index of built tree is not used
+    tag_index, tree.tag_index = tree.tag_index, None
+    try:
+        return tree.tag_lines(tag)
+    finally:
+        tree.tag_index = tag_index
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_indexed_tag_lines_are_the_same_as_traversal(seed):
+    flags, _ = tag_positions(generate_contract(5000, seed=seed))
+    tree = build_tree(flags)
+    assert tree.tag_index is not None
+    for tag in (FileTags.TITLE, FileTags.SECTION, FileTags.LIST, FileTags.PLAIN_TEXT, FileTags.LIST_ITEM, None):
+        assert tree.tag_lines(tag) == traversed_tag_lines(tree, tag)
+
+
+def test_root_of_built_tree():
+    tree = build_tree([((1 << 0) | (1 << 1), FileTags.TITLE), (0, None)])
+    assert tree.tag_lines(None) == [(0, 2)]
+    assert tree.tag_lines(FileTags.TITLE) == [(0, 0)]